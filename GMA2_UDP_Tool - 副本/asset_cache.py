@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景素材磁盘缓存 - 缩略图、预览信息按名称保存为单独的文件，总大小超过上限时按最近使用顺序淘汰
+首次使用时（在后台线程中）按文件修改时间重建使用顺序，读取时更新修改时间（下次启动仍保持顺序）
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class AssetCache:
+    """磁盘LRU缓存（线程安全）"""
+
+    SUFFIX = '.asset'
+
+    def __init__(self, cache_dir, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # 文件名 -> 大小，按最近使用排序（最旧的在前）
+        self.entries = OrderedDict()
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loaded = False
+        self.load_lock = threading.Lock()
+
+    @staticmethod
+    def file_name(name):
+        return hashlib.sha1(name.encode('utf-8')).hexdigest() + AssetCache.SUFFIX
+
+    def path(self, file_name):
+        return os.path.join(self.cache_dir, file_name)
+
+    def ensure_loaded(self):
+        with self.load_lock:
+            if not self.loaded:
+                self.load_index()
+                self.loaded = True
+
+    def load_index(self):
+        """扫描缓存目录，按修改时间重建使用顺序"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            files = []
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(self.SUFFIX) and entry.is_file():
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, entry.name, stat.st_size))
+        except OSError as e:
+            print(f"读取素材缓存失败: {e}")
+            return
+        files.sort()
+        with self.lock:
+            self.entries = OrderedDict((name, size) for _, name, size in files)
+            self.total = sum(self.entries.values())
+        self.evict()
+
+    def contains(self, name):
+        self.ensure_loaded()
+        with self.lock:
+            return self.file_name(name) in self.entries
+
+    def get(self, name):
+        """读取缓存内容，不存在返回None"""
+        self.ensure_loaded()
+        file_name = self.file_name(name)
+        with self.lock:
+            if file_name not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(file_name)
+        try:
+            with open(self.path(file_name), 'rb') as f:
+                data = f.read()
+            os.utime(self.path(file_name))
+        except OSError:
+            # 文件被外部删除
+            with self.lock:
+                size = self.entries.pop(file_name, None)
+                if size is not None:
+                    self.total -= size
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return data
+
+    def put(self, name, data):
+        """写入缓存（先写临时文件再替换），超过上限时淘汰最久未使用的文件"""
+        if len(data) > self.max_bytes:
+            return False
+        self.ensure_loaded()
+        file_name = self.file_name(name)
+        path = self.path(file_name)
+        try:
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"写入素材缓存失败: {e}")
+            return False
+        with self.lock:
+            self.total -= self.entries.pop(file_name, 0)
+            self.entries[file_name] = len(data)
+            self.total += len(data)
+        self.evict()
+        return True
+
+    def evict(self):
+        """淘汰最久未使用的文件直到总大小不超过上限"""
+        removed = []
+        with self.lock:
+            while self.total > self.max_bytes and self.entries:
+                file_name, size = self.entries.popitem(last=False)
+                self.total -= size
+                self.evictions += 1
+                removed.append(file_name)
+        for file_name in removed:
+            try:
+                os.remove(self.path(file_name))
+            except OSError:
+                pass
+
+    def size(self):
+        self.ensure_loaded()
+        with self.lock:
+            return self.total
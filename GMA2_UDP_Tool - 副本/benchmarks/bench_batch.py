@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量命令测试 - 组成一个"灯光颜色 + 调光 + 音量 + 场景"的画面，
+比较逐条发送与批量发送（HTTP一次请求 / UDP数据报串）的往返次数和耗时，
+并检查原子模式下任一命令被拒绝时整批都不执行
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_manager import ConnectionManager
+from stats import format_summary, summarize
+from stub_server import StubController
+from udp_stub import UdpStub
+
+LOOK = [
+    ('lights_control', {'action': 'red'}),
+    ('lights_control', {'action': 'dim'}),
+    ('set_volume', {'volume': 70}),
+    ('play_scene', {'scene_name': '节目表演1'}),
+]
+
+
+def measure(stub, send, rounds):
+    """返回(延迟样本, 总耗时, 每个画面的HTTP请求数)"""
+    before = stub.count()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        send()
+        samples.append(time.perf_counter() - t0)
+    return samples, time.perf_counter() - start, (stub.count() - before) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量命令测试')
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.005, help='模拟控制系统响应延迟（秒）')
+    args = parser.parse_args()
+
+    with StubController(latency=args.latency) as stub, UdpStub(latency=args.latency) as udp_stub:
+        manager = ConnectionManager()
+        manager.set_server_address(stub.host, stub.port)
+        manager.test_connection()
+
+        def serial():
+            for command, data in LOOK:
+                manager.send_command(command, data)
+
+        runs = [
+            ('逐条HTTP', measure(stub, serial, args.rounds)),
+            ('批量HTTP', measure(stub, lambda: manager.send_batch(LOOK), args.rounds)),
+            ('原子批量', measure(stub, lambda: manager.send_batch(LOOK, atomic=True), args.rounds)),
+        ]
+
+        manager.enable_udp(udp_stub.port)
+        runs.append(('逐条UDP', measure(stub, serial, args.rounds)))
+        runs.append(('批量UDP', measure(stub, lambda: manager.send_batch(LOOK), args.rounds)))
+
+        # 原子模式：任一命令被拒绝时整批不执行；非原子模式只有被拒绝的那条失败
+        stub.rejected_commands.add('play_scene')
+        atomic_results = manager.send_batch(LOOK, atomic=True)
+        partial_results = manager.send_batch(LOOK)
+        manager.close()
+
+    for name, (samples, elapsed, requests) in runs:
+        print(f"{format_summary(name, summarize(samples, elapsed))}  每个画面HTTP请求 {requests:.0f} 次")
+    print(f"原子模式被拒绝: 成功 {sum(1 for r in atomic_results if r)}/{len(LOOK)}")
+    print(f"非原子模式被拒绝: 成功 {sum(1 for r in partial_results if r)}/{len(LOOK)}")
+    if any(atomic_results) or sum(1 for r in partial_results if r) != len(LOOK) - 1:
+        sys.exit('批量命令结果检查失败')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+控制系统发现测试 - 在回环地址 127.0.0.x 上运行多个模拟控制系统，
+分别测量缓存确认、广播发现和整个/24网段扫描的耗时
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discovery import SWEEP_CONNECT_TIMEOUT, ControllerDiscovery, local_prefix
+from discovery_stub import DiscoveryStub
+from stub_server import StubController
+
+
+def timed(func, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+def report(name, result, elapsed):
+    found = '、'.join(f"{c['name']}({c['ip']})" for c in result) or '无'
+    print(f"{name}: {elapsed * 1000:.0f}ms，发现 {len(result)} 个: {found}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='控制系统发现测试')
+    parser.add_argument('--controllers', type=int, default=3, help='模拟控制系统数量')
+    parser.add_argument('--http-port', type=int, default=18080)
+    parser.add_argument('--discovery-port', type=int, default=18082)
+    parser.add_argument('--lan', action='store_true', help='额外扫描本机所在网段（不存在的主机不应答，按连接超时计）')
+    args = parser.parse_args()
+
+    hosts = [f'127.0.0.{10 * (i + 1)}' for i in range(args.controllers)]
+    with contextlib.ExitStack() as stack:
+        for i, host in enumerate(hosts):
+            stack.enter_context(StubController(host=host, port=args.http_port, name=f'控制系统{i + 1}'))
+            stack.enter_context(DiscoveryStub(f'控制系统{i + 1}', host, args.http_port, args.discovery_port))
+        data_dir = stack.enter_context(tempfile.TemporaryDirectory())
+
+        discovery = ControllerDiscovery(
+            data_dir, port=args.discovery_port, http_port=args.http_port,
+            targets=[('127.255.255.255', args.discovery_port)]
+        )
+        report('广播发现', *timed(discovery.query))
+        report('网段扫描 127.0.0.0/24', *timed(discovery.sweep, '127.0.0'))
+
+        # 登录成功后记录，下次启动先确认缓存
+        discovery.remember(hosts[0], args.http_port)
+        restarted = ControllerDiscovery(
+            data_dir, port=args.discovery_port, http_port=args.http_port,
+            targets=[('127.255.255.255', args.discovery_port)]
+        )
+        restarted.load_cache()
+        report('重启后确认缓存', *timed(restarted.verify_cached))
+        report('完整发现（缓存 + 广播）', *timed(restarted.discover))
+
+        # 控制系统不支持发现协议时回退为网段扫描
+        silent = ControllerDiscovery(data_dir, port=args.discovery_port + 1, http_port=args.http_port,
+                                     targets=[('127.255.255.255', args.discovery_port + 1)])
+        report('无广播应答时回退扫描', *timed(silent.discover, prefix='127.0.0'))
+
+    if args.lan:
+        prefix = local_prefix()
+        if prefix:
+            report(f'网段扫描 {prefix}.0/24', *timed(discovery.sweep, prefix))
+    print(f"逐个扫描254个地址的最坏耗时约 {254 * SWEEP_CONNECT_TIMEOUT:.0f}s")
+
+
+if __name__ == '__main__':
+    main()
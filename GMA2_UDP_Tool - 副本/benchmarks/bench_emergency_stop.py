@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧急停止延迟测试 - 普通命令队列和连续参数通道都已塞满时，
+比较紧急停止走关键通道与排在普通队列末尾（先进先出）的送达延迟
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_manager import ConnectionManager
+from stats import format_summary, summarize
+from stub_server import StubController
+
+
+def measure(stub, lane, rounds, backlog):
+    """每轮先塞满普通队列和连续参数通道，再按下紧急停止，返回提交到收到结果的延迟"""
+    manager = ConnectionManager()
+    manager.set_server_address(stub.host, stub.port)
+    manager.test_connection()
+    manager.prewarm_critical()
+
+    samples = []
+    for i in range(rounds):
+        for n in range(backlog):
+            manager.send_command_async('lights_control', {'action': 'on', 'n': n})
+        for n in range(20):
+            manager.send_continuous('volume', 'set_volume', {'volume': n})
+
+        done = threading.Event()
+        started = time.perf_counter()
+        manager.send_command_async('emergency_stop', {'round': i}, lambda result: done.set(), lane=lane)
+        done.wait(30)
+        samples.append(time.perf_counter() - started)
+
+        # 等待本轮剩余命令执行完毕
+        while manager.dispatcher.pending_count():
+            time.sleep(0.01)
+        time.sleep(0.1)
+
+    manager.close()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='紧急停止延迟测试')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--backlog', type=int, default=48, help='每轮排队的普通命令数')
+    parser.add_argument('--latency', type=float, default=0.02, help='模拟控制系统响应延迟（秒）')
+    args = parser.parse_args()
+
+    with StubController(latency=args.latency) as stub:
+        fifo = measure(stub, 'cue', args.rounds, args.backlog)
+        critical = measure(stub, None, args.rounds, args.backlog)
+
+    print(f"排队命令 {args.backlog} 条，控制系统延迟 {args.latency * 1000:.0f}ms")
+    print(format_summary('FIFO', summarize(fifo, sum(fifo))))
+    print(format_summary('关键通道', summarize(critical, sum(critical))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令编码测试 - 每条命令的编码耗时和负载大小：
+    旧HTTP   每次构造字典并JSON编码（requests的json=参数）
+    旧UDP    按(命令, 参数JSON)缓存，查缓存前仍需编码一次参数
+    注册表   常量命令预编码、带参数命令按模板拼接
+    二进制   注册表的紧凑二进制编码
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_registry import REGISTRY, encode_json
+
+COMMANDS = [
+    ('lights_control', {'action': 'full'}),
+    ('lights_control', {'action': 'blue'}),
+    ('pause_scene', None),
+    ('stop_scene', None),
+    ('emergency_stop', None),
+    ('set_volume', {'volume': 75}),
+    # 音量滑块经连续参数通道发送，附加序号
+    ('set_volume', {'volume': 75, 'seq': 1234}),
+    ('play_scene', {'scene_name': '开场音乐'}),
+]
+
+
+def old_http(command, data):
+    return json.dumps({'command': command, 'data': data or {}}).encode('utf-8')
+
+
+def make_old_udp():
+    cache = {}
+
+    def encode(command, data):
+        key = (command, json.dumps(data, sort_keys=True) if data else '')
+        body = cache.get(key)
+        if body is None:
+            body = cache[key] = encode_json(command, data)
+        return body
+    return encode
+
+
+def per_call_ns(func, command, data, number):
+    return min(timeit.repeat(lambda: func(command, data), number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description='命令编码测试')
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    encoders = [
+        ('旧HTTP', old_http),
+        ('旧UDP', make_old_udp()),
+        ('注册表', REGISTRY.encode),
+        ('二进制', REGISTRY.encode_binary),
+    ]
+    print(f"{'命令':<40}" + ''.join(f"{name:>10}" for name, _ in encoders) + '   JSON/二进制字节')
+    totals = [0.0] * len(encoders)
+    for command, data in COMMANDS:
+        row = []
+        for i, (_, encoder) in enumerate(encoders):
+            ns = per_call_ns(encoder, command, data, args.number)
+            totals[i] += ns
+            row.append(f"{ns:>8.0f}ns")
+        label = f"{command} {json.dumps(data, ensure_ascii=False) if data else ''}"
+        sizes = f"{len(REGISTRY.encode(command, data))}/{len(REGISTRY.encode_binary(command, data))}"
+        print(f"{label:<40}" + ''.join(row) + f"   {sizes}")
+    print(f"{'平均':<40}" + ''.join(f"{total / len(COMMANDS):>8.0f}ns" for total in totals))
+
+
+if __name__ == '__main__':
+    main()
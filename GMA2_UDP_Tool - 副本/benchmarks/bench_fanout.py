@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多控制器群控测试 - 多个不同延迟的模拟控制系统，
+比较逐个发送与并发群控（all / quorum / any 策略）的耗时
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_group import POLICY_ALL, POLICY_ANY, POLICY_QUORUM, ControllerGroup
+from stats import format_summary, summarize
+from stub_server import StubController
+
+
+def measure(send, rounds):
+    samples = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        send()
+        samples.append(time.perf_counter() - t0)
+    return samples, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多控制器群控测试')
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--latencies', default='10,20,40,80', help='各控制系统的响应延迟（毫秒）')
+    args = parser.parse_args()
+
+    latencies = [float(value) / 1000 for value in args.latencies.split(',')]
+    with contextlib.ExitStack() as stack:
+        stubs = [stack.enter_context(StubController(latency=latency)) for latency in latencies]
+        group = ControllerGroup(
+            [{'name': f'控制器{i}', 'ip': stub.host, 'port': stub.port} for i, stub in enumerate(stubs)]
+        )
+        managers = [group.managers[name] for name in group.names()]
+        data = {'action': 'full'}
+
+        # 预热各控制系统的连接
+        group.send('lights_control', data)
+
+        def sequential():
+            for manager in managers:
+                manager.send_command('lights_control', data, journal=False)
+
+        runs = [('逐个发送', measure(sequential, args.rounds))]
+        for policy in (POLICY_ALL, POLICY_QUORUM, POLICY_ANY):
+            runs.append((policy, measure(lambda: group.send('lights_control', data, policy), args.rounds)))
+
+        # 一个控制系统离线时各策略的结果
+        stubs[-1].offline = True
+        offline = {policy: group.send('lights_control', data, policy) for policy in (POLICY_ALL, POLICY_QUORUM, POLICY_ANY)}
+        time.sleep(0.2)
+        group.close()
+
+    print(f"控制系统延迟: {args.latencies} ms，最慢 {max(latencies) * 1000:.0f}ms，总和 {sum(latencies) * 1000:.0f}ms")
+    for name, (samples, elapsed) in runs:
+        print(format_summary(name, summarize(samples, elapsed)))
+    for policy, result in offline.items():
+        print(f"最慢的控制系统离线时 {policy}: {'成功' if result.ok else '失败'}，{result.summary()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+连接健康监测测试 - 模拟控制系统依次注入延迟尖峰、链路中断（立即断开）和无响应（黑洞），
+记录状态变化的检测/恢复时间，并统计各阶段的探测次数（与固定1秒心跳比较）
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_manager import ConnectionManager
+from health import HEALTH_CONNECTED, HEALTH_DEGRADED, HEALTH_OFFLINE, HEALTH_RECONNECTING
+from stub_server import StubController
+
+
+class StateRecorder:
+    """记录连接状态变化及时间"""
+
+    def __init__(self, manager):
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.events = []
+        manager.add_status_callback(self.on_status)
+
+    def on_status(self, status):
+        if isinstance(status, str):
+            with self.changed:
+                self.events.append((time.perf_counter(), status))
+                self.changed.notify_all()
+
+    def wait_for(self, state, since, timeout):
+        """等待进入state，返回从since开始的耗时（秒），超时返回None"""
+        deadline = time.perf_counter() + timeout
+        with self.changed:
+            while True:
+                for at, status in self.events:
+                    if at >= since and status == state:
+                        return at - since
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                self.changed.wait(remaining)
+
+    def states_since(self, since):
+        with self.lock:
+            return [status for at, status in self.events if at >= since]
+
+
+def probes_during(monitor, seconds):
+    """seconds内发出的心跳探测次数"""
+    before = monitor.probes
+    time.sleep(seconds)
+    return monitor.probes - before
+
+
+def format_ms(value):
+    return f"{value * 1000:.0f}ms" if value is not None else "未检测到"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='连接健康监测测试')
+    parser.add_argument('--latency', type=float, default=2.0, help='正常网络往返延迟（毫秒）')
+    parser.add_argument('--spike', type=float, default=400.0, help='延迟尖峰（毫秒）')
+    parser.add_argument('--stable', type=float, default=30.0, help='稳定阶段时长（秒）')
+    parser.add_argument('--outage', type=float, default=8.0, help='中断时长（秒）')
+    args = parser.parse_args()
+
+    latency = args.latency / 1000
+    results = []
+    with StubController(latency=latency) as stub:
+        manager = ConnectionManager()
+        manager.set_server_address(stub.host, stub.port)
+        recorder = StateRecorder(manager)
+
+        start = time.perf_counter()
+        manager.start_health()
+        results.append(('启动 -> 已连接', recorder.wait_for(HEALTH_CONNECTED, start, 5)))
+
+        # 稳定阶段：心跳逐步放慢
+        stable_probes = probes_during(manager.health, args.stable)
+
+        # 有命令流量时不需要额外探测
+        before = manager.health.probes
+        busy_until = time.perf_counter() + args.stable / 2
+        while time.perf_counter() < busy_until:
+            manager.send_command('set_volume', {'volume': 50}, journal=False)
+            time.sleep(0.2)
+        busy_probes = manager.health.probes - before
+
+        # 延迟尖峰：命令失败会立即触发探测，这里不发命令，只靠心跳发现
+        since = time.perf_counter()
+        stub.latency = args.spike / 1000
+        results.append(('延迟尖峰 -> 链路变差', recorder.wait_for(HEALTH_DEGRADED, since, 15)))
+        spike_probes = probes_during(manager.health, 5)
+        since = time.perf_counter()
+        stub.latency = latency
+        results.append(('尖峰结束 -> 已连接', recorder.wait_for(HEALTH_CONNECTED, since, 15)))
+        time.sleep(args.stable / 3)
+
+        # 链路中断（连接被立即断开）
+        since = time.perf_counter()
+        stub.set_offline(True)
+        results.append(('中断 -> 重连中', recorder.wait_for(HEALTH_RECONNECTING, since, 15)))
+        results.append(('中断 -> 离线', recorder.wait_for(HEALTH_OFFLINE, since, 30)))
+        outage_probes = manager.health.probes
+        time.sleep(max(0.0, args.outage - (time.perf_counter() - since)))
+        outage_probes = manager.health.probes - outage_probes
+        outage_states = recorder.states_since(since)
+        since = time.perf_counter()
+        stub.set_offline(False)
+        results.append(('中断恢复 -> 已连接', recorder.wait_for(HEALTH_CONNECTED, since, 15)))
+        time.sleep(args.stable / 3)
+
+        # 无响应（请求发出后没有应答，只能靠超时发现）
+        since = time.perf_counter()
+        stub.latency = 30.0
+        results.append(('无响应 -> 重连中', recorder.wait_for(HEALTH_RECONNECTING, since, 20)))
+        since = time.perf_counter()
+        stub.latency = latency
+        results.append(('无响应恢复 -> 已连接', recorder.wait_for(HEALTH_CONNECTED, since, 15)))
+
+        # 命令失败立即触发探测
+        time.sleep(args.stable / 3)
+        since = time.perf_counter()
+        stub.set_offline(True)
+        manager.send_command('set_volume', {'volume': 40}, journal=False)
+        results.append(('命令失败 -> 重连中', recorder.wait_for(HEALTH_RECONNECTING, since, 15)))
+        stub.set_offline(False)
+
+        rtt, jitter = manager.health.rtt_ms(), manager.health.jitter_ms()
+        manager.close()
+
+    print(f"正常延迟 {args.latency:.0f}ms，尖峰 {args.spike:.0f}ms，中断 {args.outage:.0f}s")
+    for name, elapsed in results:
+        print(f"  {name:<14} {format_ms(elapsed)}")
+    print("探测次数（固定1秒心跳对比）:")
+    print(f"  稳定 {args.stable:.0f}s: {stable_probes} 次（固定心跳 {args.stable:.0f} 次）")
+    print(f"  有命令流量 {args.stable / 2:.0f}s: {busy_probes} 次")
+    print(f"  链路变差 5s: {spike_probes} 次")
+    print(f"  中断 {args.outage:.0f}s: {outage_probes} 次（离线后退避）")
+    print(f"中断期间状态: {' -> '.join(outage_states)}")
+    print(f"结束时 RTT {rtt:.1f}ms，抖动 {jitter:.1f}ms" if rtt is not None else "无RTT样本")
+
+
+if __name__ == '__main__':
+    main()
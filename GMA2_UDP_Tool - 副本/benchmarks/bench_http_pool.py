@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+连接池测试 - 对比持久化连接池与每次新建连接的命令吞吐量和延迟
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from connection_manager import ConnectionManager
+from stats import format_summary, summarize
+from stub_server import StubController
+
+
+def measure(send, count):
+    """依次发送count条命令，返回每条延迟与总耗时"""
+    samples = []
+    start = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        send()
+        samples.append(time.perf_counter() - t0)
+    return samples, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='连接池测试')
+    parser.add_argument('--count', type=int, default=500)
+    args = parser.parse_args()
+
+    payload = {'command': 'lights_control', 'data': {'action': 'full'}}
+
+    with StubController() as stub:
+        url = f"http://{stub.host}:{stub.port}/api/command"
+
+        # 原实现：每次调用模块级 requests.post
+        per_call = measure(lambda: requests.post(url, json=payload, timeout=10), args.count)
+
+        manager = ConnectionManager()
+        manager.set_server_address(stub.host, stub.port)
+        pooled = measure(lambda: manager.send_command('lights_control', {'action': 'full'}), args.count)
+        manager.close()
+
+    print(format_summary('每次新建', summarize(*per_call)))
+    print(format_summary('连接池', summarize(*pooled)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令耗时统计测试 - 对比启用/未启用统计时的单条命令开销，
+并在排队、超时混合的负载下输出一份统计快照
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_manager import ConnectionManager
+from instrumentation import Histogram, format_snapshot
+from stats import format_summary, summarize
+from stub_server import StubController
+
+
+def measure(manager, count):
+    samples = []
+    start = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        manager.send_command('lights_control', {'action': 'full'})
+        samples.append(time.perf_counter() - t0)
+    return samples, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='命令耗时统计测试')
+    parser.add_argument('--count', type=int, default=2000)
+    args = parser.parse_args()
+
+    histogram = Histogram()
+    t0 = time.perf_counter()
+    for i in range(100000):
+        histogram.record(i * 1e-6)
+    record_us = (time.perf_counter() - t0) / 100000 * 1e6
+    print(f"直方图记录一次 {record_us:.2f}us，p99误差 {abs(histogram.percentile(99) - 99000) / 990:.2f}%")
+
+    with StubController() as stub, tempfile.TemporaryDirectory() as data_dir:
+        manager = ConnectionManager(timeouts={'command': (1, 0.05)})
+        manager.set_server_address(stub.host, stub.port)
+        manager.test_connection()
+
+        measure(manager, 200)
+        disabled = summarize(*measure(manager, args.count))
+        manager.enable_instrumentation()
+        measure(manager, 200)
+        enabled = summarize(*measure(manager, args.count))
+        print(format_summary('未启用', disabled))
+        print(format_summary('已启用', enabled))
+        print(f"启用统计后单条命令p50变化 {(enabled['p50_ms'] - disabled['p50_ms']) * 1000:+.1f}us")
+
+        # 混合负载：异步排队、场景命令、少量超时
+        manager.instrumentation.reset()
+        done = threading.Semaphore(0)
+        for wave in range(4):
+            # 每波不超过调度队列容量
+            for i in range(50):
+                manager.send_command_async('lights_control', {'n': i}, lambda result: done.release())
+            manager.send_command_async('play_scene', {'scene_name': f'场景{wave}'}, lambda result: done.release())
+            for _ in range(51):
+                done.acquire()
+        stub.latency = 0.1
+        for _ in range(3):
+            manager.send_command('stop_scene')
+        stub.latency = 0.0
+
+        path = os.path.join(data_dir, 'command_stats.json')
+        manager.instrumentation.dump(path)
+        print(f"\n统计快照 {os.path.getsize(path)} 字节:")
+        print(format_snapshot(manager.instrumentation.snapshot()))
+        manager.close()
+
+
+if __name__ == '__main__':
+    main()
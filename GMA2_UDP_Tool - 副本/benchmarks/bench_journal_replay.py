@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线日志重发测试 - 模拟控制系统链路反复中断，检查命令不重复、按顺序送达，
+未送达的命令都是被之后的同组命令（或紧急停止）覆盖的，且过期的紧急停止不会被重发；
+重发进行中发出的新命令最后到达，不会被旧命令覆盖
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_journal import supersede_group
+from connection_manager import ConnectionManager
+from stub_server import StubController
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线日志重发测试')
+    parser.add_argument('--commands', type=int, default=60)
+    parser.add_argument('--flap', type=float, default=0.3, help='链路状态切换间隔（秒）')
+    args = parser.parse_args()
+
+    with StubController() as stub, tempfile.TemporaryDirectory() as data_dir:
+        manager = ConnectionManager(max_retries=0)
+        manager.set_server_address(stub.host, stub.port)
+        manager.enable_journal(os.path.join(data_dir, 'command_journal.log'), critical_max_age=0.5)
+
+        failed = []
+        critical = set()
+        commands = []
+        step = 0
+
+        def send(command):
+            nonlocal step
+            if command == 'emergency_stop':
+                critical.add(step)
+            commands.append(command)
+            if manager.send_command(command, {'step': step}) is None:
+                failed.append(step)
+            step += 1
+
+        # 第一阶段：链路反复中断期间持续发送命令
+        next_flap = time.monotonic() + args.flap
+        for i in range(args.commands):
+            if time.monotonic() >= next_flap:
+                stub.offline = not stub.offline
+                next_flap = time.monotonic() + args.flap
+                if not stub.offline:
+                    manager.test_connection()
+            send('emergency_stop' if i % 20 == 10 else ('lights_control', 'set_volume', 'play_scene')[i % 3])
+            time.sleep(0.02)
+
+        # 第二阶段：断网时按下紧急停止，等它过期后再恢复链路
+        stub.offline = True
+        send('lights_control')
+        stale_stop = step
+        send('emergency_stop')
+        time.sleep(0.6)
+        stub.offline = False
+        manager.test_connection()
+        if manager.replayer.thread:
+            manager.replayer.thread.join(5)
+
+        # 第三阶段：断网期间积压多条命令，恢复后重发较慢时操作人员发出新的灯光命令
+        stub.offline = True
+        for i in range(12):
+            send(('lights_control', 'set_volume', 'play_scene')[i % 3])
+        stub.offline = False
+        stub.latency = 0.05
+        manager.test_connection()
+        time.sleep(0.08)
+        live_step = step
+        send('lights_control')
+        if manager.replayer.thread:
+            manager.replayer.thread.join(5)
+        remaining = len(manager.journal.entries())
+        manager.close()
+
+        received = [body for _, path, body in stub.requests if path == '/api/command']
+
+    steps = [body['data']['step'] for body in received]
+    delivered = set(steps)
+    duplicates = len(steps) - len(delivered)
+    # 同组命令按发出顺序送达（重发的旧命令不会晚于新命令到达）
+    out_of_order = []
+    last = {}
+    for s in steps:
+        group = supersede_group(commands[s])
+        if s < last.get(group, -1):
+            out_of_order.append(s)
+        last[group] = max(s, last.get(group, -1))
+    # 写入日志后过期的紧急停止允许丢弃；其余未送达的命令必须已被之后的同组命令或紧急停止覆盖
+    expired = critical.intersection(failed) - delivered
+    superseded = [s for s in failed if s not in delivered and s not in expired]
+    missing = [s for s in set(range(step)) - delivered - expired
+               if s not in failed or not any(commands[later] == 'emergency_stop'
+                                              or supersede_group(commands[later]) == supersede_group(commands[s])
+                                              for later in range(s + 1, step))]
+    replayed = [s for s in steps if s in failed]
+    live_last = [s for s in steps if commands[s] == 'lights_control'][-1] == live_step
+    print(f"发送 {step} 条，首次失败并写入日志 {len(failed)} 条，重发送达 {len(replayed)} 条，"
+          f"被新命令覆盖 {len(superseded)} 条，日志剩余 {remaining} 条")
+    print(f"重复送达 {duplicates} 条，丢失 {sorted(missing)}，同组乱序 {out_of_order}")
+    print(f"过期丢弃的紧急停止 {sorted(expired)}，断网时按下的紧急停止被重发: {stale_stop in steps}")
+    print(f"重发期间发出的灯光命令最后到达: {live_last}")
+    if duplicates or missing or out_of_order or stale_stop in steps or not live_last:
+        sys.exit('离线日志重发检查失败')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控界面测试 - 无界面模拟20Hz刷新：每帧写入命令结果和状态、采样并重绘折线，
+统计每帧耗时与垃圾回收次数/停顿，并与每帧重建绘图指令的做法对比
+运行方式: KIVY_GL_BACKEND=mock KIVY_NO_ARGS=1 python benchmarks/bench_monitor.py
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+from kivy.graphics import Color, Line
+
+from monitor_screen import MetricRow
+from stats import percentile
+from telemetry import Telemetry
+
+
+class GcWatch:
+    """统计垃圾回收次数和停顿时间"""
+
+    def __init__(self):
+        self.collections = 0
+        self.pauses = []
+        self.started = 0.0
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self.started = time.perf_counter()
+        else:
+            self.collections += 1
+            self.pauses.append(time.perf_counter() - self.started)
+
+
+def build_rows(telemetry):
+    series = telemetry.series
+    rows = [
+        MetricRow('命令延迟', series['latency_ms'], '{:.1f} ms', (0, 0.8, 1, 1), lo=0),
+        MetricRow('错误率', series['error_rate'], '{:.0%}', (1, 0.3, 0.3, 1), lo=0, hi=1),
+        MetricRow('连接状态', series['connected'], '{:.0f}', (0, 1, 0, 1), lo=0, hi=1),
+        MetricRow('在线设备', series['devices_online'], '{:.0f}', (1, 0.8, 0, 1), lo=0),
+    ]
+    for row in rows:
+        row.size = (800, 100)
+        row.sparkline.size = (600, 100)
+    return rows
+
+
+def redraw_in_place(rows):
+    for row in rows:
+        row.redraw()
+
+
+def redraw_rebuild(rows):
+    """对比做法：每帧清空画布，按样本列表重新创建绘图指令"""
+    for row in rows:
+        sparkline = row.sparkline
+        values = list(sparkline.buffer.data)
+        hi = max(values) or 1.0
+        step = sparkline.width / (len(values) - 1)
+        points = []
+        for i, value in enumerate(values):
+            points.extend([sparkline.x + i * step, sparkline.y + value / hi * sparkline.height])
+        sparkline.canvas.clear()
+        with sparkline.canvas:
+            Color(0, 1, 0, 1)
+            Line(points=points, width=1.2)
+
+
+def run(redraw, frames, commands_per_frame):
+    telemetry = Telemetry()
+    rows = build_rows(telemetry)
+    status = {'type': 'status', 'data': {'devices': {f'dev{i}': 'online' for i in range(12)}}}
+
+    watch = GcWatch()
+    gc.collect()
+    gc.callbacks.append(watch)
+    samples = []
+    try:
+        for frame in range(frames):
+            t0 = time.perf_counter()
+            for i in range(commands_per_frame):
+                telemetry.record_command('lights_control', 0.002 + (frame % 7) * 0.001, None if i == 0 and frame % 10 == 0 else {})
+            telemetry.record_status(status)
+            telemetry.tick()
+            redraw(rows)
+            samples.append(time.perf_counter() - t0)
+    finally:
+        gc.callbacks.remove(watch)
+    return samples, watch
+
+
+def report(name, samples, watch):
+    print(f"{name:>6}: 每帧 p50={percentile(samples, 50) * 1000:.3f}ms "
+          f"p99={percentile(samples, 99) * 1000:.3f}ms max={max(samples) * 1000:.3f}ms, "
+          f"GC {watch.collections} 次, 最长停顿 {max(watch.pauses, default=0) * 1000:.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='监控界面刷新测试')
+    parser.add_argument('--seconds', type=int, default=60, help='模拟的运行时长（20Hz）')
+    parser.add_argument('--commands', type=int, default=10, help='每帧写入的命令结果数')
+    args = parser.parse_args()
+
+    frames = args.seconds * 20
+    report('原地更新', *run(redraw_in_place, frames, args.commands))
+    report('每帧重建', *run(redraw_rebuild, frames, args.commands))
+    print(f"20Hz帧预算 50ms，共 {frames} 帧")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景预备/GO测试 - 模拟控制系统加载场景需要一段时间，
+比较按下播放时直接发送play_scene与选中时预备、播放时只发GO的延迟
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_manager import ConnectionManager
+from scene_arm import ARM_ARMED, SceneArmer
+from stats import format_summary, summarize
+from stub_server import StubController
+
+
+def main():
+    parser = argparse.ArgumentParser(description='场景预备/GO测试')
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=5.0, help='网络往返延迟（毫秒）')
+    parser.add_argument('--load-time', type=float, default=200.0, help='控制系统加载场景的耗时（毫秒）')
+    args = parser.parse_args()
+
+    with StubController(latency=args.latency / 1000) as stub:
+        stub.load_time = args.load_time / 1000
+        manager = ConnectionManager()
+        manager.set_server_address(stub.host, stub.port)
+        manager.test_connection()
+        manager.prewarm_critical()
+
+        armed = threading.Event()
+        armer = SceneArmer(manager, on_change=lambda state, name: armed.set() if state == ARM_ARMED else None)
+        scenes = [{'id': i, 'name': f'场景{i:04d}'} for i in range(args.rounds)]
+
+        # 直接播放：解析和加载都在按下播放之后
+        samples = []
+        start = time.perf_counter()
+        for scene in scenes:
+            t0 = time.perf_counter()
+            manager.send_command_async('play_scene', {'scene_name': scene['name']}).result()
+            samples.append(time.perf_counter() - t0)
+        direct = summarize(samples, time.perf_counter() - start)
+
+        def two_phase(dwell):
+            samples = []
+            start = time.perf_counter()
+            for scene in scenes:
+                armed.clear()
+                armer.arm(scene)
+                if dwell:
+                    # 操作员选中场景后停留，预备在此期间完成
+                    armed.wait(5)
+                t0 = time.perf_counter()
+                result = armer.go().result()
+                samples.append(time.perf_counter() - t0)
+                assert result and result.get('command') == 'go', result
+            return summarize(samples, time.perf_counter() - start)
+
+        dwell = two_phase(True)
+        immediate = two_phase(False)
+
+        # 快速切换选择：只有最后一个场景保持预备，其余都已取消
+        before = sum(1 for _, path, body in stub.requests if body and body.get('command') == 'arm_scene')
+        armed.clear()
+        for scene in scenes[:10]:
+            armer.arm(scene)
+        armed.wait(5)
+        time.sleep(args.load_time / 1000 + 0.1)
+        sent = sum(1 for _, path, body in stub.requests if body and body.get('command') == 'arm_scene') - before
+        leftover = dict(stub.armed)
+        armer.close()
+        manager.close()
+
+    print(f"网络延迟 {args.latency:.0f}ms，场景加载 {args.load_time:.0f}ms")
+    print(format_summary('直接播放', direct))
+    print(format_summary('预备完成后GO', dwell))
+    print(format_summary('选中后立即GO', immediate))
+    print(f"连续切换10个场景: 实际发出预备请求 {sent} 个，控制系统上保留的预备 {len(leftover)} 个")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景素材预取测试 - 模拟控制系统提供2000个场景的缩略图（PNG约13KB）和预览信息，带网络延迟：
+    可见缩略图出现时间：首屏、跳到第1000行、快速滑动后停下的位置
+    冷启动（全部下载）/ 热启动（磁盘缓存）/ 缓存上限较小时的淘汰
+    内存：保留的纹理数量和像素数据大小，--memory 时记录Python堆峰值（tracemalloc，会拖慢各项耗时）
+    界面线程每帧用于上传纹理的耗时（模拟60fps帧循环，纹理创建用复制像素数据代替）
+对比：简单实现按目录顺序用线程池下载并解码全部缩略图、全部保留
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KCFG_KIVY_LOG_LEVEL', 'warning')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asset_cache import AssetCache
+from connection_manager import ConnectionManager
+from scene_assets import THUMBNAIL, AssetPrefetcher, TextureUploader, asset_path, decode_thumbnail
+from scene_catalog import scene_key
+from stub_server import StubController, make_scenes, make_thumbnail
+
+VISIBLE_ROWS = 8
+LOOKAHEAD = 20
+MB = 1024 * 1024
+
+
+class FrameLoop:
+    """模拟界面线程：每帧执行上一帧期间投递的回调，记录每帧回调耗时"""
+
+    def __init__(self, fps=60):
+        self.interval = 1.0 / fps
+        self.lock = threading.Lock()
+        self.pending = []
+        self.frame_times = []
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def schedule(self, func, *args):
+        with self.lock:
+            self.pending.append((func, args))
+
+    def _run(self):
+        next_frame = time.perf_counter()
+        while self.running:
+            next_frame += self.interval
+            with self.lock:
+                batch, self.pending = self.pending, []
+            if batch:
+                started = time.perf_counter()
+                for func, args in batch:
+                    func(*args)
+                self.frame_times.append(time.perf_counter() - started)
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+
+def trace_peak(args):
+    """结束tracemalloc，返回显示用的Python堆峰值"""
+    if not args.memory:
+        return ''
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return f"，Python堆峰值 {peak / MB:.1f}MB"
+
+
+def fake_texture(image):
+    """代替GPU纹理：复制同样大小的RGBA像素（上传成本），只保留尺寸"""
+    bytes(image.width * image.height * 4)
+    return image.width, image.height
+
+
+def texture_bytes(textures):
+    return sum(width * height * 4 for width, height in textures)
+
+
+def window(keys, first):
+    """从first行开始的可见行和前后附近的行"""
+    last = first + VISIBLE_ROWS
+    return keys[first:last], keys[last:last + LOOKAHEAD] + keys[max(0, first - LOOKAHEAD):first]
+
+
+def wait_visible(uploader, visible, timeout=30.0):
+    """等待可见行的缩略图全部上传，返回耗时（秒）"""
+    started = time.perf_counter()
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        with uploader.lock:
+            if all(key in uploader.textures for key in visible):
+                return time.perf_counter() - started
+        time.sleep(0.001)
+    return float('inf')
+
+
+def run_pipeline(stub, scenes, cache_dir, args, label, scroll=True):
+    manager = ConnectionManager()
+    manager.set_server_address(stub.host, stub.port)
+    frames = FrameLoop()
+    uploader = TextureUploader(frames.schedule, per_frame=args.per_frame, create=fake_texture)
+    cache = AssetCache(cache_dir, max_bytes=args.cache_mb * 1024 * 1024)
+    prefetcher = AssetPrefetcher(manager, cache, uploader, workers=args.workers)
+    keys = [scene_key(scene) for scene in scenes]
+
+    if args.memory:
+        tracemalloc.start()
+    results = []
+    started = time.perf_counter()
+    prefetcher.start()
+    prefetcher.set_scenes(scenes)
+    prefetcher.set_visible(*window(keys, 0))
+    results.append(('首屏', wait_visible(uploader, keys[:VISIBLE_ROWS])))
+
+    if scroll:
+        prefetcher.set_visible(*window(keys, 1000))
+        results.append(('跳到第1000行', wait_visible(uploader, keys[1000:1000 + VISIBLE_ROWS])))
+        # 快速滑动：每帧前进8行，从第1400行滑到第1600行后停下
+        for first in range(1400, 1600, VISIBLE_ROWS):
+            prefetcher.set_visible(*window(keys, first))
+            time.sleep(1 / 60)
+        prefetcher.set_visible(*window(keys, 1600))
+        results.append(('滑动后停在第1600行', wait_visible(uploader, keys[1600:1600 + VISIBLE_ROWS])))
+
+    # 等待后台预取完成（全部缩略图和预览信息在磁盘缓存中）
+    while True:
+        with prefetcher.cond:
+            idle = not prefetcher.queued and len(prefetcher.previews) == len(scenes)
+        if idle:
+            break
+        time.sleep(0.01)
+    total = time.perf_counter() - started
+    peak = trace_peak(args)
+
+    prefetcher.stop()
+    frames.stop()
+    manager.close()
+    with uploader.lock:
+        held = list(uploader.textures.values())
+
+    print(f"{label}:")
+    for name, elapsed in results:
+        print(f"  {name:>10}: 可见缩略图 {elapsed * 1000:.0f}ms")
+    frame_ms = sorted(t * 1000 for t in frames.frame_times)
+    print(f"  全部预取完成 {total:.2f}s，下载 {prefetcher.downloads} 个共 {prefetcher.downloaded_bytes / MB:.1f}MB，"
+          f"解码 {prefetcher.decoded}，失败 {prefetcher.failures}")
+    print(f"  磁盘缓存 {cache.size() / MB:.1f}MB / 上限 {args.cache_mb}MB，淘汰 {cache.evictions}")
+    print(f"  保留纹理 {len(held)} 张 {texture_bytes(held) / MB:.1f}MB{peak}")
+    if frame_ms:
+        print(f"  上传纹理的帧 {len(frame_ms)} 个，每帧耗时 p50={frame_ms[len(frame_ms) // 2]:.2f}ms "
+              f"max={frame_ms[-1]:.2f}ms")
+
+
+def run_naive(stub, scenes, args):
+    """按目录顺序下载并解码全部缩略图，全部保留"""
+    manager = ConnectionManager(pool_size=args.workers)
+    manager.set_server_address(stub.host, stub.port)
+    keys = [scene_key(scene) for scene in scenes]
+    done = {}
+    images = {}
+
+    def load(scene):
+        data = manager.fetch_asset(asset_path(scene, THUMBNAIL))
+        image = decode_thumbnail(data)
+        images[scene_key(scene)] = image
+        done[scene_key(scene)] = time.perf_counter()
+
+    if args.memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.workers) as pool:
+        list(pool.map(load, scenes))
+    total = time.perf_counter() - started
+    peak = trace_peak(args)
+    manager.close()
+
+    def visible_at(first):
+        return max(done[key] for key in keys[first:first + VISIBLE_ROWS]) - started
+
+    held = sum(image.width * image.height * 4 for image in images.values())
+    print("简单实现（按目录顺序下载并解码全部）:")
+    print(f"  {'首屏':>10}: 可见缩略图 {visible_at(0) * 1000:.0f}ms")
+    print(f"  {'第1000行':>10}: 从开始算 {visible_at(1000) * 1000:.0f}ms")
+    print(f"  {'第1600行':>10}: 从开始算 {visible_at(1600) * 1000:.0f}ms")
+    print(f"  全部完成 {total:.2f}s（不含预览信息），保留像素数据 {held / MB:.1f}MB{peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='场景素材预取测试')
+    parser.add_argument('--scenes', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=20.0, help='控制系统响应延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=10.0, help='响应延迟抖动上限（毫秒）')
+    parser.add_argument('--workers', type=int, default=4, help='下载线程数')
+    parser.add_argument('--per-frame', type=int, default=4, help='每帧最多上传的纹理数')
+    parser.add_argument('--cache-mb', type=int, default=64, help='磁盘缓存上限（MB）')
+    parser.add_argument('--skip-naive', action='store_true')
+    parser.add_argument('--memory', action='store_true', help='用tracemalloc记录Python堆峰值')
+    args = parser.parse_args()
+
+    scenes = make_scenes(args.scenes)
+    # 预先生成缩略图，测试中不计入模拟控制系统的生成耗时
+    thumbnails = [make_thumbnail(i) for i in range(64)]
+    cache_dir = tempfile.mkdtemp(prefix='scene_assets_')
+    print(f"{args.scenes} 个场景，控制系统延迟 {args.latency:.0f}±{args.jitter:.0f}ms，"
+          f"{args.workers} 个下载线程，每帧上传 {args.per_frame} 张，可见 {VISIBLE_ROWS} 行")
+    try:
+        with StubController(latency=args.latency / 1000, jitter=args.jitter / 1000, scenes=scenes) as stub:
+            stub.thumbnails = {i: thumbnails[i % len(thumbnails)] for i in range(args.scenes)}
+            if not args.skip_naive:
+                run_naive(stub, scenes, args)
+            run_pipeline(stub, scenes, cache_dir, args, '预取管线（冷启动）')
+            run_pipeline(stub, scenes, cache_dir, args, '预取管线（热启动，磁盘缓存）', scroll=False)
+            small = os.path.join(cache_dir, 'small')
+            args.cache_mb = 8
+            run_pipeline(stub, scenes, small, args, '预取管线（缓存上限8MB）', scroll=False)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景目录启动测试 - 对比有无本地缓存时场景列表可用所需时间
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_manager import ConnectionManager
+from scene_catalog import SceneCatalog
+from stub_server import StubController, make_scenes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='场景目录启动测试')
+    parser.add_argument('--scenes', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.1, help='服务器响应延迟（秒）')
+    args = parser.parse_args()
+
+    with StubController(latency=args.latency, scenes=make_scenes(args.scenes)) as stub, \
+            tempfile.TemporaryDirectory() as cache_dir:
+        manager = ConnectionManager()
+        manager.set_server_address(stub.host, stub.port)
+
+        # 无缓存：必须等待网络返回完整目录
+        t0 = time.perf_counter()
+        catalog = SceneCatalog(manager, cache_dir)
+        catalog.load_cached()
+        catalog.refresh()
+        uncached = time.perf_counter() - t0
+
+        # 有缓存：读取本地文件即可显示，网络刷新在后台进行
+        t0 = time.perf_counter()
+        catalog = SceneCatalog(manager, cache_dir)
+        catalog.load_cached()
+        cached = time.perf_counter() - t0
+        ready = len(catalog.scenes)
+
+        t0 = time.perf_counter()
+        diff = catalog.refresh()
+        revalidate = time.perf_counter() - t0
+        manager.close()
+
+    print(f"{args.scenes} 个场景，服务器延迟 {args.latency * 1000:.0f}ms")
+    print(f"无缓存可用时间: {uncached * 1000:.1f}ms")
+    print(f"有缓存可用时间: {cached * 1000:.1f}ms（{ready} 个场景）")
+    print(f"后台校验(ETag): {revalidate * 1000:.1f}ms，变化: {diff}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景列表测试 - 无界面构建并滚动大量场景，对比每场景一个按钮与虚拟化列表
+运行方式: KIVY_GL_BACKEND=mock KIVY_NO_ARGS=1 python benchmarks/bench_scene_list.py
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+from kivy.clock import Clock
+from kivy.metrics import dp
+from kivy.uix.button import Button
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.scrollview import ScrollView
+
+from scene_list import SceneListView
+
+
+def make_scenes(count):
+    return [{'id': i, 'name': f'场景{i:05d}', 'description': f'第{i}个测试场景'} for i in range(count)]
+
+
+def build_buttons(scenes):
+    """原实现：每个场景一个按钮"""
+    scroll = ScrollView(size=(400, 800), size_hint=(None, None))
+    grid = GridLayout(cols=1, spacing=dp(5), size_hint_y=None)
+    grid.bind(minimum_height=grid.setter('height'))
+    for scene in scenes:
+        btn = Button(
+            text=f"{scene['name']}\n{scene['description']}",
+            size_hint_y=None,
+            height=dp(80),
+            halign='center',
+            valign='middle'
+        )
+        btn.bind(size=btn.setter('text_size'))
+        btn.bind(on_press=lambda x, s=scene: None)
+        grid.add_widget(btn)
+    scroll.add_widget(grid)
+    return scroll
+
+
+def build_recycled(scenes):
+    """虚拟化列表"""
+    view = SceneListView(size=(400, 800), size_hint=(None, None))
+    view.set_scenes(scenes)
+    return view
+
+
+def run(build, scenes, steps):
+    """构建并滚动，返回(构建耗时, 滚动耗时)"""
+    t0 = time.perf_counter()
+    view = build(scenes)
+    Clock.tick()
+    built = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for step in range(steps):
+        view.scroll_y = 1.0 - step / (steps - 1)
+        Clock.tick()
+    return built, time.perf_counter() - t0
+
+
+def measure(name, build, scenes, steps):
+    # 计时与内存分开测量，避免tracemalloc影响耗时
+    built, scrolled = run(build, scenes, steps)
+
+    tracemalloc.start()
+    run(build, scenes, 2)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:>8}: 构建 {built * 1000:.0f}ms, 滚动 {steps} 步 {scrolled * 1000:.0f}ms "
+          f"(每步 {scrolled / steps * 1000:.2f}ms), 峰值内存 {peak / 1024 / 1024:.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='场景列表测试')
+    parser.add_argument('--scenes', type=int, default=5000)
+    parser.add_argument('--steps', type=int, default=200, help='滚动步数')
+    parser.add_argument('--skip-buttons', action='store_true', help='跳过每场景一个按钮的对比')
+    args = parser.parse_args()
+
+    scenes = make_scenes(args.scenes)
+    print(f"{args.scenes} 个场景")
+    if not args.skip_buttons:
+        measure('逐个按钮', build_buttons, scenes, args.steps)
+    measure('虚拟化', build_recycled, scenes, args.steps)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景搜索测试 - 1万个中文场景的索引构建、查询与增量更新耗时
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scene_search import SceneSearchIndex
+from stats import percentile
+
+WORDS = ['开场', '音乐', '主持人', '介绍', '节目', '表演', '互动', '环节', '结束', '致谢',
+         '灯光', '舞台', '烟花', '合唱', '舞蹈', '朗诵', '视频', '倒计时', '谢幕', '抽奖']
+
+
+def make_scenes(count, rng):
+    scenes = []
+    for i in range(count):
+        name = ''.join(rng.sample(WORDS, 2)) + str(i)
+        description = '、'.join(rng.sample(WORDS, 3))
+        scenes.append({'id': i, 'name': name, 'description': description})
+    return scenes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='场景搜索测试')
+    parser.add_argument('--scenes', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    scenes = make_scenes(args.scenes, rng)
+
+    index = SceneSearchIndex()
+    t0 = time.perf_counter()
+    index.build(scenes)
+    print(f"{args.scenes} 个场景，索引构建 {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+    queries = ['开', '开场', '灯光舞', 'dg', 'dgwt', '表演12', '123', '倒计时99', '不存在']
+    for query in queries:
+        samples = []
+        for _ in range(args.rounds):
+            t0 = time.perf_counter()
+            results = index.search(query)
+            samples.append(time.perf_counter() - t0)
+        print(f"  {query:<8} 命中 {len(results):>5}  p50={percentile(samples, 50) * 1000:.2f}ms "
+              f"p99={percentile(samples, 99) * 1000:.2f}ms")
+
+    changed = [dict(scene, name=scene['name'] + '改') for scene in scenes[:100]]
+    t0 = time.perf_counter()
+    index.apply_changes({'added': [], 'changed': changed, 'removed': []})
+    print(f"增量更新 100 个场景 {(time.perf_counter() - t0) * 1000:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
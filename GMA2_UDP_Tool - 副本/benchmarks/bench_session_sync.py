@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多设备会话同步测试 - 多个无界面客户端连接本地模拟会话中心，同时随机拖动音量滑块、选择场景：
+    其他设备看到场景选择的传播延迟、每条增量的字节数
+    按概率丢弃增量（序号缺口 -> 请求快照）、中途断开全部连接（重连补发）后，所有设备与会话一致
+    控制系统 /api/status 请求数：会话中心统一轮询 vs 每台平板各自轮询
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_manager import ConnectionManager
+from session_hub import StubSessionHub
+from session_sync import SESSION_SELECTED_SCENE, SESSION_STATUS, SESSION_VOLUME, SessionSync
+from stats import format_summary, summarize
+from stub_server import StubController
+
+FIELDS = (SESSION_SELECTED_SCENE, SESSION_VOLUME)
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+class Tablet:
+    """无界面客户端：记录收到每个场景选择的时间"""
+
+    def __init__(self, index, hub, session):
+        self.index = index
+        self.seen = {}
+        self.statuses = 0
+        self.sync = SessionSync(hub.host, hub.port, session, client_id=f'tablet{index}', on_change=self.on_change)
+
+    def on_change(self, field, value):
+        if field == SESSION_SELECTED_SCENE:
+            self.seen.setdefault(value, time.perf_counter())
+        elif field == SESSION_STATUS:
+            self.statuses += 1
+
+    def drive(self, rng, duration, published):
+        """随机操作：拖动音量滑块（连续多个值）或选择场景"""
+        deadline = time.perf_counter() + duration
+        count = 0
+        while time.perf_counter() < deadline:
+            if rng.random() < 0.5:
+                volume = rng.randint(0, 100)
+                for _ in range(rng.randint(5, 20)):
+                    volume = max(0, min(100, volume + rng.randint(-5, 5)))
+                    self.sync.publish(SESSION_VOLUME, volume)
+                    time.sleep(0.01)
+            else:
+                count += 1
+                scene = f'tablet{self.index}-scene{count}'
+                published[scene] = (self.index, time.perf_counter())
+                self.sync.publish(SESSION_SELECTED_SCENE, scene)
+            time.sleep(rng.uniform(0.05, 0.3))
+
+
+def converged(hub, session, tablets):
+    state = hub.get_session(session).state
+    return all(tablet.sync.get(field) == state.get(field) for tablet in tablets for field in FIELDS)
+
+
+def run_sync(args):
+    with StubSessionHub(drop_rate=args.drop_rate) as hub:
+        tablets = [Tablet(i, hub, 'bench') for i in range(args.clients)]
+        for tablet in tablets:
+            tablet.sync.start()
+        wait_until(lambda: hub.client_count() == args.clients)
+
+        published = {}
+        rngs = [random.Random(i) for i in range(args.clients)]
+        threads = [threading.Thread(target=tablet.drive, args=(rng, args.duration, published), daemon=True)
+                   for tablet, rng in zip(tablets, rngs)]
+        for thread in threads:
+            thread.start()
+        # 中途断开所有连接，设备重连后补发缺失的增量
+        time.sleep(args.duration / 2)
+        hub.disconnect_all()
+        for thread in threads:
+            thread.join()
+        ok = wait_until(lambda: converged(hub, 'bench', tablets), 10)
+
+        latencies = []
+        for scene, (origin, sent) in published.items():
+            for tablet in tablets:
+                if tablet.index != origin and scene in tablet.seen:
+                    latencies.append(tablet.seen[scene] - sent)
+        state = hub.get_session('bench').state
+        mismatched = [(tablet.index, {field: tablet.sync.get(field) for field in FIELDS})
+                      for tablet in tablets if not ok]
+        received = sum(tablet.sync.messages_in for tablet in tablets)
+        received_bytes = sum(tablet.sync.bytes_in for tablet in tablets)
+        sent = sum(tablet.sync.messages_out for tablet in tablets)
+        gaps = sum(tablet.sync.gaps for tablet in tablets)
+        snapshots = sum(tablet.sync.snapshots for tablet in tablets)
+        for tablet in tablets:
+            tablet.sync.stop()
+
+    print(f"{args.clients} 台设备，{args.duration:.0f}s 随机操作，丢弃增量概率 {args.drop_rate:.0%}，中途断开一次")
+    print(format_summary('场景选择传播', summarize(latencies, sum(latencies))))
+    print(f"会话中心: {hub.deltas} 条增量，平均 {hub.delta_bytes / max(1, hub.delta_frames):.0f} 字节/帧，"
+          f"丢弃 {hub.dropped}，重连补发 {hub.replayed}，快照 {hub.snapshots}")
+    print(f"设备: 发送 {sent} 条修改，收到 {received} 条消息共 {received_bytes} 字节，序号缺口 {gaps}，快照 {snapshots}")
+    print(f"全部设备与会话一致: {ok}  会话状态 {state}")
+    for index, values in mismatched:
+        print(f"  设备{index}: {values}")
+
+
+def run_polling(args):
+    """控制系统状态：每台平板按同一间隔各自轮询 vs 会话中心统一轮询后转发"""
+    with StubController(latency=0.005) as stub:
+        managers = [ConnectionManager() for _ in range(args.clients)]
+        for manager in managers:
+            manager.set_server_address(stub.host, stub.port)
+        running = True
+
+        def poll(manager):
+            while running:
+                manager.get_status()
+                time.sleep(args.poll)
+
+        threads = [threading.Thread(target=poll, args=(manager,), daemon=True) for manager in managers]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.poll_duration)
+        running = False
+        for thread in threads:
+            thread.join()
+        independent = stub.count('/api/status')
+        for manager in managers:
+            manager.close()
+
+    with StubController(latency=0.005) as stub:
+        with StubSessionHub(controller=(stub.host, stub.port), poll_interval=args.poll) as hub:
+            tablets = [Tablet(i, hub, 'bench') for i in range(args.clients)]
+            for tablet in tablets:
+                tablet.sync.start()
+            wait_until(lambda: hub.client_count() == args.clients)
+            before = stub.count('/api/status')
+            stub.apply('set_volume', {'volume': 10})
+            # 控制系统状态变化经会话中心转发到所有设备
+            t0 = time.perf_counter()
+            delivered = wait_until(lambda: all(
+                (tablet.sync.get(SESSION_STATUS) or {}).get('volume') == 10 for tablet in tablets), 5)
+            relay = time.perf_counter() - t0
+            time.sleep(max(0.0, args.poll_duration - relay))
+            shared = stub.count('/api/status') - before
+            for tablet in tablets:
+                tablet.sync.stop()
+
+    print(f"控制系统状态 {args.poll_duration:.0f}s、轮询间隔 {args.poll}s、{args.clients} 台设备: "
+          f"各自轮询 {independent} 次请求，会话中心统一轮询 {shared} 次")
+    print(f"  状态变化转发到全部设备: {delivered}，{relay * 1000:.0f}ms（受轮询间隔限制）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多设备会话同步测试')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='随机操作时长（秒）')
+    parser.add_argument('--drop-rate', type=float, default=0.02, help='会话中心丢弃增量的概率')
+    parser.add_argument('--poll', type=float, default=0.5, help='控制系统状态轮询间隔（秒）')
+    parser.add_argument('--poll-duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    run_sync(args)
+    run_polling(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滑块拖动测试 - 统计一次拖动产生的请求数，并检查最终值是否送达
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_manager import ConnectionManager
+from stub_server import StubController
+
+
+def drag(manager, events, duration):
+    """在duration秒内从0拖到100，产生events个滑块值事件"""
+    for i in range(events):
+        value = 100.0 * i / (events - 1)
+        manager.send_continuous('volume', 'set_volume', {'volume': int(value)})
+        time.sleep(duration / events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='滑块拖动测试')
+    parser.add_argument('--events', type=int, default=200, help='一次拖动的滑块事件数')
+    parser.add_argument('--duration', type=float, default=2.0, help='拖动时长（秒）')
+    parser.add_argument('--rate', type=float, default=10.0, help='每个参数每秒最多发送次数')
+    parser.add_argument('--latency', type=float, default=0.02, help='服务器响应延迟（秒）')
+    args = parser.parse_args()
+
+    with StubController(latency=args.latency) as stub:
+        manager = ConnectionManager(continuous_rate=args.rate)
+        manager.set_server_address(stub.host, stub.port)
+
+        drag(manager, args.events, args.duration)
+        # 等待最后一个值送达
+        deadline = time.monotonic() + 2.0
+        while manager.continuous.value('volume') != {'volume': 100} and time.monotonic() < deadline:
+            time.sleep(0.01)
+        manager.close()
+
+        volumes = [body['data']['volume'] for _, path, body in stub.requests if path == '/api/command']
+        sequences = [body['data']['seq'] for _, path, body in stub.requests if path == '/api/command']
+
+    print(f"滑块事件 {args.events} 个，收到请求 {len(volumes)} 个（上限 {args.rate:.0f} 次/秒）")
+    print(f"最终值: {volumes[-1] if volumes else None}，序号递增: {sequences == sorted(sequences)}")
+    if not volumes or volumes[-1] != 100:
+        sys.exit('最终值未送达')
+
+
+if __name__ == '__main__':
+    main()
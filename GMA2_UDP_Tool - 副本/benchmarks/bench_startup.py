@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时测试 - 无界面测量模块导入、应用构建、登录后创建子系统和首次创建主控制界面的耗时
+每轮在新的子进程中运行，保证是冷启动导入
+运行方式: python benchmarks/bench_startup.py [--rounds 5] [--baseline 上次结果.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程中执行的测量脚本
+PROBE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import controller_app
+t1 = time.perf_counter()
+app = controller_app.MobileControllerApp()
+# 不进入事件循环，手动登记为运行中的应用
+controller_app.App._running_app = app
+app.root = app.build()
+t2 = time.perf_counter()
+loaded = sorted(m for m in ('requests', 'websocket', 'urllib3') if m in sys.modules)
+deferred = sorted(m for m in ('discovery', 'macros', 'timeline', 'session_sync', 'scene_assets',
+                              'scene_catalog', 'state_mirror') if m in sys.modules)
+# 登录成功后创建的子系统和主控制界面
+app.start_services()
+t3 = time.perf_counter()
+app.get_screen('main_control')
+t4 = time.perf_counter()
+print(json.dumps({'import_ms': (t1 - t0) * 1000, 'build_ms': (t2 - t1) * 1000,
+                  'services_ms': (t3 - t2) * 1000, 'main_screen_ms': (t4 - t3) * 1000,
+                  'eager_network_modules': loaded, 'eager_subsystems': deferred}))
+'''
+
+
+def probe():
+    with tempfile.TemporaryDirectory() as config_dir:
+        env = dict(os.environ)
+        env.setdefault('KIVY_GL_BACKEND', 'mock')
+        env.setdefault('KIVY_NO_ARGS', '1')
+        env.setdefault('KIVY_NO_CONSOLELOG', '1')
+        # 使用空的用户数据目录，模拟首次安装后的冷启动
+        env['XDG_CONFIG_HOME'] = config_dir
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE], cwd=APP_DIR, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动耗时测试')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--baseline', help='对比用的历史结果文件')
+    parser.add_argument('--output', help='保存本次结果的文件')
+    args = parser.parse_args()
+
+    samples = [probe() for _ in range(args.rounds)]
+    result = {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ('import_ms', 'build_ms', 'services_ms', 'main_screen_ms')
+    }
+    result['eager_network_modules'] = samples[-1]['eager_network_modules']
+    result['eager_subsystems'] = samples[-1]['eager_subsystems']
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    for key in ('import_ms', 'build_ms', 'services_ms', 'main_screen_ms'):
+        line = f"{key:>15}: {result[key]:.1f}ms"
+        if baseline and key in baseline:
+            line += f"（基线 {baseline[key]:.1f}ms，变化 {result[key] - baseline[key]:+.1f}ms）"
+        print(line)
+    print(f"启动时已加载的网络库: {result['eager_network_modules'] or '无'}")
+    print(f"登录前已加载的子系统: {result['eager_subsystems'] or '无'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
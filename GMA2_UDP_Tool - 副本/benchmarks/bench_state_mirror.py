@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+状态镜像测试 - 模拟控制系统带网络延迟和状态推送：
+    本地状态可见延迟：乐观更新 vs 等待命令应答 vs 等待状态推送
+    被拒绝的命令回滚、晚到的旧状态被丢弃
+    另一台设备同时操作时，随机命令序列结束后本地镜像与控制系统状态一致
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_registry import LIGHT_ACTIONS
+from connection_manager import ConnectionManager
+from state_mirror import MIRROR_FIELDS, StateMirror
+from state_store import CURRENT_SCENE, StateStore
+from stats import format_summary, summarize
+from stub_server import StubController
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.001)
+    return False
+
+
+def random_command(rng, index):
+    kind = rng.random()
+    if kind < 0.4:
+        return 'play_scene', {'scene_name': f'场景{index:04d}'}
+    if kind < 0.7:
+        return 'lights_control', {'action': rng.choice(LIGHT_ACTIONS)}
+    if kind < 0.9:
+        return 'set_volume', {'volume': rng.randint(0, 100)}
+    return 'stop_scene', {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='状态镜像测试')
+    parser.add_argument('--latency', type=float, default=50.0, help='控制系统响应延迟（毫秒）')
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--ops', type=int, default=300, help='一致性测试的随机命令数')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with StubController(latency=args.latency / 1000, websocket_port=0) as stub:
+        manager = ConnectionManager()
+        manager.set_server_address(stub.host, stub.port)
+        manager.websocket_port = stub.websocket_port
+        store = StateStore()
+        store.attach(manager)
+        rollbacks = []
+        mirror = StateMirror(manager, store, on_rollback=lambda command, data: rollbacks.append(command))
+        manager.start_push()
+        wait_until(lambda: mirror.version()[0] is not None)
+
+        # 本地状态可见延迟
+        optimistic, acked, pushed = [], [], []
+        for i in range(args.rounds):
+            name = f'延迟测试{i}'
+            changed = threading.Event()
+            store.subscribe(CURRENT_SCENE, lambda value, name=name: value == name and changed.set(), immediate=False)
+            done = threading.Event()
+            t0 = time.perf_counter()
+            mirror.apply('play_scene', {'scene_name': name}, callback=lambda result: done.set())
+            changed.wait(5)
+            optimistic.append(time.perf_counter() - t0)
+            done.wait(5)
+            acked.append(time.perf_counter() - t0)
+            wait_until(lambda: mirror.pending_count() == 0)
+            pushed.append(time.perf_counter() - t0)
+            store.subscribers[CURRENT_SCENE].clear()
+
+        # 被拒绝的命令回滚
+        before = mirror.get('lights')
+        stub.rejected_commands.add('lights_control')
+        mirror.apply('lights_control', {'action': 'red' if before != 'red' else 'blue'})
+        applied_locally = mirror.get('lights') != before
+        wait_until(lambda: mirror.pending_count() == 0)
+        rolled_back = mirror.get('lights') == before and rollbacks == ['lights_control']
+        stub.rejected_commands.clear()
+
+        # 晚到的旧状态被丢弃
+        version = mirror.version()[0]
+        mirror.reconcile({'version': version - 1, 'current_scene': '旧状态', 'volume': 1})
+        stale_ignored = mirror.get('current_scene') != '旧状态' and mirror.stale == 1
+
+        # 另一台设备同时操作，随机命令（含音量连续参数），结束后本地与控制系统一致
+        other = ConnectionManager()
+        other.set_server_address(stub.host, stub.port)
+        running = True
+
+        def other_device():
+            other_rng = random.Random(2)
+            index = 0
+            while running:
+                index += 1
+                other.send_command(*random_command(other_rng, 10000 + index), journal=False)
+                time.sleep(other_rng.uniform(0.02, 0.1))
+
+        thread = threading.Thread(target=other_device, daemon=True)
+        thread.start()
+        for i in range(args.ops):
+            command, data = random_command(rng, i)
+            if command == 'set_volume':
+                mirror.apply_continuous('volume', command, data)
+            else:
+                mirror.apply(command, data)
+            time.sleep(rng.uniform(0.03, 0.06))
+        running = False
+        thread.join()
+        converged = wait_until(lambda: mirror.pending_count() == 0 and all(
+            mirror.get(field) == stub.state[field] for field in MIRROR_FIELDS), 10)
+        final = mirror.snapshot()
+        server = {field: stub.state[field] for field in MIRROR_FIELDS}
+
+        manager.close()
+        other.close()
+
+    print(f"控制系统延迟 {args.latency:.0f}ms，{args.rounds} 次播放场景")
+    print(format_summary('乐观更新', summarize(optimistic, sum(optimistic))))
+    print(format_summary('命令应答', summarize(acked, sum(acked))))
+    print(format_summary('状态确认', summarize(pushed, sum(pushed))))
+    print(f"被拒绝的命令: 先在本地生效 {applied_locally}，应答后回滚 {rolled_back}")
+    print(f"晚到的旧状态被丢弃: {stale_ignored}")
+    print(f"两台设备并发 {args.ops} 条命令后一致: {converged}（回滚 {mirror.rollbacks - 1} 次）")
+    if not converged:
+        print(f"  本地 {final}\n  控制系统 {server}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时间线调度抖动测试 - 生成一场2小时的演出提示表（场景/灯光/音量），按加速倍率播放，
+在模拟控制系统上记录每条命令实际生效的时间，与计划时间比较
+
+对比：
+    简单调度  逐条 time.sleep(间隔) 后同步发送（误差随发送耗时累积）
+    时间线    TimelinePlayer（从起点计算目标时间 + 自旋 + 按往返耗时提前发出）
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_registry import LIGHT_ACTIONS
+from connection_manager import ConnectionManager
+from stats import percentile
+from stub_server import StubController
+from timeline import TimelinePlayer, format_time, parse_cue_list
+
+
+class ShowStub(StubController):
+    """记录每条命令生效（apply）时间的模拟控制系统"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.applied = []
+        self.applied_lock = threading.Lock()
+
+    def apply(self, command, data):
+        with self.applied_lock:
+            self.applied.append((time.perf_counter(), command, dict(data)))
+        return super().apply(command, data)
+
+
+def make_show(duration, seed=1):
+    """生成演出提示表文本，每条场景提示的场景名唯一，用于在模拟控制系统上对应生效时间"""
+    rng = random.Random(seed)
+    lines = ['# 模拟演出', '0  volume  50']
+    at = 0.0
+    index = 0
+    while True:
+        step = rng.uniform(0.5, 4.0)
+        if at + step > duration:
+            break
+        at += step
+        index += 1
+        kind = rng.random()
+        if kind < 0.5:
+            lines.append(f'+{step:.3f}  scene  cue{index:05d}')
+        elif kind < 0.8:
+            lines.append(f'+{step:.3f}  lights  {rng.choice(LIGHT_ACTIONS)}')
+        else:
+            lines.append(f'+{step:.3f}  volume  {rng.randint(0, 100)}')
+    return '\n'.join(lines) + '\n'
+
+
+def scene_errors(stub, cues, origin, speed):
+    """场景提示的实际生效时间与计划时间之差（毫秒）"""
+    planned = {cue.data['scene_name']: origin + cue.at / speed for cue in cues if cue.command == 'play_scene'}
+    errors = []
+    with stub.applied_lock:
+        for at, command, data in stub.applied:
+            name = data.get('scene_name')
+            if command == 'play_scene' and name in planned:
+                errors.append((at - planned.pop(name)) * 1000)
+    return errors
+
+
+def run_naive(manager, cues, speed):
+    """逐条睡眠后同步发送"""
+    origin = time.perf_counter()
+    previous = 0.0
+    for cue in cues:
+        time.sleep(max(0.0, (cue.at - previous) / speed))
+        previous = cue.at
+        manager.send_command(cue.command, cue.data, journal=False)
+    return origin
+
+
+def run_timeline(manager, cues, speed, lead_ratio):
+    player = TimelinePlayer(manager, cues, speed=speed, lead_ratio=lead_ratio)
+    player.play()
+    origin = player.origin
+    player.wait()
+    player.close()
+    return origin, player
+
+
+def format_errors(name, errors):
+    magnitudes = [abs(e) for e in errors]
+    tail = errors[-len(errors) // 10:] if errors else []
+    drift = sum(tail) / len(tail) if tail else 0.0
+    return (f"{name:>8}: {len(errors)} 条, |误差| p50={percentile(magnitudes, 50):.2f}ms "
+            f"p99={percentile(magnitudes, 99):.2f}ms max={max(magnitudes, default=0.0):.2f}ms, "
+            f"最后10%平均误差 {drift:+.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='时间线调度抖动测试')
+    parser.add_argument('--duration', type=float, default=7200.0, help='演出时长（秒）')
+    parser.add_argument('--speed', type=float, default=60.0, help='播放加速倍率')
+    parser.add_argument('--latency', type=float, default=10.0, help='控制系统响应延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=2.0, help='响应延迟抖动上限（毫秒）')
+    parser.add_argument('--skip-naive', action='store_true', help='不运行简单调度对比')
+    args = parser.parse_args()
+
+    cues = parse_cue_list(make_show(args.duration))
+    real = args.duration / args.speed
+    print(f"演出 {format_time(args.duration)}，{len(cues)} 条提示，{args.speed:.0f} 倍速播放约 {real:.0f}s，"
+          f"控制系统延迟 {args.latency:.0f}±{args.jitter:.0f}ms")
+
+    results = []
+    runs = ([] if args.skip_naive else ['naive']) + ['timeline']
+    for run in runs:
+        with ShowStub(latency=args.latency / 1000, jitter=args.jitter / 1000) as stub:
+            manager = ConnectionManager()
+            manager.set_server_address(stub.host, stub.port)
+            manager.test_connection()
+            if run == 'naive':
+                origin = run_naive(manager, cues, args.speed)
+                results.append(format_errors('简单调度', scene_errors(stub, cues, origin, args.speed)))
+            else:
+                # 模拟控制系统的延迟都在执行命令之前，发出到生效约等于整个往返时间
+                origin, player = run_timeline(manager, cues, args.speed, lead_ratio=1.0)
+                results.append(format_errors('时间线', scene_errors(stub, cues, origin, args.speed)))
+                dispatch = [r['dispatch_error_ms'] for r in player.results]
+                estimated = [r['arrival_error_ms'] for r in player.results]
+                results.append(format_errors('发出误差', dispatch))
+                results.append(format_errors('估计误差', estimated))
+                failed = sum(1 for r in player.results if not r['ok'])
+                results.append(f"  提前量 {player.results[-1]['lead_ms']:.1f}ms，睡眠超时补偿 "
+                               f"{player.oversleep * 1000:.3f}ms，失败 {failed} 条")
+            manager.close()
+
+    for line in results:
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+传输方式对比 - HTTP与UDP直连的单条延迟和批量吞吐量
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_manager import ConnectionManager
+from stats import format_summary, summarize
+from stub_server import StubController
+from udp_stub import UdpStub
+
+
+def measure(send, count):
+    samples = []
+    start = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        send()
+        samples.append(time.perf_counter() - t0)
+    return samples, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='传输方式对比')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=20, help='批量发送时每批命令数')
+    args = parser.parse_args()
+
+    data = {'action': 'full'}
+    with StubController() as http_stub, UdpStub() as udp_stub:
+        manager = ConnectionManager()
+        manager.set_server_address(http_stub.host, http_stub.port)
+
+        http = measure(lambda: manager.send_command('lights_control', data), args.count)
+
+        manager.enable_udp(udp_stub.port)
+        udp = measure(lambda: manager.send_command('lights_control', data), args.count)
+
+        batch = [('lights_control', data)] * args.batch
+        rounds = max(1, args.count // args.batch)
+        udp_batch = measure(lambda: manager.udp_transport.send_batch(batch), rounds)
+        lost = manager.udp_transport.lost
+        manager.close()
+
+    print(format_summary('HTTP', summarize(*http)))
+    print(format_summary('UDP', summarize(*udp)))
+    samples, elapsed = udp_batch
+    print(f"UDP批量: 每批 {args.batch} 条, {rounds * args.batch / elapsed:.0f} 条/秒, 丢失应答 {lost}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+界面卡顿测试 - 对比同步发送与调度器异步发送时的帧间隔
+模拟60帧/秒的界面循环，期间按固定频率"按下按钮"，服务器响应较慢
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_manager import ConnectionManager
+from stub_server import StubController
+
+FRAME_TIME = 1.0 / 60
+
+
+def run_frames(press, frames, press_every, ui_queue):
+    """运行模拟界面循环，返回每帧耗时"""
+    durations = []
+    last = time.perf_counter()
+    for frame in range(frames):
+        # 模拟 Clock.schedule_once 投递到主线程的回调
+        while ui_queue:
+            func, args = ui_queue.pop(0)
+            func(*args)
+
+        if frame % press_every == 0:
+            press()
+
+        # 补齐剩余帧时间
+        remaining = FRAME_TIME - (time.perf_counter() - last)
+        if remaining > 0:
+            time.sleep(remaining)
+        now = time.perf_counter()
+        durations.append(now - last)
+        last = now
+    return durations
+
+
+def report(name, durations):
+    stalls = [d for d in durations if d > FRAME_TIME * 2]
+    print(f"{name:>6}: 帧数={len(durations)} 最长帧={max(durations) * 1000:.1f}ms "
+          f"卡顿帧={len(stalls)} 卡顿总时长={sum(stalls) * 1000:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='界面卡顿测试')
+    parser.add_argument('--latency', type=float, default=0.3, help='服务器响应延迟（秒）')
+    parser.add_argument('--frames', type=int, default=180)
+    parser.add_argument('--press-every', type=int, default=30, help='每隔多少帧按一次按钮')
+    args = parser.parse_args()
+
+    with StubController(latency=args.latency) as stub:
+        ui_queue = []
+        manager = ConnectionManager(ui_scheduler=lambda func, *a: ui_queue.append((func, a)))
+        manager.set_server_address(stub.host, stub.port)
+
+        results = []
+        sync_frames = run_frames(
+            lambda: manager.send_command('lights_control', {'action': 'full'}),
+            args.frames, args.press_every, ui_queue
+        )
+        async_frames = run_frames(
+            lambda: manager.send_command_async('lights_control', {'action': 'full'}, callback=results.append),
+            args.frames, args.press_every, ui_queue
+        )
+        manager.close()
+
+    print(f"服务器延迟 {args.latency * 1000:.0f}ms，每 {args.press_every} 帧一次按钮")
+    report('同步', sync_frames)
+    report('异步', async_frames)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+界面唤醒测试 - 无界面运行应用，分别在主控制界面可见、退回登录界面、应用切到后台时
+统计每分钟的定时回调次数、文字纹理重绘次数和CPU时间
+每个场景在新的子进程中运行
+运行方式: python benchmarks/bench_wakeups.py [--seconds 60] [--baseline 上次结果.json] [--output 结果.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程中执行的测量脚本
+PROBE = r'''
+import functools, json, sys, time
+scenario, seconds = sys.argv[1], float(sys.argv[2])
+
+import controller_app
+from kivy.clock import Clock
+from kivy.uix.label import Label
+
+counts = {'timer_callbacks': 0, 'label_renders': 0}
+
+def counted(func, key):
+    # 保留方法名，Kivy按名称弱引用回调
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        counts[key] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+# 主控制界面的定时回调（旧实现为update_status轮询，新实现为tick_clock时钟）
+for name in ('update_status', 'tick_clock'):
+    if hasattr(controller_app.MainControlScreen, name):
+        setattr(controller_app.MainControlScreen, name,
+                counted(getattr(controller_app.MainControlScreen, name), 'timer_callbacks'))
+Label.texture_update = counted(Label.texture_update, 'label_renders')
+
+app = controller_app.MobileControllerApp()
+controller_app.App._running_app = app
+app.root = app.build()
+app.current_user = 'operator'
+
+def settle(duration=1.0):
+    """运行一段时间，等待界面切换动画完成"""
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        Clock.tick()
+
+app.show_screen('main_control')
+settle()
+if scenario == 'login':
+    app.show_screen('login')
+elif scenario == 'paused':
+    app.on_pause()
+settle()
+
+counts = dict.fromkeys(counts, 0)
+cpu = time.process_time()
+end = time.monotonic() + seconds
+while time.monotonic() < end:
+    Clock.tick()
+cpu = time.process_time() - cpu
+
+scale = 60.0 / seconds
+print(json.dumps({'timer_callbacks': counts['timer_callbacks'] * scale,
+                  'label_renders': counts['label_renders'] * scale,
+                  'cpu_ms': cpu * 1000 * scale}))
+'''
+
+SCENARIOS = ('main', 'login', 'paused')
+METRICS = ('timer_callbacks', 'label_renders', 'cpu_ms')
+
+
+def probe(scenario, seconds):
+    with tempfile.TemporaryDirectory() as config_dir:
+        env = dict(os.environ)
+        env.setdefault('KIVY_GL_BACKEND', 'mock')
+        env.setdefault('KIVY_NO_ARGS', '1')
+        env.setdefault('KIVY_NO_CONSOLELOG', '1')
+        env['XDG_CONFIG_HOME'] = config_dir
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE, scenario, str(seconds)], cwd=APP_DIR, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='界面唤醒测试')
+    parser.add_argument('--seconds', type=float, default=60.0, help='每个场景的运行时长')
+    parser.add_argument('--baseline', help='对比用的历史结果文件')
+    parser.add_argument('--output', help='保存本次结果的文件')
+    args = parser.parse_args()
+
+    result = {scenario: probe(scenario, args.seconds) for scenario in SCENARIOS}
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    names = {'main': '主界面可见', 'login': '退回登录界面', 'paused': '应用在后台'}
+    for scenario in SCENARIOS:
+        print(f"{names[scenario]}（每分钟）:")
+        for key in METRICS:
+            line = f"  {key:>15}: {result[scenario][key]:.1f}"
+            if baseline and scenario in baseline:
+                line += f"（基线 {baseline[scenario][key]:.1f}）"
+            print(line)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟控制系统的发现应答端 - 收到发现请求时从自己的地址单播应答
+多个应答端可以共用同一端口（分别使用 127.0.0.x 回环地址模拟局域网中的多台控制系统）
+"""
+
+import os
+import socket
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discovery import DISCOVERY_PORT, make_announce
+
+
+class DiscoveryStub:
+    """在后台线程中运行的发现应答端"""
+
+    def __init__(self, name, host='127.0.0.1', http_port=8080, port=DISCOVERY_PORT):
+        self.name = name
+        self.host = host
+        self.http_port = http_port
+        self.queries = 0
+
+        # 监听通配地址才能收到广播；端口复用让多个应答端同时收到同一个请求
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.sock.bind(('', port))
+        self.sock.settimeout(0.2)
+        # 应答从自己的地址发出，客户端按源地址识别控制系统
+        self.reply_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.reply_sock.bind((host, 0))
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(1.0)
+        self.sock.close()
+        self.reply_sock.close()
+
+    def _run(self):
+        while self.running:
+            try:
+                datagram, address = self.sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            reply = make_announce(datagram, self.name, self.http_port)
+            if reply is not None:
+                self.queries += 1
+                self.reply_sock.sendto(reply, address)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+无界面负载测试 - 启动本地模拟控制系统（可配置延迟、抖动、错误注入、场景数量），模拟操作员：
+    button_storm   多名操作员连续按按钮（灯光、场景、暂停、停止）
+    slider_drag    60Hz拖动音量滑块
+    reconnect_flap 链路反复中断/恢复，期间继续按按钮（离线日志在恢复后重发）
+    ui             Kivy无界面模式运行主控制界面，按钮风暴和滑块拖动期间统计帧耗时（界面卡顿）
+输出吞吐量、p50/p99和界面卡顿时间，可保存为JSON并与上次结果对比
+运行方式: python benchmarks/load_test.py [--duration 5] [--latency 10] [--jitter 10] [--error-rate 0.01]
+                                        [--baseline 上次结果.json] [--output 结果.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from connection_manager import ConnectionManager
+from stats import percentile, summarize
+from stub_server import StubController, make_scenes
+
+# 按钮风暴中各命令的比例
+BUTTONS = [
+    ('lights_control', {'action': 'full'}),
+    ('lights_control', {'action': 'dim'}),
+    ('lights_control', {'action': 'blue'}),
+    ('lights_control', {'action': 'off'}),
+    ('pause_scene', None),
+    ('stop_scene', None),
+    ('play_scene', 'scene'),
+]
+
+FRAME_TIME = 1.0 / 60
+# 超过该耗时的帧计为卡顿
+STALL_FRAME = 0.05
+
+
+def make_manager(stub, journal_path=None):
+    manager = ConnectionManager(timeouts={'command': (1, 2), 'status': (1, 1)})
+    manager.set_server_address(stub.host, stub.port)
+    manager.websocket_port = stub.websocket_port
+    if journal_path:
+        manager.enable_journal(journal_path)
+    manager.test_connection()
+    return manager
+
+
+def press(manager, scenes, latencies, failures, lock):
+    """按一次随机按钮，结果回调中记录延迟"""
+    command, data = random.choice(BUTTONS)
+    if data == 'scene':
+        data = {'scene_name': random.choice(scenes)['name']}
+    started = time.perf_counter()
+
+    def on_result(result):
+        with lock:
+            if result is None:
+                failures[0] += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+    manager.send_command_async(command, data, on_result)
+
+
+def button_storm(stub, args):
+    """多名操作员同时连续按按钮"""
+    manager = make_manager(stub)
+    latencies, failures, lock = [], [0], threading.Lock()
+    end = time.monotonic() + args.duration
+    submit_times = []
+
+    def operator():
+        interval = 1.0 / args.press_rate
+        while time.monotonic() < end:
+            t0 = time.perf_counter()
+            press(manager, stub.scenes, latencies, failures, lock)
+            submit_times.append(time.perf_counter() - t0)
+            time.sleep(interval * random.uniform(0.5, 1.5))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=operator) for _ in range(args.operators)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 等待排队中的命令完成
+    deadline = time.monotonic() + 5
+    while manager.dispatcher.pending_count() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.2)
+    elapsed = time.perf_counter() - start
+    manager.close()
+
+    result = summarize(latencies, elapsed)
+    result['failed'] = failures[0]
+    # 提交命令占用调用线程（界面线程）的时间
+    result['submit_p99_us'] = percentile(submit_times, 99) * 1e6
+    return result
+
+
+def slider_drag(stub, args):
+    """60Hz拖动音量滑块，统计请求数和最终值送达延迟"""
+    manager = make_manager(stub)
+    before = stub.count('/api/command')
+    call_times = []
+    events = int(args.duration * 60)
+    value = 0
+    for i in range(events):
+        value = int(100 * (0.5 + 0.5 * math.sin(i / 30.0)))
+        t0 = time.perf_counter()
+        manager.send_continuous('volume', 'set_volume', {'volume': value})
+        call_times.append(time.perf_counter() - t0)
+        time.sleep(FRAME_TIME)
+
+    released = time.perf_counter()
+    deadline = time.monotonic() + 5
+    while stub.status()['volume'] != value and time.monotonic() < deadline:
+        time.sleep(0.001)
+    settle = time.perf_counter() - released
+    requests = stub.count('/api/command') - before
+    manager.close()
+    return {
+        'events': events,
+        'requests': requests,
+        'final_value_ms': settle * 1000,
+        'call_p99_us': percentile(call_times, 99) * 1e6,
+    }
+
+
+def reconnect_flap(stub, args):
+    """链路反复中断和恢复，统计重连耗时和命令送达率"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = make_manager(stub, os.path.join(data_dir, 'journal.log'))
+        events = []
+        manager.add_status_callback(
+            lambda status: events.append((time.perf_counter(), status)) if status in ('connected', 'disconnected') else None
+        )
+        manager.start_push()
+        time.sleep(0.5)
+
+        sent = 0
+        before = stub.count('/api/command')
+        restored = []
+        end = time.monotonic() + args.duration
+        phase_end = time.monotonic() + args.flap_period
+        offline = False
+        while time.monotonic() < end:
+            if time.monotonic() >= phase_end:
+                offline = not offline
+                stub.set_offline(offline)
+                if not offline:
+                    restored.append(time.perf_counter())
+                phase_end = time.monotonic() + (args.outage if offline else args.flap_period)
+            manager.send_command_async('lights_control', {'action': random.choice(['full', 'dim', 'off'])})
+            sent += 1
+            time.sleep(0.1)
+        if offline:
+            stub.set_offline(False)
+            restored.append(time.perf_counter())
+
+        # 等待重连和离线日志重发
+        time.sleep(args.outage + 3)
+        manager.close()
+
+    # 每次恢复后第一次'connected'通知的耗时
+    reconnects = []
+    for t in restored:
+        later = [at for at, status in events if status == 'connected' and at >= t]
+        if later:
+            reconnects.append(later[0] - t)
+    delivered = len({(body or {}).get('id') for _, path, body in stub.requests[before:]
+                     if path == '/api/command' and (body or {}).get('command') == 'lights_control'})
+    return {
+        'outages': len(restored),
+        'reconnect_p50_ms': percentile(reconnects, 50) * 1000,
+        'reconnect_max_ms': max(reconnects) * 1000 if reconnects else 0.0,
+        'reconnected': len(reconnects),
+        'sent': sent,
+        'delivered': delivered,
+    }
+
+
+# 子进程中运行的界面测量脚本（Kivy无界面模式）
+UI_PROBE = r'''
+import json, random, sys, time
+host, port, ws_port, seconds, press_rate = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), float(sys.argv[4]), float(sys.argv[5])
+
+import controller_app
+from kivy.clock import Clock
+
+app = controller_app.MobileControllerApp()
+controller_app.App._running_app = app
+app.root = app.build()
+app.current_user = 'operator'
+app.connection_manager.set_server_address(host, port)
+app.connection_manager.websocket_port = ws_port
+app.connection_manager.test_connection()
+app.show_screen('main_control')
+screen = app.root.get_screen('main_control')
+app.connection_manager.start_push()
+
+def run(duration, action=None, every=None):
+    frames = []
+    next_action = time.perf_counter()
+    end = time.perf_counter() + duration
+    last = time.perf_counter()
+    while time.perf_counter() < end:
+        if action and time.perf_counter() >= next_action:
+            action()
+            next_action += every
+        Clock.tick()
+        now = time.perf_counter()
+        frames.append(now - last)
+        # 补足一帧的时间
+        if now - last < 1 / 60:
+            time.sleep(1 / 60 - (now - last))
+        last = time.perf_counter()
+    return frames
+
+run(1.0)
+scenes = app.scene_catalog.scenes
+
+def storm():
+    choice = random.random()
+    if choice < 0.6:
+        screen.send_lights_command(random.choice(['full', 'dim', 'red', 'off']), '灯光')
+    elif choice < 0.8:
+        screen.select_scene(random.choice(scenes))
+        screen.play_scene(None)
+    else:
+        screen.stop_scene(None)
+
+volume = [0]
+def drag():
+    volume[0] = (volume[0] + 3) % 100
+    screen.volume_slider.value = volume[0]
+
+frames = run(seconds / 2, storm, 1.0 / press_rate)
+frames += run(seconds / 2, drag, 1 / 60)
+app.on_stop()
+print(json.dumps(frames))
+'''
+
+
+def ui(stub, args):
+    """Kivy无界面模式下主控制界面的帧耗时"""
+    with tempfile.TemporaryDirectory() as config_dir:
+        env = dict(os.environ)
+        env.setdefault('KIVY_GL_BACKEND', 'mock')
+        env.setdefault('KIVY_NO_ARGS', '1')
+        env.setdefault('KIVY_NO_CONSOLELOG', '1')
+        env['XDG_CONFIG_HOME'] = config_dir
+        output = subprocess.run(
+            [sys.executable, '-c', UI_PROBE, stub.host, str(stub.port), str(stub.websocket_port),
+             str(args.duration), str(args.press_rate * args.operators)],
+            cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+    frames = json.loads(output.strip().splitlines()[-1])
+    stalls = [frame for frame in frames if frame > STALL_FRAME]
+    return {
+        'frames': len(frames),
+        'frame_p50_ms': percentile(frames, 50) * 1000,
+        'frame_p99_ms': percentile(frames, 99) * 1000,
+        'frame_max_ms': max(frames) * 1000,
+        'stall_frames': len(stalls),
+        'stall_ms': sum(stalls) * 1000,
+    }
+
+
+SCENARIOS = {
+    'button_storm': button_storm,
+    'slider_drag': slider_drag,
+    'reconnect_flap': reconnect_flap,
+    'ui': ui,
+}
+
+
+def format_value(value):
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+def print_report(report, baseline=None):
+    for scenario, metrics in report.items():
+        if scenario == 'config':
+            continue
+        print(f"{scenario}:")
+        for key, value in metrics.items():
+            line = f"  {key:>18}: {format_value(value)}"
+            old = (baseline or {}).get(scenario, {}).get(key)
+            if isinstance(old, (int, float)):
+                change = f"{(value - old) / old * 100:+.0f}%" if old else ''
+                line += f"（基线 {format_value(old)} {change}）"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='无界面负载测试')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='逗号分隔的测试场景')
+    parser.add_argument('--duration', type=float, default=5.0, help='每个场景的运行时长（秒）')
+    parser.add_argument('--latency', type=float, default=10.0, help='模拟控制系统响应延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=10.0, help='随机抖动上限（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='返回503的概率')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='不响应直接断开的概率')
+    parser.add_argument('--scenes', type=int, default=500, help='场景目录大小')
+    parser.add_argument('--operators', type=int, default=4, help='同时操作的人数')
+    parser.add_argument('--press-rate', type=float, default=5.0, help='每人每秒按键次数')
+    parser.add_argument('--flap-period', type=float, default=2.0, help='链路正常的持续时间（秒）')
+    parser.add_argument('--outage', type=float, default=1.0, help='每次中断的持续时间（秒）')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', help='对比用的历史结果文件')
+    parser.add_argument('--output', help='保存本次结果的文件')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    config = {key: value for key, value in vars(args).items() if key not in ('baseline', 'output', 'scenarios')}
+    report = {'config': config}
+    for name in args.scenarios.split(','):
+        stub = StubController(
+            latency=args.latency / 1000, jitter=args.jitter / 1000, scenes=make_scenes(args.scenes),
+            error_rate=args.error_rate, drop_rate=args.drop_rate, websocket_port=0
+        )
+        with stub:
+            report[name] = SCENARIOS[name](stub, args)
+            report[name]['injected_errors'] = stub.injected['error'] + stub.injected['drop']
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            print("注意: 基线的测试参数与本次不同")
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
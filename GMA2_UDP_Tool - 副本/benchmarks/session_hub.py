@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟会话中心 - 供多设备会话同步测试使用（协议见 session_sync.py）
+每个会话保存共享状态、递增序号和最近的增量，修改只广播变化的字段；
+重连时按设备上报的序号补发缺失的增量，超出保存范围时发送快照
+可选：由会话中心统一轮询控制系统 /api/status，作为会话字段 status 转发给所有设备；
+按概率丢弃发往设备的增量，模拟丢包造成的序号缺口
+
+单独运行: python benchmarks/session_hub.py [--port 8083] [--controller 127.0.0.1:8080] [--drop-rate 0]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_sync import SESSION_PORT, SESSION_STATUS, encode_message
+from stub_server import accept_handshake, read_frame, read_handshake, websocket_frame
+
+
+class HubClient:
+    """一个已连接的设备"""
+
+    def __init__(self, sock, session):
+        self.sock = sock
+        self.session = session
+        self.client_id = None
+        self.send_lock = threading.Lock()
+
+    def send(self, message):
+        frame = websocket_frame(encode_message(message).encode('utf-8'))
+        with self.send_lock:
+            self.sock.sendall(frame)
+        return len(frame)
+
+
+class HubSession:
+    """一个会话的共享状态"""
+
+    def __init__(self, name, history):
+        self.name = name
+        self.state = {}
+        self.seq = 0
+        # 最近的增量 (序号, 消息)
+        self.history = deque(maxlen=history)
+        self.clients = []
+        # 设备ID -> 最后处理的操作序号（随快照返回）
+        self.client_ops = {}
+        self.lock = threading.Lock()
+
+
+class StubSessionHub:
+    """在后台线程中运行的模拟会话中心"""
+
+    def __init__(self, host='127.0.0.1', port=0, controller=None, poll_interval=0.5, history=256, drop_rate=0.0):
+        # controller为(host, port)时由会话中心轮询控制系统状态
+        self.controller = controller
+        self.poll_interval = poll_interval
+        self.history = history
+        self.drop_rate = drop_rate
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.sock = socket.create_server((host, port))
+        self.sock.settimeout(0.2)
+        self.host, self.port = self.sock.getsockname()[:2]
+        self.running = False
+        self.threads = []
+
+        # 统计
+        self.deltas = 0
+        # 发往设备的增量帧数和字节数
+        self.delta_frames = 0
+        self.delta_bytes = 0
+        self.snapshots = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.polls = 0
+
+    def start(self):
+        self.running = True
+        self.threads = [threading.Thread(target=self._accept, daemon=True)]
+        if self.controller is not None:
+            self.threads.append(threading.Thread(target=self._poll_controller, daemon=True))
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join(1.0)
+        self.disconnect_all()
+        self.sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def get_session(self, name):
+        with self.lock:
+            session = self.sessions.get(name)
+            if session is None:
+                session = self.sessions[name] = HubSession(name, self.history)
+            return session
+
+    def client_count(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+        return sum(len(session.clients) for session in sessions)
+
+    def disconnect_all(self):
+        """断开所有设备（模拟网络中断）"""
+        with self.lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            with session.lock:
+                clients, session.clients = session.clients, []
+            for client in clients:
+                try:
+                    client.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                client.sock.close()
+
+    def update(self, session, changes, origin=None, op=None):
+        """修改会话状态，有变化时广播增量，返回新序号（无变化返回None）"""
+        with session.lock:
+            if origin is not None and op is not None:
+                session.client_ops[origin] = max(op, session.client_ops.get(origin, 0))
+            delta = {field: value for field, value in changes.items()
+                     if field not in session.state or session.state[field] != value}
+            if not delta:
+                return None
+            session.state.update(delta)
+            session.seq += 1
+            message = {'t': 'd', 's': session.seq, 'c': delta}
+            if origin is not None:
+                message['o'] = origin
+                message['i'] = op
+            session.history.append((session.seq, message))
+            self.deltas += 1
+            # 持有会话锁发送，保证每个设备按序号顺序收到
+            for client in list(session.clients):
+                if self.drop_rate and random.random() < self.drop_rate:
+                    self.dropped += 1
+                    continue
+                try:
+                    self.delta_bytes += client.send(message)
+                    self.delta_frames += 1
+                except OSError:
+                    session.clients.remove(client)
+            return session.seq
+
+    def _snapshot(self, session, client):
+        """调用时已持有会话锁"""
+        self.snapshots += 1
+        client.send({'t': 'snap', 's': session.seq, 'st': session.state,
+                     'i': session.client_ops.get(client.client_id)})
+
+    def _hello(self, session, client, last_seq):
+        with session.lock:
+            oldest = session.history[0][0] if session.history else session.seq + 1
+            if last_seq is not None and last_seq <= session.seq and last_seq + 1 >= oldest:
+                # 补发缺失的增量
+                for seq, message in session.history:
+                    if seq > last_seq:
+                        self.replayed += 1
+                        client.send(message)
+            else:
+                self._snapshot(session, client)
+            session.clients.append(client)
+
+    def _accept(self):
+        while self.running:
+            try:
+                sock, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        client = None
+        try:
+            path, headers = read_handshake(sock)
+            prefix = '/session/'
+            if not path.startswith(prefix):
+                raise ConnectionError(f'未知路径 {path}')
+            accept_handshake(sock, headers)
+            client = HubClient(sock, self.get_session(path[len(prefix):] or 'default'))
+            while self.running:
+                opcode, payload = read_frame(sock)
+                if opcode == 0x9:
+                    with client.send_lock:
+                        sock.sendall(websocket_frame(payload, 0xA))
+                elif opcode == 0x8:
+                    with client.send_lock:
+                        sock.sendall(websocket_frame(payload[:2], 0x8))
+                    return
+                elif opcode == 0x1:
+                    self._handle(client, json.loads(payload.decode('utf-8')))
+        except (OSError, ConnectionError, ValueError):
+            pass
+        finally:
+            if client is not None:
+                with client.session.lock:
+                    if client in client.session.clients:
+                        client.session.clients.remove(client)
+            sock.close()
+
+    def _handle(self, client, message):
+        session = client.session
+        kind = message.get('t')
+        if kind == 'hello':
+            client.client_id = message.get('c')
+            self._hello(session, client, message.get('s'))
+        elif kind == 'set':
+            op = message.get('i')
+            if self.update(session, message.get('c') or {}, client.client_id, op) is None:
+                client.send({'t': 'ack', 'i': op})
+        elif kind == 'resync':
+            with session.lock:
+                self._snapshot(session, client)
+
+    def _poll_controller(self):
+        """统一轮询控制系统状态，变化时作为status字段转发给所有会话"""
+        host, port = self.controller
+        connection = None
+        while self.running:
+            started = time.monotonic()
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection(host, port, timeout=2)
+                connection.request('GET', '/api/status')
+                response = connection.getresponse()
+                body = response.read()
+                self.polls += 1
+                if response.status == 200:
+                    status = json.loads(body.decode('utf-8'))
+                    with self.lock:
+                        sessions = list(self.sessions.values())
+                    for session in sessions:
+                        self.update(session, {SESSION_STATUS: status})
+            except (OSError, http.client.HTTPException, ValueError):
+                if connection is not None:
+                    connection.close()
+                connection = None
+            time.sleep(max(0.0, self.poll_interval - (time.monotonic() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟会话中心')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=SESSION_PORT)
+    parser.add_argument('--controller', help='轮询的控制系统地址 host:port')
+    parser.add_argument('--poll', type=float, default=0.5, help='控制系统状态轮询间隔（秒）')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='丢弃增量的概率')
+    args = parser.parse_args()
+
+    controller = None
+    if args.controller:
+        host, _, port = args.controller.rpartition(':')
+        controller = (host, int(port))
+    hub = StubSessionHub(args.host, args.port, controller, args.poll, drop_rate=args.drop_rate).start()
+    print(f"模拟会话中心运行在 ws://{hub.host}:{hub.port}/session/<会话名>")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        hub.stop()
+
+
+if __name__ == '__main__':
+    main()
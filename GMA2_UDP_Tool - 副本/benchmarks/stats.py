@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能测试统计工具
+"""
+
+
+def percentile(samples, pct):
+    """计算百分位数（最近秩法）"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples, elapsed):
+    """汇总延迟样本（秒）：吞吐量与p50/p99（毫秒）"""
+    return {
+        'count': len(samples),
+        'per_sec': len(samples) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'max_ms': max(samples) * 1000 if samples else 0.0,
+    }
+
+
+def format_summary(name, summary):
+    return (f"{name:>8}: {summary['count']} 次, {summary['per_sec']:.0f} 次/秒, "
+            f"p50={summary['p50_ms']:.2f}ms p99={summary['p99_ms']:.2f}ms")
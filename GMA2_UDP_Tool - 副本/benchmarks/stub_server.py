@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟主控制系统 - 供性能测试使用
+提供 /api/status、/api/command、/api/batch、/api/scenes 接口和 /ws 状态推送（WebSocket）
+场景素材 /api/scenes/<id>/thumbnail（PNG缩略图，按场景生成）和 /api/scenes/<id>/preview（预览信息）
+可配置响应延迟、随机抖动、错误注入（5xx / 断开连接）、被拒绝的命令和场景目录大小
+支持场景预备/GO（arm_scene、disarm_scene、go），play_scene和arm_scene按load_time模拟场景加载耗时
+
+单独运行: python benchmarks/stub_server.py [--port 8080] [--ws-port 8081] [--latency 20] [--jitter 10]
+                                           [--error-rate 0.01] [--drop-rate 0] [--scenes 2000]
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import socket
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def make_scenes(count):
+    """生成测试用场景目录"""
+    return [
+        {'id': i, 'name': f'场景{i:04d}', 'description': f'第{i}个测试场景'}
+        for i in range(count)
+    ]
+
+
+def make_thumbnail(seed, width=160, height=90):
+    """生成测试用PNG缩略图（色块加少量噪点，压缩后约10KB）"""
+    rng = random.Random(seed)
+    base = (seed * 37) % 256
+    rows = []
+    for y in range(height):
+        row = bytearray(b'\0')
+        for x in range(width):
+            noise = rng.randrange(32) if rng.random() < 0.2 else 0
+            row += bytes(((base + x // 8 * 8 + noise) % 256, (y // 6 * 12) % 256, (base * 3 + noise) % 256))
+        rows.append(bytes(row))
+
+    def chunk(kind, data):
+        return struct.pack('!I', len(data)) + kind + data + struct.pack('!I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('!IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(b''.join(rows), 6))
+            + chunk(b'IEND', b''))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """模拟控制系统的HTTP处理器"""
+
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体分开写出，关闭Nagle避免keep-alive连接上的延迟确认等待
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, body, status=200, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        # 服务端处理耗时，供客户端统计
+        self.send_header('Server-Timing', f'app;dur={(time.perf_counter() - self.started) * 1000:.3f}')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_bytes(self, payload, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def drop_if_offline(self):
+        """模拟链路中断：不响应直接断开连接"""
+        if self.server.stub.offline:
+            self.close_connection = True
+            return True
+        return False
+
+    def inject_error(self):
+        """按配置的概率注入错误：断开连接或返回503"""
+        stub = self.server.stub
+        if stub.drop_rate and random.random() < stub.drop_rate:
+            stub.count_injected('drop')
+            self.close_connection = True
+            return True
+        if stub.error_rate and random.random() < stub.error_rate:
+            stub.count_injected('error')
+            self.send_json({'error': 'injected'}, 503)
+            return True
+        return False
+
+    def do_GET(self):
+        self.started = time.perf_counter()
+        stub = self.server.stub
+        if self.drop_if_offline():
+            return
+        stub.record(self.path)
+        time.sleep(stub.delay())
+        if self.inject_error():
+            return
+
+        if self.path == '/api/status':
+            self.send_json(stub.status())
+        elif self.path.split('?')[0] == '/api/scenes':
+            etag = stub.scenes_etag
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            else:
+                self.send_json(stub.scenes, headers={'ETag': etag})
+        elif self.path.startswith('/api/scenes/'):
+            asset = stub.asset(self.path)
+            if asset is None:
+                self.send_json({'error': 'not found'}, 404)
+            elif isinstance(asset, bytes):
+                self.send_bytes(asset, 'image/png')
+            else:
+                self.send_json(asset)
+        else:
+            self.send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        self.started = time.perf_counter()
+        stub = self.server.stub
+        body = self.read_json()
+        if self.drop_if_offline():
+            return
+        stub.record(self.path, body)
+        time.sleep(stub.delay())
+        if self.inject_error():
+            return
+
+        if self.path == '/api/command':
+            command = body.get('command')
+            data = body.get('data') or {}
+            if command in stub.rejected_commands:
+                self.send_json({'error': 'rejected'}, 400)
+            elif command in ('play_scene', 'arm_scene'):
+                # 解析并加载场景
+                time.sleep(stub.load_time)
+                if command == 'arm_scene':
+                    self.send_json({'success': True, 'token': stub.arm(data.get('scene_name'))})
+                else:
+                    version = stub.apply(command, data)
+                    self.send_json({'success': True, 'command': command, 'version': version})
+            elif command == 'go':
+                scene_name = stub.take_armed(data.get('token'))
+                if scene_name is None:
+                    self.send_json({'error': 'not armed'}, 409)
+                else:
+                    version = stub.apply('play_scene', {'scene_name': scene_name})
+                    self.send_json({'success': True, 'command': command, 'scene_name': scene_name,
+                                    'version': version})
+            elif command == 'disarm_scene':
+                stub.take_armed(data.get('token'))
+                self.send_json({'success': True, 'command': command})
+            else:
+                version = stub.apply(command, data)
+                self.send_json({'success': True, 'command': command, 'version': version})
+        elif self.path == '/api/batch':
+            commands = body.get('commands') or []
+            rejected = [item.get('command') in stub.rejected_commands for item in commands]
+            if body.get('atomic') and any(rejected):
+                # 原子批量：任一命令被拒绝则全部不执行
+                self.send_json({'error': 'rejected'}, 409)
+            else:
+                versions = [None if reject else stub.apply(item.get('command'), item.get('data') or {})
+                            for item, reject in zip(commands, rejected)]
+                self.send_json({'results': [
+                    None if reject else {'success': True, 'command': item.get('command'), 'version': version}
+                    for item, reject, version in zip(commands, rejected, versions)
+                ]})
+        else:
+            self.send_json({'error': 'not found'}, 404)
+
+
+def websocket_frame(payload, opcode=0x1):
+    """服务端发往客户端的WebSocket帧（不加掩码）"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def read_exact(sock, count):
+    data = b''
+    while len(data) < count:
+        chunk = sock.recv(count - len(data))
+        if not chunk:
+            raise ConnectionError('连接已关闭')
+        data += chunk
+    return data
+
+
+def read_handshake(client):
+    """读取WebSocket握手请求，返回 (请求路径, 请求头)"""
+    request = b''
+    while b'\r\n\r\n' not in request:
+        chunk = client.recv(4096)
+        if not chunk:
+            raise ConnectionError('握手未完成')
+        request += chunk
+    lines = request.decode('latin-1').split('\r\n')
+    parts = lines[0].split(' ')
+    path = parts[1] if len(parts) > 1 else '/'
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return path, headers
+
+
+def accept_handshake(client, headers):
+    """回复握手，完成WebSocket升级"""
+    accept = base64.b64encode(
+        hashlib.sha1((headers.get('sec-websocket-key', '') + WEBSOCKET_GUID).encode('ascii')).digest()
+    ).decode('ascii')
+    client.sendall((
+        'HTTP/1.1 101 Switching Protocols\r\n'
+        'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+        f'Sec-WebSocket-Accept: {accept}\r\n\r\n'
+    ).encode('ascii'))
+
+
+def read_frame(client):
+    """读取一个客户端帧，返回 (opcode, 去掉掩码的payload)"""
+    first, second = read_exact(client, 2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', read_exact(client, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', read_exact(client, 8))[0]
+    mask = read_exact(client, 4) if second & 0x80 else b'\0\0\0\0'
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(read_exact(client, length)))
+    return first & 0x0F, payload
+
+
+class StubPushServer:
+    """模拟控制系统的 /ws 状态推送（最小的WebSocket服务端：握手、文本帧、ping/pong、关闭）"""
+
+    def __init__(self, stub, host='127.0.0.1', port=0):
+        self.stub = stub
+        self.sock = socket.create_server((host, port))
+        self.sock.settimeout(0.2)
+        self.host, self.port = self.sock.getsockname()[:2]
+        self.clients = []
+        self.lock = threading.Lock()
+        # 推送和pong可能在不同线程写同一连接，整帧写出
+        self.send_lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._accept, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(1.0)
+        self.disconnect_all()
+        self.sock.close()
+
+    def client_count(self):
+        with self.lock:
+            return len(self.clients)
+
+    def broadcast(self, event):
+        """向所有客户端推送事件"""
+        frame = websocket_frame(json.dumps(event).encode('utf-8'))
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                self._send(client, frame)
+            except OSError:
+                self._drop(client)
+
+    def _send(self, client, frame):
+        with self.send_lock:
+            client.sendall(frame)
+
+    def disconnect_all(self):
+        """断开所有客户端（模拟推送链路中断）"""
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.close()
+
+    def _drop(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+        client.close()
+
+    def _accept(self):
+        while self.running:
+            try:
+                client, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client):
+        try:
+            _, headers = read_handshake(client)
+            if self.stub.offline:
+                raise ConnectionError('模拟离线')
+            accept_handshake(client, headers)
+            with self.lock:
+                self.clients.append(client)
+            # 连接后立即推送一次当前状态
+            self._send(client, websocket_frame(json.dumps({'type': 'status', 'data': self.stub.status()}).encode('utf-8')))
+            self._read_frames(client)
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            self._drop(client)
+
+    def _read_frames(self, client):
+        """读取客户端帧：回应ping，收到关闭帧时结束"""
+        while self.running:
+            opcode, payload = read_frame(client)
+            if opcode == 0x9:
+                self._send(client, websocket_frame(payload, 0xA))
+            elif opcode == 0x8:
+                self._send(client, websocket_frame(payload[:2], 0x8))
+                return
+
+
+class StubController:
+    """在后台线程中运行的模拟控制系统"""
+
+    def __init__(self, latency=0.0, host='127.0.0.1', port=0, scenes=None, name='模拟控制系统',
+                 jitter=0.0, error_rate=0.0, drop_rate=0.0, websocket_port=None):
+        self.name = name
+        self.latency = latency
+        # 每个请求额外的随机延迟上限（秒）
+        self.jitter = jitter
+        # 按概率返回503 / 不响应直接断开连接
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.offline = False
+        # 播放或预备场景时的加载耗时（秒）
+        self.load_time = 0.0
+        # 预备令牌 -> 场景名
+        self.armed = {}
+        self.next_token = 0
+        # 控制系统会拒绝的命令类型
+        self.rejected_commands = set()
+        self.requests = []
+        self.injected = {'error': 0, 'drop': 0}
+        self.state = {'current_scene': None, 'volume': 50, 'lights': None}
+        # 状态版本，每次状态变化加一，随状态和命令应答返回
+        self.version = 0
+        self.set_scenes(scenes or [])
+        self.lock = threading.Lock()
+        # 场景id -> 生成的缩略图
+        self.thumbnails = {}
+
+        self.server = ThreadingHTTPServer((host, port), StubHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.host, self.port = self.server.server_address[:2]
+        self.thread = None
+
+        # websocket_port为None时不提供推送，0表示随机端口
+        self.push = StubPushServer(self, host, websocket_port) if websocket_port is not None else None
+        self.websocket_port = self.push.port if self.push else None
+
+    def delay(self):
+        """本次请求的响应延迟"""
+        if self.jitter:
+            return self.latency + random.uniform(0, self.jitter)
+        return self.latency
+
+    def set_scenes(self, scenes):
+        """替换场景目录并更新ETag"""
+        self.scenes = scenes
+        digest = hashlib.sha1(json.dumps(scenes, sort_keys=True).encode('utf-8')).hexdigest()
+        self.scenes_etag = f'"{digest[:16]}"'
+
+    def asset(self, path):
+        """场景素材：缩略图返回PNG字节，预览信息返回字典，场景不存在返回None"""
+        parts = path.split('?')[0].split('/')
+        if len(parts) != 5 or parts[4] not in ('thumbnail', 'preview'):
+            return None
+        try:
+            scene_id = int(parts[3])
+        except ValueError:
+            return None
+        if not 0 <= scene_id < len(self.scenes):
+            return None
+        if parts[4] == 'preview':
+            return {'duration': 30 + scene_id % 600, 'cues': scene_id % 12, 'media': f'clip{scene_id:04d}.mp4'}
+        with self.lock:
+            thumbnail = self.thumbnails.get(scene_id)
+        if thumbnail is None:
+            thumbnail = make_thumbnail(scene_id)
+            with self.lock:
+                self.thumbnails[scene_id] = thumbnail
+        return thumbnail
+
+    def status(self):
+        """/api/status 和推送的状态内容"""
+        with self.lock:
+            return dict(self.state, status='running', name=self.name, version=self.version)
+
+    def apply(self, command, data):
+        """执行命令后更新状态，状态变化时推送，返回执行后的状态版本"""
+        with self.lock:
+            before = dict(self.state)
+            if command == 'play_scene':
+                self.state['current_scene'] = data.get('scene_name')
+            elif command == 'stop_scene':
+                self.state['current_scene'] = None
+            elif command == 'set_volume':
+                self.state['volume'] = data.get('volume')
+            elif command == 'lights_control':
+                self.state['lights'] = data.get('action')
+            changed = self.state != before
+            if changed:
+                self.version += 1
+            version = self.version
+        if changed and self.push is not None:
+            self.push.broadcast({'type': 'status', 'data': self.status()})
+        return version
+
+    def arm(self, scene_name):
+        """预备场景，返回令牌"""
+        with self.lock:
+            self.next_token += 1
+            token = f'arm-{self.next_token}'
+            self.armed[token] = scene_name
+            return token
+
+    def take_armed(self, token):
+        """取出预备的场景（令牌只能使用一次），没有时返回None"""
+        with self.lock:
+            return self.armed.pop(token, None)
+
+    def count_injected(self, kind):
+        with self.lock:
+            self.injected[kind] += 1
+
+    def record(self, path, body=None):
+        """记录收到的请求"""
+        with self.lock:
+            self.requests.append((time.perf_counter(), path, body))
+
+    def count(self, path=None):
+        """统计收到的请求数"""
+        with self.lock:
+            if path is None:
+                return len(self.requests)
+            return sum(1 for _, p, _ in self.requests if p == path)
+
+    def set_offline(self, offline):
+        """模拟链路中断/恢复，中断时同时断开推送连接"""
+        self.offline = offline
+        if offline and self.push is not None:
+            self.push.disconnect_all()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        if self.push is not None:
+            self.push.start()
+        return self
+
+    def stop(self):
+        if self.push is not None:
+            self.push.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟主控制系统')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--ws-port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0, help='响应延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='随机抖动上限（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回503的概率')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='不响应直接断开的概率')
+    parser.add_argument('--load-time', type=float, default=0.0, help='场景加载耗时（毫秒）')
+    parser.add_argument('--scenes', type=int, default=50, help='场景目录大小')
+    args = parser.parse_args()
+
+    stub = StubController(
+        latency=args.latency / 1000, host=args.host, port=args.port, scenes=make_scenes(args.scenes),
+        jitter=args.jitter / 1000, error_rate=args.error_rate, drop_rate=args.drop_rate,
+        websocket_port=args.ws_port
+    )
+    stub.load_time = args.load_time / 1000
+    with stub:
+        print(f"模拟控制系统: http://{stub.host}:{stub.port}  ws://{stub.host}:{stub.websocket_port}/ws")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
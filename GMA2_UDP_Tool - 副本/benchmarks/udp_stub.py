@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地UDP模拟灯光控制端 - 收到请求应答的数据报时回送应答，支持JSON和二进制编码的负载
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_registry import REGISTRY
+from transports import FLAG_ACK, FLAG_ACK_REQUEST, FLAG_BINARY, pack_datagram, unpack_datagram
+
+
+class UdpStub:
+    """在后台线程中运行的UDP应答端"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.latency = latency
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.2)
+        self.host, self.port = self.sock.getsockname()
+        self.received = []
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(1.0)
+        self.sock.close()
+
+    def _run(self):
+        while self.running:
+            try:
+                datagram, address = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            parsed = unpack_datagram(datagram)
+            if parsed is None:
+                continue
+            flags, seq, body = parsed
+            if flags & FLAG_BINARY:
+                decoded = REGISTRY.decode_binary(body)
+                if decoded is None:
+                    continue
+                command, data, request_id = decoded
+                message = {'command': command, 'data': data}
+                if request_id:
+                    message['id'] = request_id
+            else:
+                message = json.loads(body.decode('utf-8'))
+            self.received.append((time.perf_counter(), message))
+
+            if flags & FLAG_ACK_REQUEST:
+                if self.latency:
+                    time.sleep(self.latency)
+                self.sock.sendto(pack_datagram(seq, b'{"success":true}', FLAG_ACK), address)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -19,7 +19,7 @@ source.include_exts = py,png,jpg,kv,atlas,json
 #source.exclude_exts = spec
 
 # (list) List of directory to exclude (let empty to not exclude anything)
-source.exclude_dirs = tests, bin, venv, __pycache__
+source.exclude_dirs = tests, benchmarks, bin, venv, __pycache__
 
 # (str) Application versioning (method 1)
 version = 1.0.0
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+连续参数合并发送 - 用于音量滑块、推子等连续控制
+每个参数只保留最新值，按最高频率限制发送，中间值直接丢弃
+"""
+
+import threading
+import time
+
+
+class CoalescingChannel:
+    """最新值优先的限速发送通道"""
+
+    def __init__(self, sender, max_rate=10.0):
+        # sender(command, data) 在通道线程中同步执行，返回None表示失败
+        self.sender = sender
+        self.min_interval = 1.0 / max_rate
+
+        self.cond = threading.Condition()
+        self.sequence = 0
+        # 参数键 -> (序号, 命令, 数据)，尚未发送的最新值
+        self.pending = {}
+        # 参数键 -> 上次发送时间
+        self.last_sent = {}
+        # 参数键 -> 已确认的最新序号/数据
+        self.acked_seq = {}
+        self.acked_data = {}
+        # 发送结果回调 listener(键, 序号, 数据, 结果)，在通道线程中调用；
+        # 值与已确认的值相同而未发送时结果为True
+        self.listeners = []
+
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        with self.cond:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run, name='coalescing-channel', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def update(self, key, command, data):
+        """提交参数新值，立即返回分配的序号"""
+        if not self.running:
+            self.start()
+
+        with self.cond:
+            self.sequence += 1
+            self.pending[key] = (self.sequence, command, data)
+            self.cond.notify()
+            return self.sequence
+
+    def clear(self):
+        """丢弃所有尚未发送的值（关键命令优先时调用）"""
+        with self.cond:
+            self.pending.clear()
+
+    def value(self, key):
+        """已被控制系统确认的最新值"""
+        with self.cond:
+            return self.acked_data.get(key)
+
+    def _next_ready(self):
+        """取出可以发送的参数，返回(键, 条目)或需要等待的秒数"""
+        now = time.monotonic()
+        wait = None
+        for key in self.pending:
+            ready_at = self.last_sent.get(key, 0) + self.min_interval
+            if ready_at <= now:
+                return key, self.pending.pop(key)
+            if wait is None or ready_at - now < wait:
+                wait = ready_at - now
+        return None, wait
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while True:
+                    if not self.running:
+                        return
+                    key, entry = self._next_ready()
+                    if key is not None:
+                        break
+                    self.cond.wait(entry)
+
+                seq, command, data = entry
+                unchanged = data == self.acked_data.get(key)
+                if not unchanged:
+                    self.last_sent[key] = time.monotonic()
+
+            if unchanged:
+                # 与已发送的值相同，无需重复发送
+                self._notify(key, seq, data, True)
+                continue
+
+            payload = dict(data)
+            payload['seq'] = seq
+            result = self.sender(command, payload)
+
+            with self.cond:
+                # 只接受比已确认值更新的结果，丢弃过期值
+                if result is not None and seq > self.acked_seq.get(key, 0):
+                    self.acked_seq[key] = seq
+                    self.acked_data[key] = data
+            self._notify(key, seq, data, result)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, key, seq, data, result):
+        for listener in self.listeners:
+            try:
+                listener(key, seq, data, result)
+            except Exception as e:
+                print(f"连续参数回调错误: {e}")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令调度器 - 在后台线程池中执行所有网络命令
+界面线程只负责提交命令，结果通过回调投递回界面线程
+
+命令按优先级分为三个通道：
+    critical   安全关键命令，独立线程立即执行，并取消其他通道中排队的命令
+    cue        普通命令（场景、灯光等），有界队列 + 工作线程池
+    continuous 连续参数（音量等），由CoalescingChannel合并发送
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+LANE_CRITICAL = 'critical'
+LANE_CUE = 'cue'
+LANE_CONTINUOUS = 'continuous'
+
+# 安全关键命令
+CRITICAL_COMMANDS = frozenset(['emergency_stop', 'system_reset'])
+
+
+def command_lane(command):
+    """命令所属的优先级通道"""
+    return LANE_CRITICAL if command in CRITICAL_COMMANDS else LANE_CUE
+
+
+class CommandDispatcher:
+    """异步命令调度器（有界队列 + 工作线程池 + 关键命令专用线程）"""
+
+    def __init__(self, handler, max_pending=64, workers=2, ui_scheduler=None, on_critical=None):
+        # handler(command, data) 在工作线程中执行实际的网络请求
+        self.handler = handler
+        self.max_pending = max_pending
+        self.workers = workers
+        # ui_scheduler(func, *args) 负责把回调投递回界面线程
+        self.ui_scheduler = ui_scheduler
+        # on_critical() 在提交关键命令时调用，用于清空其他通道
+        self.on_critical = on_critical
+        # queue_observer(command, seconds) 在命令开始执行时报告排队时间，None表示不统计
+        self.queue_observer = None
+
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.critical = queue.Queue()
+        self.threads = []
+        self.running = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        """启动工作线程"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(self.pending,),
+                    name=f"command-worker-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+            thread = threading.Thread(
+                target=self._worker,
+                args=(self.critical,),
+                name="command-critical",
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, timeout=1.0):
+        """停止工作线程，未执行的命令将被取消"""
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+
+        for source in (self.pending, self.critical):
+            while True:
+                try:
+                    future, _, _, _, _, _ = source.get_nowait()
+                except queue.Empty:
+                    break
+                future.cancel()
+
+        for _ in range(self.workers):
+            try:
+                self.pending.put_nowait(None)
+            except queue.Full:
+                break
+        self.critical.put_nowait(None)
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def submit(self, command, data=None, callback=None, lane=None, handler=None):
+        """提交命令，立即返回Future；callback(result)在界面线程中调用
+        handler(command, data)可替代默认的处理函数（如批量命令）"""
+        if not self.running:
+            self.start()
+
+        future = Future()
+        queued = time.perf_counter() if self.queue_observer is not None else 0.0
+        if (lane or command_lane(command)) == LANE_CRITICAL:
+            # 关键命令不排队，先取消其他通道中尚未发送的命令
+            cancelled = self.cancel_pending()
+            if self.on_critical:
+                self.on_critical()
+            if cancelled:
+                print(f"关键命令 {command} 已取消 {cancelled} 条排队命令")
+            self.critical.put_nowait((future, command, data, callback, handler, queued))
+            return future
+
+        try:
+            self.pending.put_nowait((future, command, data, callback, handler, queued))
+        except queue.Full:
+            # 队列已满时直接失败，绝不阻塞界面线程
+            print(f"命令队列已满，丢弃命令: {command}")
+            future.set_result(None)
+            self._deliver(callback, None)
+        return future
+
+    def cancel_pending(self):
+        """取消普通通道中尚未执行的命令，返回取消的条数"""
+        cancelled = 0
+        while True:
+            try:
+                item = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # 停止信号放回队列
+                self.pending.put_nowait(None)
+                break
+            future, _, _, callback, _, _ = item
+            if future.cancel():
+                cancelled += 1
+                self._deliver(callback, None)
+        return cancelled
+
+    def pending_count(self):
+        """当前排队中的命令数"""
+        return self.pending.qsize()
+
+    def _deliver(self, callback, result):
+        """把结果投递回界面线程"""
+        if callback is None:
+            return
+        if self.ui_scheduler:
+            self.ui_scheduler(callback, result)
+        else:
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"命令回调错误: {e}")
+
+    def _worker(self, source):
+        """工作线程：依次取出命令并执行"""
+        while True:
+            item = source.get()
+            if item is None:
+                break
+
+            future, command, data, callback, handler, queued = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            observer = self.queue_observer
+            if observer is not None and queued:
+                observer(command, time.perf_counter() - queued)
+
+            try:
+                result = (handler or self.handler)(command, data)
+            except Exception as e:
+                print(f"命令执行错误: {e}")
+                result = None
+
+            future.set_result(result)
+            self._deliver(callback, result)
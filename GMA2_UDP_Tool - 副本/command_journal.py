@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线命令日志 - 网络中断时发送失败的命令追加写入本地日志，恢复连接后按顺序重发
+
+日志为逐行JSON、只追加写入：
+    命令行: {"id": 幂等键, "ts": 时间戳, "command": ..., "data": ..., "critical": 是否安全关键}
+    完成行: {"done": 幂等键, "result": "sent" | "rejected" | "expired" | "superseded"}
+安全关键命令（如紧急停止）过期后绝不重发，避免恢复连接时执行过时的操作
+重发期间操作人员发出的新命令优先：日志中同组的旧命令不再重发（紧急停止、系统复位覆盖全部），
+正在重发的命令完成后新命令才发出，旧命令不会晚于新命令到达控制系统
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+from command_dispatcher import CRITICAL_COMMANDS
+from transports import CommandRejected, TransportError
+
+
+# 同一组的命令后发的覆盖先发的，其他命令按命令名分组
+SUPERSEDE_GROUPS = {
+    'play_scene': 'scene',
+    'pause_scene': 'scene',
+    'stop_scene': 'scene',
+    'go': 'scene',
+    'lights_control': 'lights',
+    'set_volume': 'volume',
+}
+
+
+def supersede_group(command):
+    return SUPERSEDE_GROUPS.get(command, command)
+
+
+def new_request_id():
+    """生成命令幂等键"""
+    return uuid.uuid4().hex
+
+
+class CommandJournal:
+    """只追加写入的命令日志，批量fsync"""
+
+    def __init__(self, path, fsync_interval=0.2, fsync_batch=16):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+
+        self.lock = threading.Lock()
+        # 幂等键 -> 未完成的命令（保持写入顺序）
+        self.pending = {}
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+        self.load()
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def load(self):
+        """读取已有日志，恢复未完成的命令"""
+        if not os.path.exists(self.path):
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            return
+        valid_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # 崩溃时最后一行可能不完整
+                    break
+                valid_size += len(line)
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    continue
+                if 'done' in record:
+                    self.pending.pop(record['done'], None)
+                elif 'id' in record:
+                    self.pending[record['id']] = record
+        # 截掉不完整的尾行，避免之后追加的记录和它拼在同一行
+        if valid_size < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+
+    def append(self, command, data=None, request_id=None):
+        """记录一条待重发的命令，返回其幂等键"""
+        record = {
+            'id': request_id or new_request_id(),
+            'ts': time.time(),
+            'command': command,
+            'data': data or {},
+            'critical': command in CRITICAL_COMMANDS,
+        }
+        with self.lock:
+            self.pending[record['id']] = record
+            self._write(record)
+        return record['id']
+
+    def complete(self, request_id, result='sent'):
+        """标记命令已完成（已发送、被拒绝或已过期）"""
+        with self.lock:
+            if self.pending.pop(request_id, None) is None:
+                return
+            self._write({'done': request_id, 'result': result})
+            if not self.pending:
+                self._compact()
+
+    def supersede(self, command):
+        """新命令已发出：丢弃日志中被它覆盖的旧命令，返回丢弃的条数"""
+        with self.lock:
+            if not self.pending:
+                return 0
+            if command in CRITICAL_COMMANDS:
+                stale = list(self.pending)
+            else:
+                group = supersede_group(command)
+                stale = [request_id for request_id, record in self.pending.items()
+                         if supersede_group(record['command']) == group]
+            for request_id in stale:
+                del self.pending[request_id]
+                self._write({'done': request_id, 'result': 'superseded'})
+            if stale and not self.pending:
+                self._compact()
+        return len(stale)
+
+    def is_pending(self, request_id):
+        with self.lock:
+            return request_id in self.pending
+
+    def entries(self):
+        """按写入顺序返回未完成的命令"""
+        with self.lock:
+            return list(self.pending.values())
+
+    def sync(self):
+        """立即把日志刷到磁盘"""
+        with self.lock:
+            self._sync()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self._sync()
+                self.file.close()
+                self.file = None
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.file.flush()
+        self.unsynced += 1
+        if (self.unsynced >= self.fsync_batch
+                or time.monotonic() - self.last_sync >= self.fsync_interval):
+            self._sync()
+
+    def _sync(self):
+        if self.unsynced:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def _compact(self):
+        """所有命令都已完成时清空日志文件"""
+        self.file.truncate(0)
+        self.file.seek(0)
+        self._sync()
+
+
+class JournalReplayer:
+    """恢复连接后按顺序重发日志中的命令"""
+
+    def __init__(self, manager, journal, max_age=60.0, critical_max_age=2.0):
+        self.manager = manager
+        self.journal = journal
+        # 普通命令与安全关键命令允许重发的最长时间（秒）
+        self.max_age = max_age
+        self.critical_max_age = critical_max_age
+
+        self.lock = threading.Lock()
+        # 重发一条命令期间持有，新命令在其完成后才发出
+        self.send_lock = threading.Lock()
+        self.thread = None
+
+    def before_send(self, command):
+        """发出新命令之前调用：丢弃日志中被它覆盖的旧命令；正在重发时等当前这条完成
+        安全关键命令不等待（已发出的那一条重发无法撤回，之后的全部丢弃）"""
+        if not self.journal.pending:
+            return
+        if command in CRITICAL_COMMANDS:
+            dropped = self.journal.supersede(command)
+        else:
+            with self.send_lock:
+                dropped = self.journal.supersede(command)
+        if dropped:
+            print(f"新命令 {command} 覆盖了 {dropped} 条待重发的命令")
+
+    def trigger(self):
+        """在后台线程中开始重发（已在重发时忽略）"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            if not self.journal.entries():
+                return
+            self.thread = threading.Thread(target=self.replay, name='journal-replay', daemon=True)
+            self.thread.start()
+
+    def replay(self):
+        """按顺序重发，遇到网络失败时停止，返回成功重发的条数"""
+        sent = 0
+        for record in self.journal.entries():
+            age = time.time() - record['ts']
+            limit = self.critical_max_age if record.get('critical') else self.max_age
+            if age > limit:
+                print(f"丢弃过期命令: {record['command']}（{age:.0f}秒前）")
+                self.journal.complete(record['id'], 'expired')
+                continue
+
+            transport = self.manager.route_command(record['command'])
+            with self.send_lock:
+                if not self.journal.is_pending(record['id']):
+                    # 已被操作人员的新命令覆盖
+                    continue
+                try:
+                    transport.send(record['command'], record['data'], record['id'])
+                except TransportError as e:
+                    print(f"重发中断，等待下次连接恢复: {e}")
+                    break
+                except CommandRejected as e:
+                    print(f"重发命令被拒绝: {record['command']} ({e})")
+                    self.journal.complete(record['id'], 'rejected')
+                    continue
+                self.journal.complete(record['id'], 'sent')
+            sent += 1
+
+        self.journal.sync()
+        return sent
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令注册表 - 每条命令只定义一次（二进制编号 + 参数字段），发送时不再逐次构造字典并JSON编码
+    无参数和参数只有枚举值的命令（灯光、暂停、停止、紧急停止等）在启动时编码为字节
+    带参数的命令（音量、场景名等）按字段模板拼接（字段顺序按定义），只编码参数值
+    可选字段（如连续参数通道附加的 seq）跟在必需字段之后，有值时才编码
+    不在注册表中或参数与定义不符的命令回退为通用JSON编码
+
+紧凑二进制编码（UDP数据报带 FLAG_BINARY 标志时使用）：
+    命令编号(uint8) | 各字段依次：整数 int32，枚举 uint8 序号，字符串 uint16 长度 + UTF-8
+    | 有可选字段的命令：uint8 存在位图（第i位对应第i个可选字段）+ 存在的可选字段
+    | 幂等键（可选）：uint8 长度 + ASCII
+"""
+
+import json
+import struct
+
+# 字段类型
+INT = 'int'
+STR = 'str'
+
+LIGHT_ACTIONS = ('full', 'dim', 'red', 'green', 'blue', 'off')
+
+# 连续参数通道（CoalescingChannel）给每个值附加的递增序号
+SEQ_FIELD = ('seq', INT)
+
+# (命令, 二进制编号, [(字段, 类型或枚举取值)][, [可选字段]])，编号写入二进制报文，已分配的不能修改
+# 可选字段只支持整数和字符串
+COMMAND_SPECS = [
+    ('lights_control', 1, [('action', LIGHT_ACTIONS)]),
+    ('set_volume', 2, [('volume', INT)], [SEQ_FIELD]),
+    ('play_scene', 3, [('scene_name', STR)]),
+    ('pause_scene', 4, []),
+    ('stop_scene', 5, []),
+    ('emergency_stop', 6, []),
+    ('system_reset', 7, []),
+    ('arm_scene', 8, [('scene_name', STR), ('scene_id', INT)]),
+    ('disarm_scene', 9, [('token', STR)]),
+    ('go', 10, [('token', STR)]),
+]
+
+INT32 = struct.Struct('!i')
+UINT16 = struct.Struct('!H')
+_MISSING = object()
+
+
+def encode_json(command, data):
+    """通用JSON编码"""
+    return json.dumps({'command': command, 'data': data or {}}, separators=(',', ':')).encode('utf-8')
+
+
+class CommandSpec:
+    """一条命令的定义和编码模板"""
+
+    def __init__(self, name, code, fields, optional=()):
+        self.name = name
+        self.code = code
+        self.fields = list(fields)
+        self.optional = list(optional)
+        # 可选字段前的固定片段（跟在必需字段之后）
+        self.optional_fragments = [f',"{field}":'.encode('utf-8') for field, _ in self.optional]
+
+        # JSON模板：字段值之间的固定片段
+        head = json.dumps(name)
+        if self.fields:
+            self.fragments = [f'{{"command":{head},"data":{{"{self.fields[0][0]}":'.encode('utf-8')]
+            for field, _ in self.fields[1:]:
+                self.fragments.append(f',"{field}":'.encode('utf-8'))
+            self.tail = b'}}'
+        else:
+            self.fragments = []
+            self.tail = f'{{"command":{head},"data":{{}}}}'.encode('utf-8')
+
+        # 常量负载：无参数命令和枚举参数的每个取值预先编码（JSON和二进制）
+        self.binary_code = bytes([code])
+        self.constants = {}
+        self.binary_constants = {}
+        if len(self.fields) == 1 and isinstance(self.fields[0][1], tuple):
+            field, values = self.fields[0]
+            for index, value in enumerate(values):
+                self.constants[value] = encode_json(name, {field: value})
+                self.binary_constants[value] = self.binary_code + bytes([index])
+
+    def optional_count(self, data):
+        """参数中可选字段的个数，有未定义的字段或可选字段类型不符时返回None"""
+        count = 0
+        for field, kind in self.optional:
+            value = data.get(field, _MISSING)
+            if value is _MISSING:
+                continue
+            if type(value) is not (int if kind == INT else str):
+                return None
+            count += 1
+        if len(data) != len(self.fields) + count:
+            return None
+        return count
+
+    def matches(self, data):
+        """参数是否符合定义（字段相同且类型正确）"""
+        if len(data) != len(self.fields) and self.optional_count(data) is None:
+            return False
+        for field, kind in self.fields:
+            value = data.get(field, _MISSING)
+            if kind == INT:
+                if type(value) is not int:
+                    return False
+            elif kind == STR:
+                if type(value) is not str:
+                    return False
+            elif value not in kind:
+                return False
+        return True
+
+    def constant(self, data, constants):
+        """常量命令的预编码负载，不是常量命令或参数不符时返回None"""
+        if not data:
+            return None if self.fields else (self.tail if constants is self.constants else self.binary_code)
+        if not constants or len(data) != 1:
+            return None
+        try:
+            return constants.get(data.get(self.fields[0][0]))
+        except TypeError:
+            # 参数值不可哈希（不是枚举取值）
+            return None
+
+    def encode(self, data):
+        """编码为JSON，参数不符合定义时返回None"""
+        if not self.fields or self.constants:
+            return self.constant(data, self.constants)
+        if not data:
+            return None
+        extra = len(data) != len(self.fields)
+        if extra and not self.optional_count(data):
+            return None
+        # 检查类型的同时拼接模板
+        body = b''
+        for fragment, (field, kind) in zip(self.fragments, self.fields):
+            value = data.get(field, _MISSING)
+            if type(value) is not (int if kind == INT else str):
+                return None
+            body += fragment + (b'%d' % value if kind == INT else json.dumps(value).encode('utf-8'))
+        if extra:
+            for fragment, (field, kind) in zip(self.optional_fragments, self.optional):
+                value = data.get(field, _MISSING)
+                if value is not _MISSING:
+                    body += fragment + (b'%d' % value if kind == INT else json.dumps(value).encode('utf-8'))
+        return body + self.tail
+
+    def encode_binary(self, data):
+        """编码为二进制，参数不符合定义时返回None"""
+        if not self.fields or self.constants:
+            return self.constant(data, self.binary_constants)
+        if not data or not self.matches(data):
+            return None
+        parts = [self.binary_code]
+        for field, kind in self.fields:
+            self._pack(parts, kind, data[field])
+        if self.optional:
+            mask_index = len(parts)
+            parts.append(b'')
+            mask = 0
+            for bit, (field, kind) in enumerate(self.optional):
+                value = data.get(field, _MISSING)
+                if value is not _MISSING:
+                    mask |= 1 << bit
+                    self._pack(parts, kind, value)
+            parts[mask_index] = bytes([mask])
+        return b''.join(parts)
+
+    @staticmethod
+    def _pack(parts, kind, value):
+        if kind == INT:
+            parts.append(INT32.pack(value))
+        else:
+            raw = value.encode('utf-8')
+            parts.append(UINT16.pack(len(raw)))
+            parts.append(raw)
+
+    def decode_binary(self, body, offset):
+        """从offset开始解析字段，返回(数据, 结束位置)"""
+        data = {}
+        for field, kind in self.fields:
+            data[field], offset = self._unpack(body, offset, kind)
+        if self.optional:
+            mask = body[offset]
+            offset += 1
+            for bit, (field, kind) in enumerate(self.optional):
+                if mask & (1 << bit):
+                    data[field], offset = self._unpack(body, offset, kind)
+        return data, offset
+
+    @staticmethod
+    def _unpack(body, offset, kind):
+        """解析一个字段，返回(值, 结束位置)"""
+        if kind == INT:
+            return INT32.unpack_from(body, offset)[0], offset + INT32.size
+        if kind == STR:
+            length = UINT16.unpack_from(body, offset)[0]
+            offset += UINT16.size
+            if offset + length > len(body):
+                raise IndexError('字符串字段被截断')
+            return body[offset:offset + length].decode('utf-8'), offset + length
+        return kind[body[offset]], offset + 1
+
+
+class CommandRegistry:
+    """命令注册表"""
+
+    def __init__(self, specs=COMMAND_SPECS):
+        self.commands = {}
+        self.codes = {}
+        for spec in specs:
+            self.register(*spec)
+
+    def register(self, name, code, fields=(), optional=()):
+        spec = CommandSpec(name, code, fields, optional)
+        if code in self.codes and self.codes[code].name != name:
+            raise ValueError(f"命令编号重复: {code}")
+        self.commands[name] = spec
+        self.codes[code] = spec
+        return spec
+
+    def get(self, name):
+        return self.commands.get(name)
+
+    def validate(self, command, data=None):
+        """检查命令和参数是否符合定义"""
+        spec = self.commands.get(command)
+        return spec is not None and spec.matches(data or {})
+
+    def encode(self, command, data=None):
+        """编码为JSON字节，注册的命令走预编码/模板，其他走通用编码"""
+        spec = self.commands.get(command)
+        if spec is not None:
+            if not data and not spec.fields:
+                # 无参数的常量命令（暂停、停止、紧急停止等）直接返回预编码负载
+                return spec.tail
+            body = spec.encode(data)
+            if body is not None:
+                return body
+        return encode_json(command, data)
+
+    def encode_binary(self, command, data=None, request_id=None):
+        """编码为紧凑二进制，命令未注册或参数不符合定义时返回None（由调用方改用JSON）"""
+        spec = self.commands.get(command)
+        if spec is None:
+            return None
+        if not data and not spec.fields:
+            body = spec.binary_code
+        else:
+            try:
+                body = spec.encode_binary(data)
+            except struct.error:
+                # 整数或字符串超出二进制字段范围
+                return None
+        if body is not None and request_id:
+            raw = request_id.encode('ascii')
+            body += bytes([len(raw)]) + raw
+        return body
+
+    def decode_binary(self, body):
+        """解析二进制命令，返回(命令, 数据, 幂等键)，格式错误返回None"""
+        if not body:
+            return None
+        spec = self.codes.get(body[0])
+        if spec is None:
+            return None
+        try:
+            data, offset = spec.decode_binary(body, 1)
+            request_id = None
+            if offset < len(body):
+                length = body[offset]
+                if offset + 1 + length != len(body):
+                    return None
+                request_id = body[offset + 1:].decode('ascii')
+        except (struct.error, IndexError, UnicodeDecodeError):
+            return None
+        return spec.name, data, request_id
+
+
+# 全局注册表
+REGISTRY = CommandRegistry()
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网络连接管理 - 与主控制系统之间的HTTP通信
+不依赖Kivy，可在无界面环境中使用；requests在首次请求时才导入
+"""
+
+import threading
+import time
+
+from coalescer import CoalescingChannel
+from command_dispatcher import CRITICAL_COMMANDS, CommandDispatcher
+from command_journal import CommandJournal, JournalReplayer, new_request_id
+from health import ONLINE_STATES, HealthMonitor
+from instrumentation import Instrumentation, install_connect_timer
+from push_channel import PushChannel
+from transports import CommandRejected, HttpTransport, TransportError, UdpTransport
+
+
+class ConnectionManager:
+    """网络连接管理器"""
+    
+    # 各接口超时（连接超时, 读取超时），单位秒
+    DEFAULT_TIMEOUTS = {
+        'status': (2, 5),
+        'command': (2, 10),
+        'scenes': (2, 5),
+        'assets': (2, 10),
+        'critical': (1, 3),
+    }
+    
+    # 配置UDP后走UDP直连的命令类型（灯光控制）
+    UDP_COMMANDS = frozenset(['lights_control'])
+    
+    def __init__(self, ui_scheduler=None, pool_size=4, max_retries=2, backoff_factor=0.2, timeouts=None,
+                 continuous_rate=10.0):
+        self.server_ip = "192.168.1.100"  # 主控制系统IP
+        self.server_port = 8080
+        self.websocket_port = 8081
+        
+        self.connected = False
+        # 连接状态：disconnected（未检测），启用健康监测后为 connected/degraded/reconnecting/offline
+        self.connection_state = 'disconnected'
+        self.state_lock = threading.Lock()
+        self.websocket = None
+        self.last_heartbeat = 0
+        
+        # 状态回调
+        self.status_callbacks = []
+        # 命令结果回调 listener(command, elapsed, result)，用于运行监控
+        self.command_listeners = []
+        # 关键命令回调 listener()，在关键命令提交时（发出之前）调用，用于立即中止时间线等
+        self.critical_listeners = []
+        
+        # 持久化HTTP会话（连接池 + keep-alive）
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeouts = dict(self.DEFAULT_TIMEOUTS)
+        self.timeouts.update(timeouts or {})
+        self.session = None
+        # 安全关键命令专用会话（单独的预热连接，不与其他请求争用连接池）
+        self.critical_session = None
+        # 场景素材批量下载专用会话（不占用命令的连接池）
+        self.asset_session = None
+        self.asset_pool_size = 4
+        self.session_lock = threading.Lock()
+        
+        # 命令传输层（默认全部走HTTP，调用enable_udp后灯光命令走UDP）
+        self.http_transport = HttpTransport(self)
+        self.critical_transport = HttpTransport(self, critical=True)
+        self.udp_transport = None
+        self.udp_port = None
+        
+        # 连续参数通道（音量、推子等只发送最新值，失败不写入离线日志）
+        self.continuous = CoalescingChannel(
+            lambda command, data: self.send_command(command, data, journal=False),
+            max_rate=continuous_rate
+        )
+        
+        # 命令调度器（所有命令请求都在后台线程执行，关键命令优先并清空其他通道）
+        self.dispatcher = CommandDispatcher(
+            self.send_command,
+            ui_scheduler=ui_scheduler,
+            on_critical=self.notify_critical
+        )
+        
+        # 命令耗时统计（调用enable_instrumentation后启用，未启用时为None）
+        self.instrumentation = None
+        
+        # 离线命令日志（调用enable_journal后启用）
+        self.journal = None
+        self.replayer = None
+        
+        # WebSocket状态推送（HTTP轮询作为后备）
+        self.push = PushChannel(self)
+        
+        # 后台连接健康监测（调用start_health后启用）
+        self.health = HealthMonitor(self)
+        
+    def set_server_address(self, ip, port=8080):
+        """设置服务器地址"""
+        if ip == self.server_ip and port == self.server_port:
+            return
+        self.server_ip = ip
+        self.server_port = port
+        # 目标变化后丢弃旧连接池，下次请求时重建
+        self.reset_session()
+        if self.udp_transport is not None:
+            self.udp_transport.set_target(ip, self.udp_port)
+        if self.push.running:
+            self.push.reconnect()
+    
+    @property
+    def base_url(self):
+        return f"http://{self.server_ip}:{self.server_port}"
+    
+    def build_session(self, pool_size=None, max_retries=None):
+        """创建带连接池和重试策略的会话"""
+        # requests导入较慢，首次发起请求时才导入
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        if max_retries is None:
+            max_retries = self.max_retries
+        
+        # 连接失败对所有请求重试；读取失败和5xx只对GET重试，避免重复执行命令
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size or self.pool_size,
+            max_retries=retry
+        )
+        if self.instrumentation is not None:
+            # 统计建立连接的耗时
+            install_connect_timer(adapter)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def get_session(self):
+        """获取当前会话，不存在时创建"""
+        with self.session_lock:
+            if self.session is None:
+                self.session = self.build_session()
+            return self.session
+    
+    def get_critical_session(self):
+        """获取关键命令专用会话，不存在时创建"""
+        with self.session_lock:
+            if self.critical_session is None:
+                self.critical_session = self.build_session(pool_size=1, max_retries=1)
+            return self.critical_session
+    
+    def get_asset_session(self):
+        """获取场景素材下载专用会话，不存在时创建"""
+        with self.session_lock:
+            if self.asset_session is None:
+                self.asset_session = self.build_session(pool_size=self.asset_pool_size)
+            return self.asset_session
+    
+    def prewarm_critical(self):
+        """预先建立关键命令专用连接，紧急停止时无需再握手"""
+        try:
+            url = f"{self.base_url}/api/status"
+            self.get_critical_session().get(url, timeout=self.timeouts['critical'])
+        except Exception as e:
+            print(f"预热关键命令连接失败: {e}")
+    
+    def reset_session(self):
+        """关闭并丢弃当前会话"""
+        with self.session_lock:
+            sessions = (self.session, self.critical_session, self.asset_session)
+            self.session = None
+            self.critical_session = None
+            self.asset_session = None
+        for session in sessions:
+            if session is not None:
+                session.close()
+        
+    def enable_udp(self, port, ack=True, ack_timeout=0.5, binary=False):
+        """启用UDP直连传输，binary=True时使用紧凑二进制编码"""
+        self.disable_udp()
+        self.udp_port = port
+        self.udp_transport = UdpTransport(self.server_ip, port, ack=ack, ack_timeout=ack_timeout, binary=binary)
+        self.udp_transport.instrumentation = self.instrumentation
+    
+    def disable_udp(self):
+        """停用UDP直连传输"""
+        if self.udp_transport is not None:
+            self.udp_transport.close()
+        self.udp_transport = None
+        self.udp_port = None
+    
+    def route_command(self, command):
+        """按命令类型选择传输方式"""
+        if command in CRITICAL_COMMANDS:
+            return self.critical_transport
+        if self.udp_transport is not None and command in self.UDP_COMMANDS:
+            return self.udp_transport
+        return self.http_transport
+    
+    def add_status_callback(self, callback):
+        """添加状态变化回调"""
+        self.status_callbacks.append(callback)
+        
+    def notify_status_change(self, status):
+        """通知状态变化"""
+        if isinstance(status, str) and status in ONLINE_STATES and self.replayer is not None:
+            # 连接恢复后重发离线期间的命令
+            self.replayer.trigger()
+        for callback in self.status_callbacks:
+            try:
+                callback(status)
+            except Exception as e:
+                print(f"状态回调错误: {e}")
+    
+    def set_connection_state(self, state):
+        """更新连接状态，状态变化时通知"""
+        with self.state_lock:
+            if state == self.connection_state:
+                return
+            self.connection_state = state
+            self.connected = state in ONLINE_STATES
+        self.notify_status_change(state)
+    
+    def report_alive(self, rtt=None):
+        """链路正常的证据（请求成功、收到推送），rtt为可用的往返时延样本（秒）"""
+        if self.health.running:
+            self.health.observe_alive(rtt)
+        elif not self.connected:
+            self.set_connection_state("connected")
+    
+    def report_failure(self):
+        """链路异常的证据（请求超时、推送断开），启用健康监测时立即探测确认"""
+        if self.health.running:
+            self.health.observe_failure()
+        elif self.connected:
+            self.set_connection_state("disconnected")
+    
+    def set_health_relay(self, active):
+        """会话中心连接期间由其流量确认链路（report_alive），暂停健康监测的 /api/status 定期探测"""
+        self.health.set_relayed(active)
+    
+    def test_connection(self):
+        """测试连接"""
+        try:
+            url = f"{self.base_url}/api/status"
+            started = time.perf_counter()
+            response = self.get_session().get(url, timeout=self.timeouts['status'])
+            if response.status_code == 200:
+                self.report_alive(time.perf_counter() - started)
+                return True
+        except Exception as e:
+            print(f"连接测试失败: {e}")
+        
+        if self.health.running:
+            self.report_failure()
+        else:
+            self.set_connection_state("disconnected")
+        return False
+    
+    def add_command_listener(self, listener):
+        """添加命令结果回调（在发送命令的线程中调用）"""
+        self.command_listeners.append(listener)
+    
+    def add_critical_listener(self, listener):
+        """添加关键命令回调（在提交关键命令的线程中调用，应立即返回）"""
+        self.critical_listeners.append(listener)
+    
+    def remove_critical_listener(self, listener):
+        if listener in self.critical_listeners:
+            self.critical_listeners.remove(listener)
+    
+    def notify_critical(self):
+        """关键命令即将发出：清空连续参数通道并通知关键命令回调（可重复调用）"""
+        self.continuous.clear()
+        for listener in list(self.critical_listeners):
+            try:
+                listener()
+            except Exception as e:
+                print(f"关键命令回调错误: {e}")
+    
+    def send_command(self, command, data=None, journal=True):
+        """发送控制命令，网络失败时写入离线日志，返回None"""
+        if command in CRITICAL_COMMANDS:
+            # 同步调用时也在发出之前通知（经调度器提交时已在提交时通知过）
+            self.notify_critical()
+        if not self.command_listeners:
+            return self._send_command(command, data, journal)
+        
+        started = time.perf_counter()
+        result = self._send_command(command, data, journal)
+        elapsed = time.perf_counter() - started
+        for listener in self.command_listeners:
+            try:
+                listener(command, elapsed, result)
+            except Exception as e:
+                print(f"命令回调错误: {e}")
+        return result
+    
+    def _send_command(self, command, data, journal):
+        if self.replayer is not None:
+            # 日志中被本命令覆盖的旧命令不再重发
+            self.replayer.before_send(command)
+        request_id = new_request_id() if self.journal is not None else None
+        transport = self.route_command(command)
+        try:
+            result = transport.send(command, data, request_id)
+        except CommandRejected as e:
+            print(f"命令发送失败: {e}")
+        except TransportError as e:
+            print(f"发送命令错误: {e}")
+            if transport is not self.udp_transport:
+                # UDP丢包不代表HTTP链路异常
+                self.report_failure()
+            if journal and self.journal is not None:
+                self.journal.append(command, data, request_id)
+        else:
+            if transport is not self.udp_transport:
+                self.report_alive()
+            return result
+        return None
+    
+    def send_encoded(self, command, body):
+        """经关键命令专用连接发送预先编码的命令（如场景GO），失败返回None，不写入离线日志"""
+        if self.replayer is not None:
+            self.replayer.before_send(command)
+        started = time.perf_counter()
+        try:
+            result = self.critical_transport.send_encoded(command, body)
+        except CommandRejected as e:
+            print(f"命令发送失败: {e}")
+            result = None
+        except TransportError as e:
+            print(f"命令发送失败: {e}")
+            self.report_failure()
+            result = None
+        else:
+            self.report_alive()
+        if self.command_listeners:
+            elapsed = time.perf_counter() - started
+            for listener in self.command_listeners:
+                try:
+                    listener(command, elapsed, result)
+                except Exception as e:
+                    print(f"命令回调错误: {e}")
+        return result
+    
+    def send_batch(self, commands, atomic=False, journal=True):
+        """批量发送命令（一次HTTP请求，UDP命令为一串数据报），返回每条命令的结果，失败为None
+        commands中每项为(命令, 数据)；atomic=True时整批经HTTP发送，由控制系统保证全部执行或全部不执行"""
+        commands = [(command, data or {}) for command, data in commands]
+        if not commands:
+            return []
+        if any(command in CRITICAL_COMMANDS for command, _ in commands):
+            self.notify_critical()
+        if self.replayer is not None:
+            for command, _ in commands:
+                self.replayer.before_send(command)
+
+        if atomic:
+            try:
+                return self.http_transport.send_batch(commands, atomic=True)
+            except CommandRejected as e:
+                print(f"原子批量命令被拒绝，全部未执行: {e}")
+            except TransportError as e:
+                # 逐条重发会破坏原子性，原子批量命令不写入离线日志
+                print(f"原子批量命令发送失败: {e}")
+            return [None] * len(commands)
+
+        use_journal = journal and self.journal is not None
+        items = [(command, data, new_request_id() if self.journal is not None else None)
+                 for command, data in commands]
+
+        # 按传输方式分组，每组只需一次往返
+        groups = {}
+        for index, item in enumerate(items):
+            transport = self.route_command(item[0])
+            if transport is self.critical_transport:
+                # 批量中的关键命令随同一请求发送
+                transport = self.http_transport
+            groups.setdefault(transport, []).append(index)
+
+        results = [None] * len(items)
+        for transport, indexes in groups.items():
+            try:
+                group_results = transport.send_batch([items[i] for i in indexes])
+            except CommandRejected as e:
+                print(f"批量命令发送失败: {e}")
+                continue
+            except TransportError as e:
+                print(f"批量命令发送错误: {e}")
+                if use_journal:
+                    for index in indexes:
+                        self.journal.append(*items[index])
+                continue
+            for index, result in zip(indexes, group_results):
+                results[index] = result
+                if result is None and use_journal and transport is self.udp_transport:
+                    # UDP无应答，命令可能未送达
+                    self.journal.append(*items[index])
+        return results
+
+    def send_batch_async(self, commands, callback=None, atomic=False):
+        """异步批量发送命令，callback(results)在界面线程中调用"""
+        commands = list(commands)
+        return self.dispatcher.submit(
+            'batch', commands, callback,
+            handler=lambda command, data: self.send_batch(data, atomic=atomic)
+        )
+
+    def enable_journal(self, path, **replay_options):
+        """启用离线命令日志，日志中遗留的命令会在下次连接成功后重发"""
+        self.journal = CommandJournal(path)
+        self.replayer = JournalReplayer(self, self.journal, **replay_options)
+    
+    def enable_instrumentation(self, path=None, interval=60.0):
+        """启用命令耗时统计，指定path时定期把快照写入该文件"""
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation()
+            self.dispatcher.queue_observer = self.instrumentation.record_queue_wait
+            if self.udp_transport is not None:
+                self.udp_transport.instrumentation = self.instrumentation
+            # 重建会话以统计建立连接的耗时
+            self.reset_session()
+        if path:
+            self.instrumentation.start_periodic_dump(path, interval)
+        return self.instrumentation
+    
+    def disable_instrumentation(self):
+        """停用命令耗时统计"""
+        instrumentation, self.instrumentation = self.instrumentation, None
+        if instrumentation is not None:
+            instrumentation.stop_periodic_dump()
+            self.dispatcher.queue_observer = None
+            if self.udp_transport is not None:
+                self.udp_transport.instrumentation = None
+            self.reset_session()
+    
+    def send_command_async(self, command, data=None, callback=None, lane=None, journal=True):
+        """异步发送控制命令，立即返回Future，结果通过callback回到界面线程
+        journal=False时失败不写入离线日志"""
+        handler = None if journal else (lambda command, data: self.send_command(command, data, journal=False))
+        return self.dispatcher.submit(command, data, callback, lane, handler=handler)
+    
+    def send_continuous(self, key, command, data):
+        """发送连续参数（如音量），快速变化时只发送最新值"""
+        return self.continuous.update(key, command, data)
+    
+    def start_push(self, status=True):
+        """开始订阅状态推送，status=False时只订阅场景目录变化（控制系统状态由会话中心转发）"""
+        self.push.status_events = status
+        self.push.start()
+    
+    def stop_push(self):
+        """停止订阅状态推送"""
+        self.push.stop()
+    
+    def start_health(self):
+        """开始后台连接健康监测"""
+        self.health.start()
+    
+    def stop_health(self):
+        """停止连接健康监测，连接状态恢复为未检测"""
+        self.health.stop()
+        self.set_connection_state("disconnected")
+    
+    def close(self):
+        """关闭连接管理器"""
+        self.health.stop()
+        self.push.stop()
+        self.disable_instrumentation()
+        self.dispatcher.stop()
+        self.continuous.stop()
+        self.reset_session()
+        self.disable_udp()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+            self.replayer = None
+        self.connected = False
+        self.connection_state = 'disconnected'
+    
+    def get_scenes(self):
+        """获取场景列表"""
+        try:
+            url = f"{self.base_url}/api/scenes"
+            response = self.get_session().get(url, timeout=self.timeouts['scenes'])
+            if response.status_code == 200:
+                return response.json()
+        except Exception as e:
+            print(f"获取场景列表失败: {e}")
+        return []
+    
+    def fetch_scenes(self, etag=None, since=None):
+        """条件获取场景列表，返回(状态码, 内容, ETag)，失败返回None"""
+        try:
+            url = f"{self.base_url}/api/scenes"
+            headers = {'If-None-Match': etag} if etag else {}
+            params = {'since': since} if since is not None else None
+            response = self.get_session().get(url, headers=headers, params=params, timeout=self.timeouts['scenes'])
+            if response.status_code == 304:
+                return 304, None, etag
+            if response.status_code == 200:
+                return 200, response.json(), response.headers.get('ETag')
+        except Exception as e:
+            print(f"获取场景列表失败: {e}")
+        return None
+    
+    def fetch_asset(self, path):
+        """获取场景素材（缩略图、预览信息），返回响应内容，失败返回None"""
+        try:
+            response = self.get_asset_session().get(f"{self.base_url}{path}", timeout=self.timeouts['assets'])
+            if response.status_code == 200:
+                return response.content
+        except Exception as e:
+            print(f"获取场景素材失败: {e}")
+        return None
+    
+    def get_status(self):
+        """获取系统状态"""
+        try:
+            url = f"{self.base_url}/api/status"
+            response = self.get_session().get(url, timeout=self.timeouts['status'])
+            if response.status_code == 200:
+                return response.json()
+        except Exception as e:
+            print(f"获取状态失败: {e}")
+        return {}
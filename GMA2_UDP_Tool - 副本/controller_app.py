@@ -14,110 +14,49 @@ from kivy.uix.gridlayout import GridLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
-from kivy.uix.popup import Popup
-from kivy.uix.progressbar import ProgressBar
-from kivy.uix.switch import Switch
-from kivy.uix.slider import Slider
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivy.clock import Clock
-from kivy.graphics import Color, Rectangle
 from kivy.metrics import dp
-from kivy.core.window import Window
 
-import requests
-import json
+import os
 import threading
-import time
 from datetime import datetime
-import websocket
-import ssl
 
-class ConnectionManager:
-    """网络连接管理器"""
-    
-    def __init__(self):
-        self.server_ip = "192.168.1.100"  # 主控制系统IP
-        self.server_port = 8080
-        self.websocket_port = 8081
-        
-        self.connected = False
-        self.websocket = None
-        self.last_heartbeat = 0
-        
-        # 状态回调
-        self.status_callbacks = []
-        
-    def set_server_address(self, ip, port=8080):
-        """设置服务器地址"""
-        self.server_ip = ip
-        self.server_port = port
-        
-    def add_status_callback(self, callback):
-        """添加状态变化回调"""
-        self.status_callbacks.append(callback)
-        
-    def notify_status_change(self, status):
-        """通知状态变化"""
-        for callback in self.status_callbacks:
-            try:
-                callback(status)
-            except Exception as e:
-                print(f"状态回调错误: {e}")
-    
-    def test_connection(self):
-        """测试连接"""
-        try:
-            url = f"http://{self.server_ip}:{self.server_port}/api/status"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                self.connected = True
-                self.notify_status_change("connected")
-                return True
-        except Exception as e:
-            print(f"连接测试失败: {e}")
-        
-        self.connected = False
-        self.notify_status_change("disconnected")
-        return False
-    
-    def send_command(self, command, data=None):
-        """发送控制命令"""
-        try:
-            url = f"http://{self.server_ip}:{self.server_port}/api/command"
-            payload = {"command": command, "data": data or {}}
-            
-            response = requests.post(url, json=payload, timeout=10)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"命令发送失败: {response.status_code}")
-                return None
-                
-        except Exception as e:
-            print(f"发送命令错误: {e}")
-            return None
-    
-    def get_scenes(self):
-        """获取场景列表"""
-        try:
-            url = f"http://{self.server_ip}:{self.server_port}/api/scenes"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                return response.json()
-        except Exception as e:
-            print(f"获取场景列表失败: {e}")
-        return []
-    
-    def get_status(self):
-        """获取系统状态"""
-        try:
-            url = f"http://{self.server_ip}:{self.server_port}/api/status"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                return response.json()
-        except Exception as e:
-            print(f"获取状态失败: {e}")
-        return {}
+# 网络库（requests、websocket）在首次使用时才导入，见connection_manager/push_channel；
+# 发现、场景目录、宏、时间线、会话同步等子系统在登录后或首次使用时才导入
+from connection_manager import ConnectionManager
+from health import HEALTH_CONNECTED, HEALTH_DEGRADED, HEALTH_OFFLINE, HEALTH_RECONNECTING
+from state_store import CONNECTION, CURRENT_SCENE, SCENE_ARM, USER, VOLUME, StateStore
+
+# 没有场景目录缓存时显示的示例场景
+DEFAULT_SCENES = [
+    {'name': '开场音乐', 'description': '演出开场背景音乐'},
+    {'name': '主持人介绍', 'description': '主持人上台介绍环节'},
+    {'name': '节目表演1', 'description': '第一个节目表演'},
+    {'name': '互动环节', 'description': '观众互动时间'},
+    {'name': '节目表演2', 'description': '第二个节目表演'},
+    {'name': '结束致谢', 'description': '演出结束感谢观众'},
+]
+
+
+# 状态栏时钟格式（只显示到分钟，每分钟刷新一次）
+CLOCK_FORMAT = '%H:%M'
+
+
+def schedule_on_ui(func, *args):
+    """把后台线程的回调投递回Kivy主线程执行"""
+    Clock.schedule_once(lambda dt: func(*args), 0)
+
+
+def format_duration(seconds):
+    """场景时长 分:秒"""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f'{minutes}:{seconds:02d}'
+
+
+def format_address(ip, port=8080):
+    """输入框显示的地址，默认端口时省略端口"""
+    return ip if port == 8080 else f'{ip}:{port}'
 
 
 class LoginScreen(Screen):
@@ -142,6 +81,7 @@ class LoginScreen(Screen):
         # 登录表单
         form_layout = GridLayout(cols=2, spacing=dp(10), size_hint_y=0.4)
         
+        # 上次登录成功的控制系统在启动后的自动搜索中填入
         form_layout.add_widget(Label(text='服务器IP:', size_hint_x=0.3))
         self.ip_input = TextInput(
             text='192.168.1.100',
@@ -171,18 +111,26 @@ class LoginScreen(Screen):
         
         self.connect_btn = Button(
             text='连接',
-            size_hint_x=0.5,
+            size_hint_x=0.35,
             background_color=(0.2, 0.6, 1, 1)
         )
         self.connect_btn.bind(on_press=self.connect_to_server)
         
         self.test_btn = Button(
             text='测试连接',
-            size_hint_x=0.5,
+            size_hint_x=0.35,
             background_color=(0.8, 0.8, 0.8, 1)
         )
         self.test_btn.bind(on_press=self.test_connection)
         
+        self.discover_btn = Button(
+            text='🔍 搜索',
+            size_hint_x=0.3,
+            background_color=(0.5, 0.7, 0.5, 1)
+        )
+        self.discover_btn.bind(on_press=lambda instance: self.discover_controllers())
+        
+        button_layout.add_widget(self.discover_btn)
         button_layout.add_widget(self.test_btn)
         button_layout.add_widget(self.connect_btn)
         
@@ -200,6 +148,85 @@ class LoginScreen(Screen):
         main_layout.add_widget(self.status_label)
         
         self.add_widget(main_layout)
+        
+        self.initial_address = self.ip_input.text
+        # 搜索到的控制系统：输入框地址 -> 控制系统信息
+        self.discovered = {}
+    
+    def auto_discover(self):
+        """启动后自动搜索局域网中的控制系统（由应用在第一帧之后调用）
+        先填入上次登录成功的控制系统，只发送发现请求和确认缓存，没有已知的控制系统时才扫描网段"""
+        last = App.get_running_app().get_discovery().last_known()
+        if last and self.ip_input.text == self.initial_address:
+            self.ip_input.text = format_address(last['ip'], last.get('port', 8080))
+            self.initial_address = self.ip_input.text
+        self.discover_controllers(auto=True)
+    
+    def server_address(self):
+        """输入框中的地址，支持 IP:端口"""
+        text = self.ip_input.text.strip()
+        ip, _, port = text.partition(':')
+        return ip, int(port) if port.isdigit() else 8080
+    
+    def discover_controllers(self, auto=False):
+        """后台搜索控制系统，结果回到界面线程
+        自动搜索时有缓存或 controllers.json 中配置的控制系统则不扫描网段（用户按搜索按钮时才扫描）"""
+        self.discover_btn.disabled = True
+        if not auto:
+            self.update_status('正在搜索控制系统...', (1, 1, 0, 1))
+        from controller_group import ControllerGroup
+        
+        app = App.get_running_app()
+        discovery = app.get_discovery()
+        sweep = not auto or (discovery.last_known() is None
+                             and not ControllerGroup.configured(app.user_data_dir))
+        
+        def discover_thread():
+            controllers = discovery.discover(sweep=sweep)
+            Clock.schedule_once(lambda dt: self.on_discovered(controllers, auto), 0)
+        
+        threading.Thread(target=discover_thread, daemon=True).start()
+    
+    def on_discovered(self, controllers, auto):
+        """处理搜索结果：只有一个时直接填入，多个时让用户选择"""
+        self.discover_btn.disabled = False
+        addresses = [format_address(c['ip'], c['port']) for c in controllers]
+        self.discovered.update(zip(addresses, controllers))
+        if not controllers:
+            if not auto:
+                self.update_status('未发现控制系统，请手动输入IP', (1, 0.5, 0, 1))
+            return
+        if self.ip_input.text in addresses:
+            # 当前地址可用，不打断用户
+            controller = controllers[addresses.index(self.ip_input.text)]
+            self.update_status(f"已找到控制系统: {controller['name']}", (0, 1, 0, 1))
+            return
+        if auto and self.ip_input.text != self.initial_address:
+            # 用户已经手动输入了地址
+            return
+        if len(controllers) == 1:
+            self.select_controller(controllers[0])
+        else:
+            self.choose_controller(controllers)
+    
+    def select_controller(self, controller, popup=None):
+        self.ip_input.text = format_address(controller['ip'], controller['port'])
+        self.update_status(f"已选择控制系统: {controller['name']}", (0, 1, 0, 1))
+        if popup is not None:
+            popup.dismiss()
+    
+    def choose_controller(self, controllers):
+        """发现多个控制系统时弹出选择列表"""
+        from kivy.uix.popup import Popup
+        
+        content = BoxLayout(orientation='vertical', spacing=dp(5))
+        popup = Popup(title='选择控制系统', content=content, size_hint=(0.8, 0.6))
+        for controller in controllers[:8]:
+            btn = Button(text=f"{controller['name']}  {format_address(controller['ip'], controller['port'])}")
+            btn.bind(on_press=lambda instance, c=controller: self.select_controller(c, popup))
+            content.add_widget(btn)
+        self.update_status(f'发现 {len(controllers)} 个控制系统，请选择', (1, 1, 0, 1))
+        popup.open()
     
     def test_connection(self, instance):
         """测试连接"""
@@ -209,7 +236,7 @@ class LoginScreen(Screen):
         # 在后台线程中测试连接
         def test_thread():
             app = App.get_running_app()
-            app.connection_manager.set_server_address(self.ip_input.text)
+            app.connection_manager.set_server_address(*self.server_address())
             
             if app.connection_manager.test_connection():
                 Clock.schedule_once(lambda dt: self.update_status('连接成功！', (0, 1, 0, 1)), 0)
@@ -229,13 +256,21 @@ class LoginScreen(Screen):
         
         def connect_thread():
             app = App.get_running_app()
-            app.connection_manager.set_server_address(self.ip_input.text)
+            ip, port = self.server_address()
+            app.connection_manager.set_server_address(ip, port)
             
             # 模拟登录验证
             if app.connection_manager.test_connection():
+                # 预热紧急停止专用连接
+                app.connection_manager.prewarm_critical()
+                # 记为上次可用的控制系统，下次启动直接填入
+                controller = self.discovered.get(format_address(ip, port))
+                app.get_discovery().remember(ip, port, controller['name'] if controller else None)
+
                 # 保存用户信息
                 app.current_user = self.username_input.text
-                app.server_ip = self.ip_input.text
+                app.server_ip = ip
+                app.state.set(USER, app.current_user)
                 
                 Clock.schedule_once(lambda dt: self.login_success(), 0)
             else:
@@ -252,9 +287,20 @@ class LoginScreen(Screen):
         """登录成功"""
         self.update_status('登录成功！正在进入控制界面...', (0, 1, 0, 1))
         
-        # 切换到主控制界面
+        # 创建登录后才需要的子系统，切换到主控制界面（首次登录时才创建）
         app = App.get_running_app()
-        app.root.current = 'main_control'
+        app.start_services()
+        app.show_screen('main_control')
+        
+        # 订阅状态推送（配置了多设备会话时由会话中心转发控制系统状态，推送通道只接收场景目录变化），
+        # 后台监测连接健康，后台刷新场景目录
+        if app.session is not None:
+            app.session.start()
+        app.connection_manager.start_push(status=app.session is None)
+        app.connection_manager.start_health()
+        threading.Thread(target=app.scene_catalog.refresh, daemon=True).start()
+        # 后台预取场景缩略图和预览信息
+        app.scene_assets.start()
 
 
 class MainControlScreen(Screen):
@@ -286,8 +332,21 @@ class MainControlScreen(Screen):
         
         self.add_widget(main_layout)
         
-        # 定时更新状态
-        Clock.schedule_interval(self.update_status, 2.0)
+        # 订阅连接管理器推送的场景目录变化
+        app = App.get_running_app()
+        app.connection_manager.add_status_callback(
+            lambda status: schedule_on_ui(self.on_status_change, status)
+        )
+        
+        # 状态栏、当前场景和音量只在状态变化时更新
+        app.state.subscribe(CONNECTION, self.show_connection)
+        app.state.subscribe(USER, self.show_user)
+        app.state.subscribe(CURRENT_SCENE, self.show_current_scene, immediate=False)
+        app.state.subscribe(VOLUME, self.show_volume)
+        app.state.subscribe(SCENE_ARM, self.show_scene_arm)
+        
+        # 时钟只在界面可见时走动
+        self.clock_event = None
     
     def create_status_bar(self, parent):
         """创建状态栏"""
@@ -302,7 +361,7 @@ class MainControlScreen(Screen):
         
         # 当前时间
         self.time_label = Label(
-            text=datetime.now().strftime('%H:%M:%S'),
+            text=datetime.now().strftime(CLOCK_FORMAT),
             size_hint_x=0.3,
             halign='center'
         )
@@ -333,18 +392,32 @@ class MainControlScreen(Screen):
         )
         scene_layout.add_widget(scene_title)
         
-        # 场景列表（滚动区域）
-        from kivy.uix.scrollview import ScrollView
-        
-        scroll = ScrollView(size_hint_y=0.7)
-        self.scene_grid = GridLayout(cols=1, spacing=dp(5), size_hint_y=None)
-        self.scene_grid.bind(minimum_height=self.scene_grid.setter('height'))
+        # 场景搜索框（名称、描述、拼音首字母）
+        self.search_input = TextInput(
+            hint_text='🔍 搜索场景（名称/拼音首字母）',
+            multiline=False,
+            size_hint_y=0.08
+        )
+        # 输入防抖，停止输入后再过滤
+        self.search_trigger = Clock.create_trigger(self.apply_search_filter, 0.15)
+        self.search_input.bind(text=lambda instance, text: self.search_trigger())
+        scene_layout.add_widget(self.search_input)
         
-        # 添加示例场景按钮
-        self.create_scene_buttons()
+        # 场景列表（虚拟化滚动区域，只为可见行创建控件）
+        from scene_list import SceneListView
+        from scene_search import SceneSearchIndex
         
-        scroll.add_widget(self.scene_grid)
-        scene_layout.add_widget(scroll)
+        app = App.get_running_app()
+        self.scene_list = SceneListView(
+            select_callback=self.select_scene,
+            visible_callback=app.scene_assets.set_visible,
+            size_hint_y=0.62
+        )
+        app.scene_assets.uploader.on_upload = self.scene_list.set_thumbnail
+        app.scene_assets.uploader.on_evict = lambda key: self.scene_list.set_thumbnail(key, None)
+        self.search_index = SceneSearchIndex()
+        self.load_scene_list()
+        scene_layout.add_widget(self.scene_list)
         
         # 场景控制按钮
         scene_control_layout = GridLayout(cols=3, spacing=dp(5), size_hint_y=0.2)
@@ -374,32 +447,44 @@ class MainControlScreen(Screen):
         scene_layout.add_widget(scene_control_layout)
         parent.add_widget(scene_layout)
     
-    def create_scene_buttons(self):
-        """创建场景按钮"""
-        # 示例场景
-        scenes = [
-            {'name': '开场音乐', 'description': '演出开场背景音乐'},
-            {'name': '主持人介绍', 'description': '主持人上台介绍环节'},
-            {'name': '节目表演1', 'description': '第一个节目表演'},
-            {'name': '互动环节', 'description': '观众互动时间'},
-            {'name': '节目表演2', 'description': '第二个节目表演'},
-            {'name': '结束致谢', 'description': '演出结束感谢观众'},
-        ]
+    def load_scene_list(self):
+        """从场景目录加载场景列表"""
+        app = App.get_running_app()
         
         self.selected_scene = None
+        self.scene_list.set_scenes(app.scene_catalog.scenes)
+        self.search_index.build(app.scene_catalog.scenes)
         
-        for scene in scenes:
-            btn = Button(
-                text=f"{scene['name']}\n{scene['description']}",
-                size_hint_y=None,
-                height=dp(80),
-                halign='center',
-                valign='middle'
-            )
-            btn.bind(size=btn.setter('text_size'))
-            btn.bind(on_press=lambda x, s=scene: self.select_scene(s))
-            
-            self.scene_grid.add_widget(btn)
+        # 场景目录变化时只更新变化的行
+        app.scene_catalog.add_listener(lambda diff: schedule_on_ui(self.apply_scene_changes, diff))
+    
+    def apply_scene_changes(self, diff):
+        """按场景目录的变化增量更新场景列表"""
+        from scene_catalog import scene_key
+        
+        app = App.get_running_app()
+        catalog = app.scene_catalog
+        selected_key = scene_key(self.selected_scene) if self.selected_scene else None
+        
+        for scene in diff['removed']:
+            if scene_key(scene) == selected_key:
+                self.selected_scene = None
+                app.scene_armer.cancel()
+        for scene in diff['changed']:
+            if scene_key(scene) == selected_key:
+                self.selected_scene = scene
+                if not self.group_mode:
+                    # 场景内容变化，重新预备
+                    app.scene_armer.arm(scene)
+        
+        self.scene_list.apply_changes(catalog.scenes, diff)
+        self.search_index.apply_changes(diff, catalog.scenes)
+        if self.search_input.text.strip():
+            self.apply_search_filter()
+    
+    def apply_search_filter(self, *args):
+        """按搜索框内容过滤场景列表"""
+        self.scene_list.show_keys(self.search_index.search(self.search_input.text))
     
     def create_quick_control(self, parent):
         """创建快速控制区域"""
@@ -418,17 +503,23 @@ class MainControlScreen(Screen):
         volume_layout = BoxLayout(orientation='horizontal', size_hint_y=0.15)
         volume_layout.add_widget(Label(text='🔊 音量:', size_hint_x=0.3))
         
+        from kivy.uix.slider import Slider
+        
         self.volume_slider = Slider(
             min=0, max=100, value=50,
             size_hint_x=0.7
         )
+        # 正在应用控制系统推送的音量时不回发
+        self.applying_volume = False
+        # 正在应用其他设备的选择时不回发到会话
+        self.applying_session = False
         self.volume_slider.bind(value=self.on_volume_change)
         volume_layout.add_widget(self.volume_slider)
         
         quick_layout.add_widget(volume_layout)
         
         # 灯光控制
-        light_layout = GridLayout(cols=2, spacing=dp(5), size_hint_y=0.3)
+        light_layout = GridLayout(cols=2, spacing=dp(5), size_hint_y=0.25)
         
         light_buttons = [
             ('💡 全亮', (1, 1, 1, 1), self.lights_full),
@@ -475,10 +566,17 @@ class MainControlScreen(Screen):
         
         quick_layout.add_widget(emergency_layout)
         
+        # 命令宏（多条命令一次发送）
+        from macros import MacroRecorder
+        self.macro_recorder = MacroRecorder()
+        self.macro_layout = GridLayout(cols=4, spacing=dp(5), size_hint_y=0.15)
+        self.build_macro_buttons()
+        quick_layout.add_widget(self.macro_layout)
+        
         # 状态显示
         self.status_display = Label(
             text='系统状态: 待机',
-            size_hint_y=0.2,
+            size_hint_y=0.1,
             color=(0.7, 0.7, 0.7, 1)
         )
         quick_layout.add_widget(self.status_display)
@@ -491,25 +589,42 @@ class MainControlScreen(Screen):
         
         self.settings_btn = Button(
             text='⚙️ 设置',
-            size_hint_x=0.25
+            size_hint_x=0.2
         )
         self.settings_btn.bind(on_press=self.show_settings)
         
         self.monitor_btn = Button(
             text='📊 监控',
-            size_hint_x=0.25
+            size_hint_x=0.2
         )
         self.monitor_btn.bind(on_press=self.show_monitor)
         
         self.refresh_btn = Button(
             text='🔄 刷新',
-            size_hint_x=0.25
+            size_hint_x=0.2
         )
         self.refresh_btn.bind(on_press=self.refresh_data)
         
+        # 演出时间线：按本地提示表 show.cue 自动发送，暂停/停止按钮同时控制时间线
+        self.timeline_btn = Button(
+            text='🎬 时间线',
+            size_hint_x=0.2,
+            disabled=App.get_running_app().timeline is None
+        )
+        self.timeline_btn.bind(on_press=self.start_timeline)
+        
+        # 群控开关：开启后命令同时发送到 controllers.json 中的所有控制系统
+        self.group_mode = False
+        self.group_btn = Button(
+            text='📡 群控: 关',
+            size_hint_x=0.2,
+            disabled=App.get_running_app().controller_group is None
+        )
+        self.group_btn.bind(on_press=self.toggle_group_mode)
+        
         self.logout_btn = Button(
             text='🚪 退出',
-            size_hint_x=0.25,
+            size_hint_x=0.2,
             background_color=(0.8, 0.4, 0.4, 1)
         )
         self.logout_btn.bind(on_press=self.logout)
@@ -517,92 +632,276 @@ class MainControlScreen(Screen):
         bottom_layout.add_widget(self.settings_btn)
         bottom_layout.add_widget(self.monitor_btn)
         bottom_layout.add_widget(self.refresh_btn)
+        bottom_layout.add_widget(self.timeline_btn)
+        bottom_layout.add_widget(self.group_btn)
         bottom_layout.add_widget(self.logout_btn)
         
         parent.add_widget(bottom_layout)
     
     def select_scene(self, scene):
         """选择场景"""
+        from scene_catalog import scene_key
+        from session_sync import SESSION_SELECTED_SCENE
+        
         self.selected_scene = scene
-        self.status_display.text = f"已选择: {scene['name']}"
+        app = App.get_running_app()
+        if app.session is not None and not self.applying_session:
+            app.session.publish(SESSION_SELECTED_SCENE, scene_key(scene))
+        preview = app.scene_assets.preview(scene_key(scene))
+        if preview and preview.get('duration') is not None:
+            self.status_display.text = f"已选择: {scene['name']}（时长 {format_duration(preview['duration'])}）"
+        else:
+            self.status_display.text = f"已选择: {scene['name']}"
         self.status_display.color = (0, 1, 0, 1)
+        if self.group_mode:
+            return
+        if self.applying_session:
+            # 其他设备的选择已由该设备预备，这里只记录选中的场景
+            app.scene_armer.select(scene)
+        else:
+            # 后台预备，按下播放时只需发送GO
+            app.scene_armer.arm(scene)
+    
+    def set_status_display(self, text, color):
+        """更新状态显示"""
+        self.status_display.text = text
+        self.status_display.color = color
+    
+    def command_feedback(self, success_text, success_color, failure_text):
+        """生成命令结果回调，在界面线程中更新状态显示"""
+        def on_result(result):
+            if result:
+                self.set_status_display(success_text, success_color)
+            else:
+                self.set_status_display(failure_text, (1, 0, 0, 1))
+        return on_result
+    
+    def send_command(self, command, data=None, callback=None):
+        """异步发送命令，录制宏时同时记录；群控开启时发送到所有控制系统"""
+        self.macro_recorder.record(command, data)
+        app = App.get_running_app()
+        if self.group_mode:
+            app.controller_group.send_async(command, data, callback=self.group_feedback(command))
+        else:
+            app.mirror.apply(command, data, callback=callback)
+    
+    def toggle_group_mode(self, instance):
+        """开启/关闭群控"""
+        self.group_mode = not self.group_mode
+        self.group_btn.text = '📡 群控: 开' if self.group_mode else '📡 群控: 关'
+        app = App.get_running_app()
+        if self.group_mode:
+            # 群控直接发送play_scene，不使用单个控制系统的预备
+            app.scene_armer.cancel()
+            names = app.controller_group.names()
+            self.set_status_display(f"群控: {'、'.join(names)}", (1, 1, 0, 1))
+        elif self.selected_scene:
+            app.scene_armer.arm(self.selected_scene)
+    
+    def group_feedback(self, command):
+        """生成群控结果回调，显示各控制系统的汇总结果"""
+        def on_result(result):
+            if result is None:
+                self.set_status_display(f"群控 {command} 未执行", (1, 0, 0, 1))
+            elif result.ok:
+                self.set_status_display(f"群控 {command}: {result.summary()}", (0, 1, 0, 1))
+            else:
+                self.set_status_display(f"群控 {command}: {result.summary()}", (1, 0.6, 0, 1))
+        return on_result
+    
+    def build_macro_buttons(self):
+        """按宏库重建宏按钮"""
+        app = App.get_running_app()
+        self.macro_layout.clear_widgets()
+        for name in app.macro_library.names():
+            btn = Button(text=f'▶ {name}', background_color=(0.5, 0.3, 0.8, 1))
+            btn.bind(on_press=lambda instance, name=name: self.run_macro(name))
+            self.macro_layout.add_widget(btn)
+        
+        self.record_btn = Button(text='⏺ 录制宏', background_color=(0.6, 0.6, 0.6, 1))
+        self.record_btn.bind(on_press=self.toggle_macro_recording)
+        self.macro_layout.add_widget(self.record_btn)
+    
+    def run_macro(self, name):
+        """执行命令宏（整体一次发送）"""
+        app = App.get_running_app()
+        feedback = self.macro_feedback(name)
+        if app.macro_library.run(app.connection_manager, name, feedback, mirror=app.mirror) is not None:
+            self.set_status_display(f"正在执行宏: {name}", (1, 1, 0, 1))
+    
+    def macro_feedback(self, name):
+        """生成宏执行结果回调"""
+        def on_result(results):
+            results = results or []
+            succeeded = sum(1 for result in results if result)
+            if results and succeeded == len(results):
+                self.set_status_display(f"宏已执行: {name}", (0, 1, 0, 1))
+            elif succeeded:
+                self.set_status_display(f"宏部分失败: {name} ({succeeded}/{len(results)})", (1, 0.6, 0, 1))
+            else:
+                self.set_status_display(f"宏执行失败: {name}", (1, 0, 0, 1))
+        return on_result
+    
+    def toggle_macro_recording(self, instance):
+        """开始/结束录制宏，结束时把录制的命令保存为新宏"""
+        if not self.macro_recorder.recording:
+            self.macro_recorder.start()
+            self.record_btn.text = '⏹ 保存宏'
+            self.set_status_display("正在录制宏...", (1, 1, 0, 1))
+            return
+        
+        commands = self.macro_recorder.stop()
+        if not commands:
+            self.record_btn.text = '⏺ 录制宏'
+            self.set_status_display("未录制到命令", (0.7, 0.7, 0.7, 1))
+            return
+        
+        library = App.get_running_app().macro_library
+        index = len(library.names()) + 1
+        while library.get(f'宏{index}'):
+            index += 1
+        library.define(f'宏{index}', commands, atomic=True)
+        self.build_macro_buttons()
+        self.set_status_display(f"已保存宏{index}（{len(commands)}条命令）", (0, 1, 0, 1))
     
     def play_scene(self, instance):
         """播放场景"""
         if self.selected_scene:
-            app = App.get_running_app()
-            result = app.connection_manager.send_command('play_scene', {
-                'scene_name': self.selected_scene['name']
-            })
-            
-            if result:
-                self.status_display.text = f"正在播放: {self.selected_scene['name']}"
-                self.status_display.color = (0, 1, 0, 1)
+            scene_name = self.selected_scene['name']
+            callback = self.command_feedback(f"正在播放: {scene_name}", (0, 1, 0, 1), "播放失败")
+            if self.group_mode:
+                self.send_command('play_scene', {'scene_name': scene_name}, callback=callback)
             else:
-                self.status_display.text = "播放失败"
-                self.status_display.color = (1, 0, 0, 1)
+                # 已预备时只发送GO，当前场景先在本地生效
+                self.macro_recorder.record('play_scene', {'scene_name': scene_name})
+                app = App.get_running_app()
+                op = app.mirror.begin('play_scene', {'scene_name': scene_name})
+                
+                def on_played(result):
+                    app.mirror.resolve(op, result)
+                    callback(result)
+                
+                app.scene_armer.go(on_played)
+            
+            self.set_status_display(f"正在发送: {scene_name}", (1, 1, 0, 1))
         else:
-            self.status_display.text = "请先选择场景"
-            self.status_display.color = (1, 1, 0, 1)
+            self.set_status_display("请先选择场景", (1, 1, 0, 1))
+    
+    def start_timeline(self, instance):
+        """从头播放提示表（播放中时不重复开始）"""
+        timeline = App.get_running_app().timeline
+        if timeline is None or timeline.active():
+            return
+        timeline.play()
+    
+    def show_timeline(self, state):
+        """时间线播放状态变化"""
+        from timeline import TIMELINE_FINISHED, TIMELINE_PAUSED, TIMELINE_PLAYING, TIMELINE_STOPPED
+        
+        if state == TIMELINE_PLAYING:
+            self.timeline_btn.text = '🎬 播放中'
+            self.set_status_display("时间线播放中", (0, 1, 0, 1))
+        elif state == TIMELINE_PAUSED:
+            self.timeline_btn.text = '🎬 已暂停'
+            self.set_status_display("时间线已暂停", (1, 0.6, 0, 1))
+        else:
+            self.timeline_btn.text = '🎬 时间线'
+            if state == TIMELINE_STOPPED:
+                self.set_status_display("时间线已停止", (0.8, 0.8, 0.8, 1))
+            elif state == TIMELINE_FINISHED:
+                self.set_status_display("时间线播放完成", (0, 1, 0, 1))
     
     def pause_scene(self, instance):
-        """暂停场景"""
-        app = App.get_running_app()
-        app.connection_manager.send_command('pause_scene')
-        self.status_display.text = "已暂停"
-        self.status_display.color = (1, 0.6, 0, 1)
+        """暂停场景（时间线播放中时暂停/继续时间线，由时间线发送pause_scene）"""
+        timeline = App.get_running_app().timeline
+        if timeline is not None and not self.group_mode and timeline.active():
+            if not timeline.pause():
+                timeline.resume()
+            return
+        self.send_command(
+            'pause_scene',
+            callback=self.command_feedback("已暂停", (1, 0.6, 0, 1), "暂停失败")
+        )
     
     def stop_scene(self, instance):
-        """停止场景"""
-        app = App.get_running_app()
-        app.connection_manager.send_command('stop_scene')
-        self.status_display.text = "已停止"
-        self.status_display.color = (0.8, 0.8, 0.8, 1)
+        """停止场景（时间线播放中时停止时间线，由时间线发送stop_scene）"""
+        timeline = App.get_running_app().timeline
+        if timeline is not None and not self.group_mode and timeline.active():
+            timeline.stop()
+            return
+        self.send_command(
+            'stop_scene',
+            callback=self.command_feedback("已停止", (0.8, 0.8, 0.8, 1), "停止失败")
+        )
     
     def on_volume_change(self, instance, value):
         """音量变化"""
+        if self.applying_volume:
+            return
+        from session_sync import SESSION_VOLUME
+        
         app = App.get_running_app()
-        app.connection_manager.send_command('set_volume', {'volume': int(value)})
+        app.mirror.apply_continuous('volume', 'set_volume', {'volume': int(value)})
+        if app.session is not None:
+            app.session.publish(SESSION_VOLUME, int(value))
+        self.macro_recorder.record('set_volume', {'volume': int(value)}, coalesce=True)
+    
+    def send_lights_command(self, action, label):
+        """发送灯光控制命令"""
+        self.send_command(
+            'lights_control', {'action': action},
+            callback=self.command_feedback(f"灯光: {label}", (0, 1, 0, 1), "灯光控制失败")
+        )
     
     def lights_full(self, instance):
         """灯光全亮"""
-        app = App.get_running_app()
-        app.connection_manager.send_command('lights_control', {'action': 'full'})
+        self.send_lights_command('full', '全亮')
     
     def lights_dim(self, instance):
         """灯光调暗"""
-        app = App.get_running_app()
-        app.connection_manager.send_command('lights_control', {'action': 'dim'})
+        self.send_lights_command('dim', '调暗')
     
     def lights_red(self, instance):
         """红色灯光"""
-        app = App.get_running_app()
-        app.connection_manager.send_command('lights_control', {'action': 'red'})
+        self.send_lights_command('red', '红色')
     
     def lights_green(self, instance):
         """绿色灯光"""
-        app = App.get_running_app()
-        app.connection_manager.send_command('lights_control', {'action': 'green'})
+        self.send_lights_command('green', '绿色')
     
     def lights_blue(self, instance):
         """蓝色灯光"""
-        app = App.get_running_app()
-        app.connection_manager.send_command('lights_control', {'action': 'blue'})
+        self.send_lights_command('blue', '蓝色')
     
     def lights_off(self, instance):
         """灯光全暗"""
-        app = App.get_running_app()
-        app.connection_manager.send_command('lights_control', {'action': 'off'})
+        self.send_lights_command('off', '全暗')
     
     def emergency_stop(self, instance):
         """紧急停止"""
         app = App.get_running_app()
-        app.connection_manager.send_command('emergency_stop')
+        app.connection_manager.send_command_async('emergency_stop', callback=self.on_emergency_result)
+        app.scene_armer.cancel()
+        if self.group_mode:
+            # 群控开启时所有控制系统同时紧急停止
+            app.controller_group.send_async('emergency_stop', callback=self.group_feedback('emergency_stop'))
+        self.set_status_display("正在执行紧急停止...", (1, 0, 0, 1))
+    
+    def on_emergency_result(self, result):
+        """紧急停止结果"""
+        if result:
+            text = '已执行紧急停止！\n所有设备已停止运行。'
+            self.set_status_display("已紧急停止", (1, 0, 0, 1))
+        else:
+            text = '紧急停止命令发送失败！\n请立即检查网络连接。'
+            self.set_status_display("紧急停止失败", (1, 0, 0, 1))
         
         # 显示确认对话框
+        from kivy.uix.popup import Popup
+        
         popup = Popup(
             title='紧急停止',
-            content=Label(text='已执行紧急停止！\n所有设备已停止运行。'),
+            content=Label(text=text),
             size_hint=(0.8, 0.4)
         )
         popup.open()
@@ -610,9 +909,10 @@ class MainControlScreen(Screen):
     def system_reset(self, instance):
         """系统重置"""
         app = App.get_running_app()
-        app.connection_manager.send_command('system_reset')
-        self.status_display.text = "系统已重置"
-        self.status_display.color = (0, 1, 0, 1)
+        app.connection_manager.send_command_async(
+            'system_reset',
+            callback=self.command_feedback("系统已重置", (0, 1, 0, 1), "系统重置失败")
+        )
     
     def show_settings(self, instance):
         """显示设置"""
@@ -621,41 +921,137 @@ class MainControlScreen(Screen):
     
     def show_monitor(self, instance):
         """显示监控"""
-        # TODO: 实现监控界面
-        pass
+        App.get_running_app().show_screen('monitor')
     
     def refresh_data(self, instance):
-        """刷新数据"""
+        """刷新数据（在后台线程中检测连接，不阻塞界面）"""
         app = App.get_running_app()
-        if app.connection_manager.test_connection():
-            self.status_display.text = "数据已刷新"
-            self.status_display.color = (0, 1, 0, 1)
-        else:
-            self.status_display.text = "刷新失败"
-            self.status_display.color = (1, 0, 0, 1)
+        self.set_status_display("正在刷新...", (1, 1, 0, 1))
+        
+        def refresh_thread():
+            if app.connection_manager.test_connection():
+                schedule_on_ui(self.set_status_display, "数据已刷新", (0, 1, 0, 1))
+            else:
+                schedule_on_ui(self.set_status_display, "刷新失败", (1, 0, 0, 1))
+        
+        threading.Thread(target=refresh_thread, daemon=True).start()
     
     def logout(self, instance):
         """退出登录"""
         app = App.get_running_app()
-        app.root.current = 'login'
+        app.connection_manager.stop_push()
+        app.connection_manager.stop_health()
+        if app.session is not None:
+            app.session.stop()
+        if app.timeline is not None:
+            app.timeline.stop()
+        app.scene_assets.stop()
+        app.scene_armer.cancel()
+        app.mirror.reset()
+        app.state.set(USER, None)
+        app.show_screen('login')
     
-    def update_status(self, dt):
-        """更新状态显示"""
-        # 更新时间
-        self.time_label.text = datetime.now().strftime('%H:%M:%S')
-        
-        # 更新连接状态
-        app = App.get_running_app()
-        if hasattr(app, 'connection_manager') and app.connection_manager.connected:
+    def on_status_change(self, status):
+        """处理推送的场景目录变化"""
+        if isinstance(status, dict) and status.get('type') == 'scenes':
+            App.get_running_app().scene_catalog.apply_event(status.get('data'))
+    
+    def show_connection(self, state):
+        """连接状态变化"""
+        if state == HEALTH_CONNECTED:
             self.connection_status.text = '🟢 已连接'
             self.connection_status.color = (0, 1, 0, 1)
+        elif state == HEALTH_DEGRADED:
+            rtt = App.get_running_app().connection_manager.health.rtt_ms()
+            self.connection_status.text = f'🟡 延迟高 {rtt:.0f}ms' if rtt is not None else '🟡 连接不稳定'
+            self.connection_status.color = (1, 1, 0, 1)
+        elif state == HEALTH_RECONNECTING:
+            self.connection_status.text = '🟠 重连中'
+            self.connection_status.color = (1, 0.6, 0, 1)
+        elif state == HEALTH_OFFLINE:
+            self.connection_status.text = '🔴 离线'
+            self.connection_status.color = (1, 0, 0, 1)
         else:
             self.connection_status.text = '🔴 未连接'
             self.connection_status.color = (1, 0, 0, 1)
-        
-        # 更新用户信息
-        if hasattr(app, 'current_user'):
-            self.user_label.text = f'用户: {app.current_user}'
+    
+    def show_user(self, user):
+        """当前用户变化"""
+        self.user_label.text = f'用户: {user}' if user else '用户: 未登录'
+    
+    def show_current_scene(self, scene_name):
+        """控制系统报告的当前场景变化"""
+        if scene_name:
+            self.set_status_display(f"正在播放: {scene_name}", (0, 1, 0, 1))
+    
+    def show_scene_arm(self, value):
+        """选中场景的预备状态变化"""
+        from scene_arm import ARM_ARMED, ARM_ARMING
+        
+        state = value[0] if value else None
+        if state == ARM_ARMED:
+            self.play_btn.text = '▶️ GO（已就绪）'
+            self.play_btn.background_color = (0, 1, 0.3, 1)
+        elif state == ARM_ARMING:
+            self.play_btn.text = '▶️ 播放（预备中）'
+            self.play_btn.background_color = (0.4, 0.7, 0.2, 1)
+        else:
+            self.play_btn.text = '▶️ 播放'
+            self.play_btn.background_color = (0, 0.8, 0, 1)
+    
+    def apply_session_change(self, field, value):
+        """其他设备修改了会话中的选中场景或音量（只更新界面，预备和命令已由该设备发送）"""
+        from scene_catalog import scene_key
+        from session_sync import SESSION_SELECTED_SCENE, SESSION_VOLUME
+        
+        if field == SESSION_SELECTED_SCENE:
+            if value is None or (self.selected_scene and scene_key(self.selected_scene) == value):
+                return
+            self.applying_session = True
+            self.scene_list.select_key(value)
+            self.applying_session = False
+        elif field == SESSION_VOLUME:
+            self.show_volume(value)
+    
+    def show_volume(self, volume):
+        """控制系统报告的音量变化"""
+        if volume is None or int(self.volume_slider.value) == volume:
+            return
+        self.applying_volume = True
+        self.volume_slider.value = volume
+        self.applying_volume = False
+    
+    def on_enter(self, *args):
+        self.start_timers()
+    
+    def on_leave(self, *args):
+        self.stop_timers()
+    
+    def start_timers(self):
+        """界面可见时启动时钟"""
+        if self.clock_event is None and not App.get_running_app().paused:
+            self.tick_clock(0)
+    
+    def stop_timers(self):
+        """界面隐藏或应用切到后台时停止时钟"""
+        if self.clock_event is not None:
+            self.clock_event.cancel()
+            self.clock_event = None
+    
+    def tick_clock(self, dt):
+        """更新时钟，并在下一分钟开始时再次触发"""
+        now = datetime.now()
+        text = now.strftime(CLOCK_FORMAT)
+        if self.time_label.text != text:
+            self.time_label.text = text
+        delay = 60 - now.second - now.microsecond / 1000000.0
+        self.clock_event = Clock.schedule_once(self.tick_clock, delay + 0.01)
+
+
+def create_monitor_screen():
+    """监控界面（只在第一次打开时导入）"""
+    from monitor_screen import MonitorScreen
+    return MonitorScreen()
 
 
 class MobileControllerApp(App):
@@ -667,39 +1063,176 @@ class MobileControllerApp(App):
         self.title = '文旅多媒体演出控制 - 移动端'
         
         # 初始化连接管理器
-        self.connection_manager = ConnectionManager()
+        self.connection_manager = ConnectionManager(ui_scheduler=schedule_on_ui)
         
-        # 创建屏幕管理器
-        sm = ScreenManager()
+        # 界面共享状态（连接状态、用户、当前场景、音量）
+        self.state = StateStore(ui_scheduler=schedule_on_ui)
+        self.state.attach(self.connection_manager)
         
-        # 添加登录界面
-        login_screen = LoginScreen()
-        sm.add_widget(login_screen)
+        # 界面工厂：界面在第一次显示时才创建
+        self.screen_factories = {
+            'login': LoginScreen,
+            'main_control': MainControlScreen,
+            'monitor': create_monitor_screen,
+        }
         
-        # 添加主控制界面
-        main_screen = MainControlScreen()
-        sm.add_widget(main_screen)
+        # 创建屏幕管理器，启动时只创建登录界面
+        sm = ScreenManager()
+        sm.add_widget(self.screen_factories['login']())
         
         # 设置默认界面
         sm.current = 'login'
         
         return sm
     
+    # 登录后才创建的子系统（见start_services），控制系统发现在首次搜索时创建
+    discovery = None
+    scene_catalog = None
+    scene_assets = None
+    mirror = None
+    scene_armer = None
+    controller_group = None
+    session = None
+    timeline = None
+    macro_library = None
+    
+    def get_discovery(self):
+        """控制系统发现（上次可用的控制系统缓存在本地）"""
+        if self.discovery is None:
+            from discovery import ControllerDiscovery
+            self.discovery = ControllerDiscovery(self.user_data_dir)
+            self.discovery.load_cache()
+        return self.discovery
+    
+    def start_services(self):
+        """登录成功后创建主控制界面需要的子系统（只在第一次登录时创建）"""
+        if self.scene_catalog is not None:
+            return
+        from asset_cache import AssetCache
+        from controller_group import ControllerGroup
+        from macros import MacroLibrary
+        from scene_arm import SceneArmer
+        from scene_assets import AssetPrefetcher, TextureUploader
+        from scene_catalog import SceneCatalog
+        from session_sync import SessionSync
+        from state_mirror import StateMirror
+        from timeline import TimelinePlayer
+        
+        # 离线命令日志（登录后重发上次未送达的命令）
+        self.connection_manager.enable_journal(os.path.join(self.user_data_dir, 'command_journal.log'))
+        
+        # 场景目录：先用本地缓存，登录后再从控制系统刷新
+        self.scene_catalog = SceneCatalog(self.connection_manager, self.user_data_dir)
+        if not self.scene_catalog.load_cached():
+            self.scene_catalog.replace(DEFAULT_SCENES)
+        
+        # 场景缩略图和预览信息（后台下载到磁盘缓存，可见行优先，纹理在界面线程中分帧上传）
+        self.scene_assets = AssetPrefetcher(
+            self.connection_manager,
+            AssetCache(os.path.join(self.user_data_dir, 'scene_assets')),
+            TextureUploader(schedule_on_ui),
+            ui_scheduler=schedule_on_ui
+        )
+        self.scene_assets.set_scenes(self.scene_catalog.scenes)
+        self.scene_catalog.add_listener(lambda diff: self.scene_assets.set_scenes(self.scene_catalog.scenes))
+        
+        # 控制系统状态本地镜像（命令乐观生效，按推送/轮询的状态校正）
+        self.mirror = StateMirror(self.connection_manager, self.state)
+        
+        # 场景预备/GO（预备状态写入共享状态，播放按钮显示是否就绪）
+        self.scene_armer = SceneArmer(
+            self.connection_manager, ui_scheduler=schedule_on_ui,
+            on_change=lambda state, scene_name: self.state.set(SCENE_ARM, (state, scene_name))
+        )
+        
+        # 多控制系统群控（有 controllers.json 配置时启用）
+        self.controller_group = ControllerGroup.load(self.user_data_dir, ui_scheduler=schedule_on_ui)
+        
+        # 多设备会话同步（有 session.json 配置时启用）
+        self.session = SessionSync.load(
+            self.user_data_dir, manager=self.connection_manager, ui_scheduler=schedule_on_ui,
+            on_change=self.on_session_change
+        )
+        
+        # 演出时间线（有 show.cue 提示表时启用；任何紧急停止或系统复位在提交时立即中止播放）
+        self.timeline = TimelinePlayer.load(
+            self.user_data_dir, self.connection_manager, ui_scheduler=schedule_on_ui,
+            on_state=self.on_timeline_state, mirror=self.mirror
+        )
+        
+        # 命令宏库
+        self.macro_library = MacroLibrary(self.user_data_dir)
+        self.macro_library.load()
+    
+    def on_session_change(self, field, value):
+        """会话同步回调，转给主控制界面（会话在进入主控制界面后才启动）"""
+        if self.root.has_screen('main_control'):
+            self.root.get_screen('main_control').apply_session_change(field, value)
+    
+    def on_timeline_state(self, state):
+        """时间线状态回调，转给主控制界面"""
+        if self.root.has_screen('main_control'):
+            self.root.get_screen('main_control').show_timeline(state)
+    
+    def get_screen(self, name):
+        """获取界面，不存在时通过工厂创建"""
+        if not self.root.has_screen(name):
+            self.root.add_widget(self.screen_factories[name]())
+        return self.root.get_screen(name)
+    
+    def show_screen(self, name):
+        """切换到指定界面"""
+        self.get_screen(name)
+        self.root.current = name
+    
     def on_start(self):
         """应用启动时调用"""
         print("移动控制器应用已启动")
         
         # 设置窗口大小（开发时使用）
+        from kivy.core.window import Window
+        
         if hasattr(Window, 'size'):
             Window.size = (800, 600)
+        
+        # 第一帧之后再自动搜索控制系统，不拖慢启动
+        Clock.schedule_once(lambda dt: self.get_screen('login').auto_discover(), 0)
+    
+    # 应用是否在后台
+    paused = False
+    
+    def on_pause(self):
+        """切到后台时暂停当前界面的定时器"""
+        self.paused = True
+        screen = self.root.current_screen if self.root else None
+        if screen is not None and hasattr(screen, 'stop_timers'):
+            screen.stop_timers()
+        return True
+    
+    def on_resume(self):
+        """回到前台时恢复当前界面的定时器"""
+        self.paused = False
+        screen = self.root.current_screen if self.root else None
+        if screen is not None and hasattr(screen, 'start_timers'):
+            screen.start_timers()
     
     def on_stop(self):
         """应用停止时调用"""
         print("移动控制器应用已停止")
         
         # 清理连接
+        if self.scene_armer is not None:
+            self.scene_armer.close()
+        if self.session is not None:
+            self.session.stop()
+        if self.timeline is not None:
+            self.timeline.close()
+        if self.scene_assets is not None:
+            self.scene_assets.stop()
         if hasattr(self, 'connection_manager'):
-            self.connection_manager.connected = False
+            self.connection_manager.close()
+        if self.controller_group is not None:
+            self.controller_group.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多控制器群控 - 把同一条命令并发发送到多个控制系统（灯光、音频、视频等）
+每个控制系统使用独立的ConnectionManager（独立连接池），按完成策略汇总结果：
+    all     全部成功才算成功（任一失败立即返回）
+    quorum  多数成功即返回
+    any     任一成功即返回
+总耗时接近最慢的那个控制系统，而不是各个控制系统耗时之和
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from command_dispatcher import CommandDispatcher
+from connection_manager import ConnectionManager
+
+POLICY_ALL = 'all'
+POLICY_QUORUM = 'quorum'
+POLICY_ANY = 'any'
+
+
+class GroupResult:
+    """群控结果：每个控制系统的结果和按策略判定的整体结果"""
+
+    def __init__(self, command, policy, names):
+        self.command = command
+        self.policy = policy
+        self.names = list(names)
+        # 控制系统名称 -> 结果（None表示失败）
+        self.results = {}
+
+    @property
+    def succeeded(self):
+        return [name for name in self.names if self.results.get(name) is not None]
+
+    @property
+    def failed(self):
+        return [name for name in self.names if name in self.results and self.results[name] is None]
+
+    @property
+    def pending(self):
+        return [name for name in self.names if name not in self.results]
+
+    def required(self):
+        """按策略需要成功的数量"""
+        if self.policy == POLICY_ANY:
+            return 1
+        if self.policy == POLICY_QUORUM:
+            return len(self.names) // 2 + 1
+        return len(self.names)
+
+    def decided(self):
+        """结果是否已经确定（成功数已达到要求，或剩余的都成功也达不到）"""
+        succeeded = len(self.succeeded)
+        return succeeded >= self.required() or succeeded + len(self.pending) < self.required()
+
+    @property
+    def ok(self):
+        return len(self.succeeded) >= self.required()
+
+    def __bool__(self):
+        return self.ok
+
+    def summary(self):
+        """用于状态显示的汇总文本"""
+        text = f"{len(self.succeeded)}/{len(self.names)} 成功"
+        if self.failed:
+            text += f"（失败: {'、'.join(self.failed)}）"
+        if self.pending:
+            text += f"（未完成: {'、'.join(self.pending)}）"
+        return text
+
+
+class ControllerGroup:
+    """控制系统组"""
+
+    CONFIG_FILE = 'controllers.json'
+
+    def __init__(self, endpoints=(), policy=POLICY_ALL, timeout=5.0, pool_size=2, ui_scheduler=None):
+        # 默认完成策略和等待结果的最长时间（秒）
+        self.policy = policy
+        self.timeout = timeout
+        self.pool_size = pool_size
+
+        self.lock = threading.Lock()
+        # 名称 -> ConnectionManager
+        self.managers = {}
+        self.executor = None
+        self.workers = 0
+        for endpoint in endpoints:
+            self.add(endpoint['name'], endpoint['ip'], endpoint.get('port', 8080))
+
+        # 异步群控命令在后台线程执行，结果回到界面线程
+        self.dispatcher = CommandDispatcher(self.send, ui_scheduler=ui_scheduler)
+
+    @classmethod
+    def configured(cls, data_dir):
+        """本地是否有 controllers.json 配置"""
+        return os.path.exists(os.path.join(data_dir, cls.CONFIG_FILE))
+
+    @classmethod
+    def load(cls, data_dir, **kwargs):
+        """从本地 controllers.json 读取控制系统列表，没有配置时返回None"""
+        if not cls.configured(data_dir):
+            return None
+        path = os.path.join(data_dir, cls.CONFIG_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                endpoints = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取控制系统列表失败: {e}")
+            return None
+        return cls(endpoints, **kwargs)
+
+    def add(self, name, ip, port=8080):
+        """添加控制系统（每个控制系统独立的连接池）"""
+        manager = ConnectionManager(pool_size=self.pool_size)
+        manager.set_server_address(ip, port)
+        with self.lock:
+            old = self.managers.pop(name, None)
+            self.managers[name] = manager
+            self._resize_executor()
+        if old is not None:
+            old.close()
+
+    def remove(self, name):
+        with self.lock:
+            manager = self.managers.pop(name, None)
+        if manager is not None:
+            manager.close()
+
+    def names(self):
+        with self.lock:
+            return list(self.managers)
+
+    def _resize_executor(self):
+        """每个控制系统的线程数与其连接池大小一致，保证命令同时发出"""
+        workers = max(1, len(self.managers) * self.pool_size)
+        if self.executor is None or self.workers < workers:
+            old, self.executor = self.executor, ThreadPoolExecutor(max_workers=workers, thread_name_prefix='group')
+            self.workers = workers
+            if old is not None:
+                old.shutdown(wait=False)
+
+    def send(self, command, data=None, policy=None, timeout=None):
+        """并发发送命令，按策略确定结果后立即返回GroupResult（其余请求继续在后台完成）"""
+        with self.lock:
+            managers = dict(self.managers)
+            executor = self.executor
+        result = GroupResult(command, policy or self.policy, managers)
+        if not managers:
+            return result
+
+        futures = {
+            executor.submit(manager.send_command, command, data, journal=False): name
+            for name, manager in managers.items()
+        }
+        remaining = set(futures)
+        end = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while remaining and not result.decided():
+            left = end - time.monotonic()
+            if left <= 0:
+                break
+            done, remaining = wait(remaining, timeout=left, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result.results[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"群控命令错误: {e}")
+                    result.results[futures[future]] = None
+        return result
+
+    def send_async(self, command, data=None, callback=None, policy=None):
+        """异步群控，callback(GroupResult)在界面线程中调用"""
+        return self.dispatcher.submit(
+            command, data, callback,
+            handler=lambda command, data: self.send(command, data, policy)
+        )
+
+    def close(self):
+        self.dispatcher.stop()
+        with self.lock:
+            managers, self.managers = list(self.managers.values()), {}
+            executor, self.executor = self.executor, None
+        for manager in managers:
+            manager.close()
+        if executor is not None:
+            executor.shutdown(wait=False)
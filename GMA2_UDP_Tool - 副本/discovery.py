@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+局域网控制系统发现 - 不再手动输入服务器IP
+    1. 先检查本地缓存的上次可用的控制系统
+    2. 同时向广播地址和组播组发送发现请求，控制系统单播应答
+    3. 没有应答时回退为扫描本机所在/24网段的 /api/status（有界线程池、短连接超时，约2秒内完成）
+
+发现协议（UDP，端口 DISCOVERY_PORT，JSON）：
+    请求  {"type": "discover", "version": 1, "id": 随机数}
+    应答  {"type": "announce", "id": 请求id, "name": 名称, "port": HTTP端口, "websocket_port": 推送端口}
+应答的源地址即为控制系统IP
+"""
+
+import http.client
+import json
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DISCOVERY_PORT = 8082
+MULTICAST_GROUP = '239.255.80.82'
+PROTOCOL_VERSION = 1
+
+# 每个地址的连接超时、扫描并发数和整个扫描的时间上限（秒）
+SWEEP_CONNECT_TIMEOUT = 0.3
+SWEEP_WORKERS = 64
+SWEEP_DEADLINE = 2.0
+
+
+def make_query(query_id):
+    return json.dumps({'type': 'discover', 'version': PROTOCOL_VERSION, 'id': query_id}).encode('utf-8')
+
+
+def make_announce(query, name, port=8080, websocket_port=8081):
+    """控制系统端：对发现请求生成应答，不是发现请求时返回None"""
+    try:
+        message = json.loads(query.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(message, dict) or message.get('type') != 'discover':
+        return None
+    return json.dumps({
+        'type': 'announce', 'id': message.get('id'), 'name': name,
+        'port': port, 'websocket_port': websocket_port,
+    }, ensure_ascii=False).encode('utf-8')
+
+
+def parse_announce(datagram, address, query_id=None):
+    """解析控制系统应答，不是本次请求的应答时返回None"""
+    try:
+        message = json.loads(datagram.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(message, dict) or message.get('type') != 'announce':
+        return None
+    if query_id is not None and message.get('id') not in (None, query_id):
+        return None
+    ip = address[0]
+    return {
+        'name': message.get('name') or ip,
+        'ip': ip,
+        'port': int(message.get('port') or 8080),
+        'source': 'announce',
+    }
+
+
+def local_prefix():
+    """本机局域网地址的/24前缀（如 '192.168.1'），无法确定时返回None"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        # UDP connect不发送数据，只用于让系统选出出口地址
+        sock.connect(('10.255.255.255', 1))
+        ip = sock.getsockname()[0]
+    except OSError:
+        return None
+    finally:
+        sock.close()
+    if ip.startswith('127.') or ip == '0.0.0.0':
+        return None
+    return ip.rsplit('.', 1)[0]
+
+
+def ip_key(ip):
+    """按地址数值排序（主机名排在后面）"""
+    try:
+        return socket.inet_aton(ip)
+    except OSError:
+        return b'\xff' * 4 + ip.encode('utf-8')
+
+
+def probe(ip, port=8080, connect_timeout=SWEEP_CONNECT_TIMEOUT, read_timeout=1.0):
+    """请求 /api/status 确认是控制系统，返回控制系统信息，失败返回None"""
+    conn = http.client.HTTPConnection(ip, port, timeout=connect_timeout)
+    try:
+        conn.connect()
+        # 连接建立后放宽读取超时，避免把响应慢的控制系统误判为不存在
+        conn.sock.settimeout(read_timeout)
+        conn.request('GET', '/api/status')
+        response = conn.getresponse()
+        body = response.read()
+        if response.status != 200:
+            return None
+        status = json.loads(body.decode('utf-8')) if body else {}
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+    name = status.get('name') if isinstance(status, dict) else None
+    return {'name': name or ip, 'ip': ip, 'port': port, 'source': 'sweep'}
+
+
+class ControllerDiscovery:
+    """控制系统发现和上次可用控制系统缓存"""
+
+    CACHE_FILE = 'known_controllers.json'
+    # 缓存保留的控制系统数量
+    CACHE_SIZE = 8
+
+    def __init__(self, data_dir=None, port=DISCOVERY_PORT, http_port=8080, targets=None):
+        self.path = os.path.join(data_dir, self.CACHE_FILE) if data_dir else None
+        self.port = port
+        self.http_port = http_port
+        # 发现请求的目标地址，None表示广播地址 + 组播组 + 本网段定向广播
+        self.targets = targets
+        self.lock = threading.Lock()
+        # 最近可用的在前：[{'name', 'ip', 'port', 'last_seen'}]
+        self.known = []
+
+    def load_cache(self):
+        """读取本地缓存，返回是否有缓存的控制系统"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                known = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取控制系统缓存失败: {e}")
+            return False
+        with self.lock:
+            self.known = [entry for entry in known if isinstance(entry, dict) and entry.get('ip')]
+            return bool(self.known)
+
+    def save_cache(self):
+        """写入本地缓存（先写临时文件再替换）"""
+        if not self.path:
+            return
+        with self.lock:
+            data = json.dumps(self.known, ensure_ascii=False, indent=1)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"保存控制系统缓存失败: {e}")
+
+    def remember(self, ip, port=8080, name=None):
+        """记录一个可用的控制系统（登录成功后调用），排到缓存最前面"""
+        with self.lock:
+            old = next((entry for entry in self.known if entry['ip'] == ip and entry.get('port', 8080) == port), None)
+            if old is not None:
+                self.known.remove(old)
+            entry = {'name': name or (old or {}).get('name') or ip, 'ip': ip, 'port': port, 'last_seen': time.time()}
+            self.known.insert(0, entry)
+            del self.known[self.CACHE_SIZE:]
+        self.save_cache()
+
+    def last_known(self):
+        """上次可用的控制系统，没有时返回None"""
+        with self.lock:
+            return dict(self.known[0]) if self.known else None
+
+    def query(self, window=0.5):
+        """发送发现请求并在window秒内收集应答"""
+        query_id = random.getrandbits(32)
+        payload = make_query(query_id)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        found = {}
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            sock.bind(('', 0))
+            for target in self._query_targets():
+                try:
+                    sock.sendto(payload, target)
+                except OSError:
+                    # 没有对应网络（如无组播路由）时跳过该目标
+                    pass
+
+            end = time.monotonic() + window
+            while True:
+                left = end - time.monotonic()
+                if left <= 0:
+                    break
+                sock.settimeout(left)
+                try:
+                    datagram, address = sock.recvfrom(4096)
+                except socket.timeout:
+                    break
+                controller = parse_announce(datagram, address, query_id)
+                if controller is not None:
+                    found[(controller['ip'], controller['port'])] = controller
+        except OSError as e:
+            print(f"发送发现请求失败: {e}")
+        finally:
+            sock.close()
+        return list(found.values())
+
+    def _query_targets(self):
+        if self.targets is not None:
+            return list(self.targets)
+        targets = [('255.255.255.255', self.port), (MULTICAST_GROUP, self.port)]
+        prefix = local_prefix()
+        if prefix:
+            targets.append((f'{prefix}.255', self.port))
+        return targets
+
+    def sweep(self, prefix=None, port=None, connect_timeout=SWEEP_CONNECT_TIMEOUT,
+              workers=SWEEP_WORKERS, deadline=SWEEP_DEADLINE, exclude=()):
+        """扫描 prefix.1 ~ prefix.254 的 /api/status，deadline秒后返回已找到的控制系统"""
+        prefix = prefix or local_prefix() or self._cached_prefix()
+        if not prefix:
+            return []
+        port = port or self.http_port
+        hosts = [f'{prefix}.{i}' for i in range(1, 255) if f'{prefix}.{i}' not in exclude]
+        return self._probe_all([(ip, port) for ip in hosts], connect_timeout, workers, deadline)
+
+    def _cached_prefix(self):
+        entry = self.last_known()
+        return entry['ip'].rsplit('.', 1)[0] if entry else None
+
+    def _probe_all(self, addresses, connect_timeout, workers, deadline):
+        if not addresses:
+            return []
+        executor = ThreadPoolExecutor(max_workers=min(workers, len(addresses)), thread_name_prefix='discovery')
+        try:
+            futures = [executor.submit(probe, ip, port, connect_timeout) for ip, port in addresses]
+            done, _ = wait(futures, timeout=deadline)
+        finally:
+            # 超过时间上限时不再等待剩余的地址
+            executor.shutdown(wait=False, cancel_futures=True)
+        return [future.result() for future in futures if future in done and future.result() is not None]
+
+    def verify_cached(self, connect_timeout=SWEEP_CONNECT_TIMEOUT, deadline=1.0):
+        """并发确认缓存中的控制系统是否仍然可用"""
+        with self.lock:
+            addresses = [(entry['ip'], entry.get('port', 8080)) for entry in self.known]
+        found = self._probe_all(addresses, connect_timeout, len(addresses) or 1, deadline)
+        for controller in found:
+            controller['source'] = 'cache'
+        return found
+
+    def discover(self, window=0.5, sweep=True, prefix=None):
+        """发现控制系统：缓存确认和发现请求并行进行，都没有结果时扫描网段
+        返回控制系统列表，上次可用的排在前面
+        """
+        cached = []
+        checker = threading.Thread(target=lambda: cached.extend(self.verify_cached()), daemon=True)
+        checker.start()
+        found = self.query(window)
+        checker.join()
+
+        controllers = {}
+        for controller in cached + found:
+            controllers.setdefault((controller['ip'], controller['port']), controller)
+        if not found and sweep:
+            exclude = {ip for ip, _ in controllers}
+            for controller in self.sweep(prefix, exclude=exclude):
+                controllers.setdefault((controller['ip'], controller['port']), controller)
+
+        with self.lock:
+            order = {(entry['ip'], entry.get('port', 8080)): i for i, entry in enumerate(self.known)}
+        return sorted(
+            controllers.values(),
+            key=lambda c: (order.get((c['ip'], c['port']), len(order)), ip_key(c['ip']))
+        )
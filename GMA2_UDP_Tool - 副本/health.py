@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+连接健康监测 - 后台心跳探测 /api/status，估计往返时延（RTT）和抖动，维护连接状态：
+    connected     链路正常
+    degraded      时延偏高或刚出现一次探测失败
+    reconnecting  连续探测失败，正在重连
+    offline       多次重连失败
+状态变化通过 ConnectionManager.notify_status_change 发布
+
+心跳间隔自适应：稳定时逐步放慢到 stable_interval，异常时缩短到 degraded_interval，
+重连时指数退避；最近有推送消息或命令成功时跳过本次探测，命令或推送失败时立即探测。
+连接会话中心期间（set_relayed）由会话中心转发的流量确认链路，暂停定期探测，只在失败时探测。
+探测超时按 RTT 估计值计算（srtt + 4 * rttvar，与TCP重传超时相同的算法）
+"""
+
+import http.client
+import random
+import threading
+import time
+
+HEALTH_CONNECTED = 'connected'
+HEALTH_DEGRADED = 'degraded'
+HEALTH_RECONNECTING = 'reconnecting'
+HEALTH_OFFLINE = 'offline'
+
+# 可以正常发送命令的状态
+ONLINE_STATES = frozenset([HEALTH_CONNECTED, HEALTH_DEGRADED])
+
+
+class RttEstimator:
+    """往返时延估计（指数平滑的均值和平均偏差）"""
+
+    def __init__(self, alpha=0.125, beta=0.25):
+        self.alpha = alpha
+        self.beta = beta
+        self.srtt = None
+        self.rttvar = None
+
+    def update(self, sample):
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar += self.beta * (abs(self.srtt - sample) - self.rttvar)
+            self.srtt += self.alpha * (sample - self.srtt)
+
+    def timeout(self, minimum, maximum):
+        """探测超时（秒）"""
+        if self.srtt is None:
+            return maximum
+        return max(minimum, min(maximum, self.srtt + 4 * self.rttvar))
+
+    def reset(self):
+        self.srtt = None
+        self.rttvar = None
+
+
+class HealthMonitor:
+    """后台连接健康监测"""
+
+    def __init__(self, manager, stable_interval=5.0, degraded_interval=0.5, max_backoff=5.0,
+                 degraded_rtt=0.25, recover_samples=3, offline_after=4, min_timeout=1.0, max_timeout=3.0):
+        self.manager = manager
+        # 稳定时的最长心跳间隔、异常时的心跳间隔、重连的最长退避（秒）
+        self.stable_interval = stable_interval
+        self.degraded_interval = degraded_interval
+        self.max_backoff = max_backoff
+        # RTT超过该值视为链路变差；恢复正常需要连续 recover_samples 次正常探测
+        self.degraded_rtt = degraded_rtt
+        self.recover_samples = recover_samples
+        # 连续失败 offline_after 次视为离线
+        self.offline_after = offline_after
+        # 探测超时的上下限（秒），下限要明显大于正常时延，短时延迟尖峰不算作失败
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+
+        self.rtt = RttEstimator()
+        self.lock = threading.Lock()
+        self.state = None
+        self.failures = 0
+        self.good_samples = 0
+        self.interval = degraded_interval
+        self.last_alive = 0.0
+        self.probes = 0
+
+        self.conn = None
+        self.conn_address = None
+        self.running = False
+        self.thread = None
+        self.wakeup = threading.Event()
+        # 要求立即探测（不因最近有流量而跳过）
+        self.urgent = False
+        # 链路由会话中心的流量确认，不定期探测
+        self.relayed = False
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.wakeup.clear()
+        self.thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+        self._close()
+        with self.lock:
+            self.state = None
+            self.failures = 0
+            self.good_samples = 0
+        self.rtt.reset()
+
+    def wake(self):
+        """立即探测一次"""
+        with self.lock:
+            self.urgent = True
+        self.wakeup.set()
+
+    def rtt_ms(self):
+        """当前RTT估计值（毫秒），没有样本时返回None"""
+        srtt = self.rtt.srtt
+        return srtt * 1000 if srtt is not None else None
+
+    def jitter_ms(self):
+        rttvar = self.rtt.rttvar
+        return rttvar * 1000 if rttvar is not None else None
+
+    def observe_alive(self, rtt=None):
+        """被动确认链路正常（收到推送、命令成功），rtt为可用的时延样本"""
+        with self.lock:
+            self.last_alive = time.monotonic()
+            online = self.state in ONLINE_STATES
+        if rtt is not None or not online:
+            self._record(True, rtt)
+
+    def observe_failure(self):
+        """被动发现失败（命令超时、推送断开），尽快探测确认"""
+        self.wake()
+
+    def set_relayed(self, relayed):
+        """连接会话中心期间暂停定期探测，断开后恢复"""
+        with self.lock:
+            self.relayed = relayed
+        self.wakeup.set()
+
+    def _run(self):
+        while self.running:
+            with self.lock:
+                urgent, self.urgent = self.urgent, False
+                idle = time.monotonic() - self.last_alive
+                if not urgent and self.relayed:
+                    # 会话中心的流量已确认链路，等待失败或断开
+                    delay = self.stable_interval
+                # 链路正常且最近有流量时推迟探测，从最后一次流量起算
+                elif not urgent and self.state == HEALTH_CONNECTED and idle < self.interval:
+                    delay = self.interval - idle
+                else:
+                    delay = None
+            if delay is None:
+                rtt = self.probe()
+                if not self.running:
+                    break
+                self._record(rtt is not None, rtt)
+                with self.lock:
+                    delay = self.interval
+            self.wakeup.wait(delay)
+            self.wakeup.clear()
+
+    def probe(self):
+        """发送一次心跳，返回RTT（秒），失败返回None"""
+        self.probes += 1
+        address = (self.manager.server_ip, self.manager.server_port)
+        timeout = self.rtt.timeout(self.min_timeout, self.max_timeout)
+        if self.conn is None or self.conn_address != address:
+            self._close()
+            self.conn = http.client.HTTPConnection(*address, timeout=timeout)
+            self.conn_address = address
+        started = time.perf_counter()
+        try:
+            # 复用长连接，超时按当前RTT估计值设置
+            if self.conn.sock is not None:
+                self.conn.sock.settimeout(timeout)
+            else:
+                self.conn.timeout = timeout
+            self.conn.request('GET', '/api/status')
+            response = self.conn.getresponse()
+            response.read()
+            if response.status != 200:
+                raise http.client.HTTPException(response.status)
+        except (OSError, http.client.HTTPException):
+            self._close()
+            return None
+        return time.perf_counter() - started
+
+    def _close(self):
+        conn, self.conn = self.conn, None
+        if conn is not None:
+            conn.close()
+
+    def _record(self, ok, rtt):
+        """根据探测结果更新状态和下一次心跳间隔"""
+        with self.lock:
+            if ok:
+                self.failures = 0
+                self.last_alive = time.monotonic()
+                if rtt is not None:
+                    self.rtt.update(rtt)
+                slow = rtt is not None and (rtt > self.degraded_rtt or self.rtt.srtt > self.degraded_rtt)
+                if slow:
+                    self.good_samples = 0
+                    state = HEALTH_DEGRADED
+                elif self.state in (HEALTH_CONNECTED, None):
+                    state = HEALTH_CONNECTED
+                else:
+                    # 从异常状态恢复需要连续几次正常
+                    self.good_samples += 1
+                    state = HEALTH_CONNECTED if self.good_samples >= self.recover_samples else HEALTH_DEGRADED
+
+                if state == HEALTH_CONNECTED and self.state == HEALTH_CONNECTED:
+                    # 稳定时逐步放慢心跳
+                    self.interval = min(self.stable_interval, self.interval * 2)
+                elif state == HEALTH_CONNECTED:
+                    self.interval = self.degraded_interval * 2
+                else:
+                    self.interval = self.degraded_interval
+            else:
+                self.failures += 1
+                self.good_samples = 0
+                if self.failures >= self.offline_after:
+                    state = HEALTH_OFFLINE
+                elif self.failures == 1 and self.state in ONLINE_STATES:
+                    # 一次失败可能只是丢包，先标记为变差并尽快复查
+                    state = HEALTH_DEGRADED
+                else:
+                    state = HEALTH_RECONNECTING
+
+                if state == HEALTH_DEGRADED:
+                    self.interval = self.degraded_interval
+                else:
+                    # 重连退避（带抖动，避免多个客户端同时探测）
+                    backoff = self.degraded_interval * 2 ** (self.failures - 1)
+                    self.interval = random.uniform(0.5, 1.0) * min(self.max_backoff, backoff)
+            changed = state != self.state
+            self.state = state
+
+        if changed:
+            self.manager.set_connection_state(state)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令耗时统计 - 按命令名称记录排队等待、建立连接、服务端处理和总耗时的直方图，
+以及成功、被拒绝、超时、网络错误和重试次数
+
+直方图为HDR风格的对数-线性分桶（以微秒计，相对误差约1.6%），内存固定，记录为O(1)
+未启用时ConnectionManager.instrumentation为None，调用处只多一次属性判断
+"""
+
+import json
+import os
+import threading
+import time
+from array import array
+
+PHASES = ('queue_wait', 'connect', 'server', 'total')
+COUNTERS = ('success', 'rejected', 'timeout', 'error', 'retries')
+
+# 当前线程最近一次请求建立连接的耗时（秒），由计时连接类写入
+connect_timer = threading.local()
+
+
+class Histogram:
+    """HDR风格直方图：小于2^sub_bits微秒的值精确记录，更大的值每个2的幂区间分为2^(sub_bits-1)个桶"""
+
+    def __init__(self, sub_bits=7, max_seconds=60.0):
+        self.sub_bits = sub_bits
+        self.sub_count = 1 << sub_bits
+        self.half_count = self.sub_count >> 1
+        self.max_value = int(max_seconds * 1000000)
+        self.counts = array('Q', bytes(8 * (self.bucket_index(self.max_value) + 1)))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def bucket_index(self, value):
+        magnitude = value.bit_length() - self.sub_bits
+        if magnitude <= 0:
+            return value
+        return self.sub_count + (magnitude - 1) * self.half_count + (value >> magnitude) - self.half_count
+
+    def bucket_value(self, index):
+        """桶的上界（微秒）"""
+        if index < self.sub_count:
+            return index
+        magnitude, offset = divmod(index - self.sub_count, self.half_count)
+        magnitude += 1
+        return ((offset + self.half_count + 1) << magnitude) - 1
+
+    def record(self, seconds):
+        value = min(max(int(seconds * 1000000), 0), self.max_value)
+        self.counts[self.bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct):
+        """百分位数（微秒）"""
+        if not self.count:
+            return 0
+        target = max(1, int(round(pct / 100.0 * self.count)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= target:
+                    return min(self.bucket_value(index), self.max)
+        return self.max
+
+    def snapshot(self):
+        """汇总（毫秒）"""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'min_ms': self.min / 1000.0,
+            'mean_ms': self.total / self.count / 1000.0,
+            'p50_ms': self.percentile(50) / 1000.0,
+            'p90_ms': self.percentile(90) / 1000.0,
+            'p99_ms': self.percentile(99) / 1000.0,
+            'p999_ms': self.percentile(99.9) / 1000.0,
+            'max_ms': self.max / 1000.0,
+        }
+
+
+class CommandStats:
+    """单个命令的直方图和计数器"""
+
+    def __init__(self):
+        self.histograms = {phase: Histogram() for phase in PHASES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def snapshot(self):
+        return {
+            'counters': dict(self.counters),
+            'timings': {phase: histogram.snapshot() for phase, histogram in self.histograms.items()},
+        }
+
+
+class Instrumentation:
+    """按命令名称汇总耗时与结果"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # 命令名称 -> CommandStats
+        self.commands = {}
+        self.started = time.time()
+
+        self.dump_thread = None
+        self.dump_stop = threading.Event()
+
+    def stats(self, command):
+        stats = self.commands.get(command)
+        if stats is None:
+            stats = self.commands.setdefault(command, CommandStats())
+        return stats
+
+    def record_queue_wait(self, command, seconds):
+        """命令在调度队列中等待的时间"""
+        with self.lock:
+            self.stats(command).histograms['queue_wait'].record(seconds)
+
+    def record_response(self, command, total, connect=0.0, server=None, retries=0, accepted=True):
+        """记录一次收到响应的请求，server为None时按总耗时减去建连耗时估算"""
+        with self.lock:
+            stats = self.stats(command)
+            histograms = stats.histograms
+            histograms['total'].record(total)
+            histograms['connect'].record(connect)
+            histograms['server'].record(server if server is not None else max(0.0, total - connect))
+            stats.counters['success' if accepted else 'rejected'] += 1
+            stats.counters['retries'] += retries
+
+    def record_failure(self, command, total, timeout=False, retries=0):
+        """记录一次网络失败（超时或连接错误）"""
+        with self.lock:
+            stats = self.stats(command)
+            stats.histograms['total'].record(total)
+            stats.counters['timeout' if timeout else 'error'] += 1
+            stats.counters['retries'] += retries
+
+    def snapshot(self):
+        """所有命令的统计快照（可直接序列化为JSON）"""
+        with self.lock:
+            return {
+                'started': self.started,
+                'time': time.time(),
+                'commands': {command: stats.snapshot() for command, stats in sorted(self.commands.items())},
+            }
+
+    def reset(self):
+        with self.lock:
+            self.commands = {}
+            self.started = time.time()
+
+    def dump(self, path):
+        """把快照写入JSON文件（先写临时文件再替换）"""
+        data = json.dumps(self.snapshot(), ensure_ascii=False, indent=1)
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"保存命令统计失败: {e}")
+
+    def start_periodic_dump(self, path, interval=60.0):
+        """后台线程定期写入快照"""
+        self.stop_periodic_dump()
+        self.dump_stop.clear()
+
+        def run():
+            while not self.dump_stop.wait(interval):
+                self.dump(path)
+            self.dump(path)
+
+        self.dump_thread = threading.Thread(target=run, name='stats-dump', daemon=True)
+        self.dump_thread.start()
+
+    def stop_periodic_dump(self, timeout=1.0):
+        if self.dump_thread is not None:
+            self.dump_stop.set()
+            self.dump_thread.join(timeout)
+            self.dump_thread = None
+
+
+def format_snapshot(snapshot):
+    """把快照格式化为便于在界面上显示的文本"""
+    lines = []
+    for command, stats in snapshot['commands'].items():
+        counters = stats['counters']
+        total = stats['timings']['total']
+        line = (f"{command}: 成功{counters['success']} 拒绝{counters['rejected']} "
+                f"超时{counters['timeout']} 错误{counters['error']} 重试{counters['retries']}")
+        if total['count']:
+            line += f"\n    总耗时 p50={total['p50_ms']:.1f}ms p99={total['p99_ms']:.1f}ms max={total['max_ms']:.1f}ms"
+        wait = stats['timings']['queue_wait']
+        if wait['count']:
+            line += f"  排队 p99={wait['p99_ms']:.1f}ms"
+        lines.append(line)
+    return '\n'.join(lines) or '暂无命令统计'
+
+
+def server_timing(headers):
+    """解析响应头 Server-Timing 中的处理耗时（秒），没有时返回None"""
+    value = headers.get('Server-Timing')
+    if not value:
+        return None
+    for part in value.split(';'):
+        part = part.strip()
+        if part.startswith('dur='):
+            try:
+                return float(part[4:]) / 1000.0
+            except ValueError:
+                return None
+    return None
+
+
+_timed_pools = None
+
+
+def install_connect_timer(adapter):
+    """让适配器的连接池使用计时连接类，建连耗时写入connect_timer.seconds"""
+    global _timed_pools
+    if _timed_pools is None:
+        # urllib3随requests一起在首次请求时才导入
+        from urllib3.connection import HTTPConnection, HTTPSConnection
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+        def timed(connection_cls):
+            class TimedConnection(connection_cls):
+                def connect(self):
+                    started = time.perf_counter()
+                    try:
+                        return super().connect()
+                    finally:
+                        connect_timer.seconds = getattr(connect_timer, 'seconds', 0.0) + time.perf_counter() - started
+            return TimedConnection
+
+        class TimedHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = timed(HTTPConnection)
+
+        class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = timed(HTTPSConnection)
+
+        _timed_pools = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+    adapter.poolmanager.pool_classes_by_scheme = _timed_pools
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令宏 - 把多条命令（灯光颜色、调光、音量、场景等）组合成一个整体执行
+宏保存在本地 macros.json，执行时通过ConnectionManager.send_batch一次发送
+"""
+
+import json
+import os
+import threading
+
+# 没有本地宏文件时提供的示例宏
+DEFAULT_MACROS = [
+    {
+        'name': '开场',
+        'atomic': True,
+        'commands': [
+            ['lights_control', {'action': 'blue'}],
+            ['lights_control', {'action': 'dim'}],
+            ['set_volume', {'volume': 60}],
+            ['play_scene', {'scene_name': '开场音乐'}],
+        ],
+    },
+    {
+        'name': '谢幕',
+        'atomic': True,
+        'commands': [
+            ['lights_control', {'action': 'full'}],
+            ['set_volume', {'volume': 40}],
+            ['play_scene', {'scene_name': '结束致谢'}],
+        ],
+    },
+    {
+        'name': '收场',
+        'atomic': False,
+        'commands': [
+            ['stop_scene', {}],
+            ['lights_control', {'action': 'off'}],
+            ['set_volume', {'volume': 0}],
+        ],
+    },
+]
+
+
+class MacroLibrary:
+    """命令宏库（内存 + 本地文件）"""
+
+    MACRO_FILE = 'macros.json'
+
+    def __init__(self, data_dir=None):
+        self.path = os.path.join(data_dir, self.MACRO_FILE) if data_dir else None
+        self.lock = threading.Lock()
+        # 宏名称 -> {'name', 'atomic', 'commands'}，保持定义顺序
+        self.macros = {}
+
+    def load(self):
+        """读取本地宏文件，没有时使用示例宏"""
+        macros = None
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    macros = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取命令宏失败: {e}")
+
+        with self.lock:
+            self.macros = {}
+            for macro in macros if macros is not None else DEFAULT_MACROS:
+                self.macros[macro['name']] = macro
+
+    def save(self):
+        """写入本地宏文件（先写临时文件再替换）"""
+        if not self.path:
+            return
+        with self.lock:
+            data = json.dumps(list(self.macros.values()), ensure_ascii=False, indent=1)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"保存命令宏失败: {e}")
+
+    def define(self, name, commands, atomic=True):
+        """定义（或覆盖）一个宏，commands为[(命令, 数据), ...]"""
+        macro = {
+            'name': name,
+            'atomic': atomic,
+            'commands': [[command, data or {}] for command, data in commands],
+        }
+        with self.lock:
+            self.macros[name] = macro
+        self.save()
+        return macro
+
+    def remove(self, name):
+        with self.lock:
+            removed = self.macros.pop(name, None)
+        if removed is not None:
+            self.save()
+        return removed is not None
+
+    def get(self, name):
+        with self.lock:
+            return self.macros.get(name)
+
+    def names(self):
+        with self.lock:
+            return list(self.macros)
+
+    def run(self, manager, name, callback=None, mirror=None):
+        """异步执行宏，callback(results)在界面线程中调用，宏不存在返回None
+        指定mirror（StateMirror）时命令先乐观应用到本地状态镜像"""
+        macro = self.get(name)
+        if macro is None:
+            print(f"命令宏不存在: {name}")
+            return None
+        if mirror is not None:
+            return mirror.apply_batch(macro['commands'], callback, atomic=macro['atomic'])
+        return manager.send_batch_async(macro['commands'], callback, atomic=macro['atomic'])
+
+
+class MacroRecorder:
+    """录制界面上依次发送的命令，结束后保存为宏"""
+
+    def __init__(self):
+        self.commands = None
+
+    @property
+    def recording(self):
+        return self.commands is not None
+
+    def start(self):
+        self.commands = []
+
+    def record(self, command, data=None, coalesce=False):
+        """记录一条命令；coalesce=True时只保留该命令的最新值（如音量）"""
+        if self.commands is None:
+            return
+        if coalesce:
+            self.commands = [item for item in self.commands if item[0] != command]
+        self.commands.append((command, dict(data or {})))
+
+    def stop(self):
+        """结束录制，返回录制到的命令"""
+        commands, self.commands = self.commands or [], None
+        return commands
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控界面 - 以折线图实时显示命令延迟、错误率、连接状态和设备在线数
+折线使用Kivy绘图指令原地更新坐标，刷新时不创建、不重建控件
+打开监控界面后启用命令耗时统计，可查看各命令的耗时分布并定期写入 command_stats.json
+"""
+
+import os
+
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.graphics import Color, Line, Rectangle
+from kivy.metrics import dp
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.screenmanager import Screen
+from kivy.uix.widget import Widget
+
+from instrumentation import format_snapshot
+from telemetry import Telemetry, sparkline_points
+
+# 监控界面刷新频率（Hz）
+REFRESH_RATE = 20
+
+# 命令统计快照文件
+STATS_FILE = 'command_stats.json'
+
+
+class Sparkline(Widget):
+    """单个指标的折线图（预分配坐标数组，每帧原地更新）"""
+
+    def __init__(self, buffer, color=(0, 1, 0, 1), lo=None, hi=None, **kwargs):
+        super().__init__(**kwargs)
+        self.buffer = buffer
+        # 纵轴范围，None表示按当前样本自动缩放
+        self.lo = lo
+        self.hi = hi
+        self.points = [0.0] * (2 * buffer.capacity)
+
+        with self.canvas:
+            Color(0.12, 0.12, 0.12, 1)
+            self.background = Rectangle(pos=self.pos, size=self.size)
+            Color(*color)
+            self.line = Line(points=self.points, width=dp(1.2))
+        self.bind(pos=self.on_geometry, size=self.on_geometry)
+
+    def on_geometry(self, *args):
+        self.background.pos = self.pos
+        self.background.size = self.size
+        self.redraw()
+
+    def redraw(self):
+        """按缓冲区当前样本更新折线坐标"""
+        sparkline_points(self.buffer, self.points, self.x, self.y, self.width, self.height, self.lo, self.hi)
+        self.line.points = self.points
+
+
+class MetricRow(BoxLayout):
+    """指标名称 + 当前值 + 折线图"""
+
+    def __init__(self, title, buffer, value_format, color, lo=None, hi=None, **kwargs):
+        super().__init__(orientation='horizontal', spacing=dp(10), **kwargs)
+        self.buffer = buffer
+        self.value_format = value_format
+
+        self.value_label = Label(text=title, size_hint_x=0.25, halign='left')
+        self.title = title
+        self.sparkline = Sparkline(buffer, color=color, lo=lo, hi=hi, size_hint_x=0.75)
+        self.add_widget(self.value_label)
+        self.add_widget(self.sparkline)
+
+    def redraw(self):
+        self.sparkline.redraw()
+        # 文字只在数值变化时更新，避免每帧重新生成文字纹理
+        text = f"{self.title}\n{self.value_format.format(self.buffer.latest())}"
+        if text != self.value_label.text:
+            self.value_label.text = text
+
+
+class MonitorScreen(Screen):
+    """运行监控界面"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.name = 'monitor'
+        self.tick_event = None
+        self.devices_text = None
+
+        # 监控数据来自连接管理器的命令结果和状态更新（推送或轮询）
+        app = App.get_running_app()
+        manager = app.connection_manager
+        self.telemetry = Telemetry(capacity=REFRESH_RATE * 10)
+        manager.add_command_listener(self.telemetry.record_command)
+        manager.add_status_callback(self.telemetry.record_status)
+
+        # 命令耗时统计（定期写入本地文件）
+        self.stats_path = os.path.join(app.user_data_dir, STATS_FILE)
+        manager.enable_instrumentation(self.stats_path)
+
+        main_layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+
+        header = BoxLayout(orientation='horizontal', size_hint_y=0.1)
+        header.add_widget(Label(text='📊 运行监控（最近10秒）', font_size=dp(18), bold=True))
+        stats_btn = Button(text='📈 命令统计', size_hint_x=0.25)
+        stats_btn.bind(on_press=self.show_stats)
+        header.add_widget(stats_btn)
+        back_btn = Button(text='⬅️ 返回', size_hint_x=0.25)
+        back_btn.bind(on_press=self.go_back)
+        header.add_widget(back_btn)
+        main_layout.add_widget(header)
+
+        series = self.telemetry.series
+        self.rows = [
+            MetricRow('命令延迟', series['latency_ms'], '{:.1f} ms', (0, 0.8, 1, 1), lo=0),
+            MetricRow('错误率', series['error_rate'], '{:.0%}', (1, 0.3, 0.3, 1), lo=0, hi=1),
+            MetricRow('连接状态', series['connected'], '{:.0f}', (0, 1, 0, 1), lo=0, hi=1),
+            MetricRow('在线设备', series['devices_online'], '{:.0f}', (1, 0.8, 0, 1), lo=0),
+        ]
+        for row in self.rows:
+            main_layout.add_widget(row)
+
+        self.devices_label = Label(text='设备状态: 暂无数据', size_hint_y=0.15, color=(0.7, 0.7, 0.7, 1))
+        main_layout.add_widget(self.devices_label)
+
+        self.add_widget(main_layout)
+
+    def on_enter(self, *args):
+        self.start_timers()
+
+    def on_leave(self, *args):
+        self.stop_timers()
+
+    def start_timers(self):
+        """界面显示时才开始定时刷新"""
+        if self.tick_event is None and not App.get_running_app().paused:
+            self.tick_event = Clock.schedule_interval(self.update, 1.0 / REFRESH_RATE)
+
+    def stop_timers(self):
+        """界面隐藏或应用切到后台时停止刷新"""
+        if self.tick_event is not None:
+            self.tick_event.cancel()
+            self.tick_event = None
+
+    def update(self, dt):
+        """写入一个采样点并原地刷新折线"""
+        self.telemetry.tick()
+        for row in self.rows:
+            row.redraw()
+
+        devices = self.telemetry.devices
+        if devices != self.devices_text:
+            self.devices_text = devices
+            if devices:
+                self.devices_label.text = '设备状态: ' + '  '.join(
+                    f"{name}: {state}" for name, state in sorted(devices.items())
+                )
+
+    def show_stats(self, instance):
+        """显示各命令的耗时统计，同时写入快照文件"""
+        from kivy.uix.popup import Popup
+
+        instrumentation = App.get_running_app().connection_manager.instrumentation
+        if instrumentation is None:
+            return
+        instrumentation.dump(self.stats_path)
+        text = format_snapshot(instrumentation.snapshot())
+        popup = Popup(
+            title='命令统计',
+            content=Label(text=f"{text}\n\n已保存到 {self.stats_path}", halign='left'),
+            size_hint=(0.9, 0.7)
+        )
+        popup.open()
+
+    def go_back(self, instance):
+        App.get_running_app().show_screen('main_control')
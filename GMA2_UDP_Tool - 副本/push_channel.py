@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+状态推送通道 - 通过WebSocket订阅主控制系统的状态和场景变化
+推送断开期间退回HTTP轮询，并以带抖动的指数退避自动重连
+配置了多设备会话时控制系统状态由会话中心转发，推送通道只转发场景目录变化，断开期间也不轮询状态
+"""
+
+import json
+import random
+import threading
+import time
+
+
+class PushChannel:
+    """WebSocket推送订阅（后台线程）"""
+
+    def __init__(self, manager, ping_interval=5, ping_timeout=3,
+                 min_backoff=0.5, max_backoff=30.0, poll_interval=5.0):
+        self.manager = manager
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        # 推送断开期间的HTTP轮询间隔
+        self.poll_interval = poll_interval
+        # 是否转发控制系统状态（False时只转发场景目录变化）
+        self.status_events = True
+
+        self.app = None
+        self.connected = False
+        self.running = False
+        self.thread = None
+        self.wakeup = threading.Event()
+
+    @property
+    def url(self):
+        return f"ws://{self.manager.server_ip}:{self.manager.websocket_port}/ws"
+
+    def start(self):
+        """启动推送订阅"""
+        if self.running:
+            return
+        self.running = True
+        self.wakeup.clear()
+        self.thread = threading.Thread(target=self._run, name='push-channel', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        """停止推送订阅"""
+        self.running = False
+        self.wakeup.set()
+        self._close_socket()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def reconnect(self):
+        """服务器地址变化后立即重连"""
+        self.wakeup.set()
+        self._close_socket()
+
+    def _close_socket(self):
+        app = self.app
+        if app is not None:
+            try:
+                app.close()
+            except Exception as e:
+                print(f"关闭推送连接错误: {e}")
+
+    def _run(self):
+        # websocket客户端只在订阅推送时才导入
+        import websocket
+
+        backoff = self.min_backoff
+        while self.running:
+            self.wakeup.clear()
+            opened_at = time.monotonic()
+            self.app = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_pong=self._on_pong,
+                on_close=self._on_close,
+                on_error=self._on_error
+            )
+            self.manager.websocket = self.app
+            try:
+                self.app.run_forever(ping_interval=self.ping_interval, ping_timeout=self.ping_timeout)
+            except Exception as e:
+                print(f"推送连接错误: {e}")
+            self.app = None
+            self.manager.websocket = None
+            self.connected = False
+
+            if not self.running:
+                break
+            # 推送连接断开，健康监测立即探测一次确认链路状态
+            self.manager.health.wake()
+
+            # 连接保持过一段时间则认为链路已恢复，重置退避
+            if time.monotonic() - opened_at > self.max_backoff:
+                backoff = self.min_backoff
+
+            # 全抖动退避，等待期间用HTTP轮询兜底
+            delay = random.uniform(self.min_backoff, backoff)
+            backoff = min(self.max_backoff, backoff * 2)
+            if self.status_events:
+                self._poll_until(time.monotonic() + delay)
+            else:
+                self.wakeup.wait(delay)
+
+    def _poll_until(self, deadline):
+        """推送不可用时通过HTTP轮询状态，直到deadline"""
+        while self.running:
+            status = self.manager.get_status()
+            if status:
+                self.manager.report_alive()
+                self._deliver('status', status, 'poll')
+            else:
+                self.manager.report_failure()
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if self.wakeup.wait(min(remaining, self.poll_interval)):
+                return
+
+    def _deliver(self, kind, data, source):
+        self.manager.notify_status_change({'type': kind, 'data': data, 'source': source})
+
+    def _on_open(self, app):
+        self.connected = True
+        self.manager.last_heartbeat = time.time()
+        self.manager.report_alive()
+
+    def _on_message(self, app, message):
+        self.manager.last_heartbeat = time.time()
+        self.manager.report_alive()
+        try:
+            event = json.loads(message)
+        except ValueError:
+            print(f"推送消息格式错误: {message[:80]}")
+            return
+        if not isinstance(event, dict):
+            print(f"推送消息格式错误: {message[:80]}")
+            return
+
+        kind = event.get('type')
+        if kind == 'scenes' or (kind == 'status' and self.status_events):
+            self._deliver(kind, event.get('data'), 'push')
+
+    def _on_pong(self, app, data):
+        self.manager.last_heartbeat = time.time()
+        self.manager.report_alive()
+
+    def _on_close(self, app, status_code, message):
+        self.connected = False
+
+    def _on_error(self, app, error):
+        print(f"推送连接错误: {error}")
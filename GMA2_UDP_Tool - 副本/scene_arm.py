@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景两阶段播放（预备 / GO）
+选中场景时在后台发送预备请求，控制系统提前解析并加载场景；按下播放时只发送一条很小的GO命令
+
+    预备  arm_scene    {"scene_name", "scene_id"}  ->  {"success": true, "token": 预备令牌}
+    取消  disarm_scene {"token"}
+    GO    go           {"token"}                   （负载在预备完成时就已编码好）
+
+选中其他场景时取消之前的预备；控制系统不支持预备或令牌已失效时回退为直接发送play_scene
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from transports import encode_payload
+
+# 预备状态
+ARM_IDLE = 'idle'
+ARM_ARMING = 'arming'
+ARM_ARMED = 'armed'
+ARM_FAILED = 'failed'
+
+
+class SceneArmer:
+    """场景预备和GO"""
+
+    def __init__(self, manager, ui_scheduler=None, on_change=None, arm_timeout=5.0):
+        self.manager = manager
+        # ui_scheduler(func, *args) 负责把回调投递回界面线程
+        self.ui_scheduler = ui_scheduler
+        # on_change(预备状态, 场景名) 预备状态变化时在当前线程中调用（如StateStore.set）
+        self.on_change = on_change
+        # 预备进行中按下播放时最多等待的时间（秒）
+        self.arm_timeout = arm_timeout
+
+        self.lock = threading.Lock()
+        # 每次选择场景加一，用于丢弃过期的预备结果
+        self.generation = 0
+        self.scene = None
+        self.state = ARM_IDLE
+        self.token = None
+        self.go_body = None
+        self.arm_future = None
+
+        # 预备请求和GO各用一个线程，GO不会排在预备请求或其他命令后面
+        self.arm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scene-arm')
+        self.go_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scene-go')
+
+    def arm(self, scene):
+        """选中场景：取消之前的预备，在后台预备新场景"""
+        with self.lock:
+            self.generation += 1
+            stale = self._release()
+            self.scene = scene
+            self.state = ARM_ARMING
+            self.arm_future = self.arm_executor.submit(self._arm, self.generation, scene)
+        self._disarm(stale)
+        self._notify()
+
+    def select(self, scene):
+        """选中场景但不预备（其他设备同步过来的选择由发起的设备预备），按下播放时直接发送play_scene"""
+        with self.lock:
+            self.generation += 1
+            stale = self._release()
+            self.scene = scene
+            self.state = ARM_IDLE
+        self._disarm(stale)
+        self._notify()
+
+    def cancel(self):
+        """取消选择和预备（退出登录、紧急停止、场景被删除等）"""
+        with self.lock:
+            self.generation += 1
+            stale = self._release()
+            self.scene = None
+            self.state = ARM_IDLE
+        self._disarm(stale)
+        self._notify()
+
+    def _release(self):
+        """丢弃当前预备（调用时已持有锁），返回需要通知控制系统取消的令牌"""
+        if self.arm_future is not None:
+            # 还在排队的预备请求直接取消，已发出的在返回后按过期处理
+            self.arm_future.cancel()
+            self.arm_future = None
+        token, self.token, self.go_body = self.token, None, None
+        return token
+
+    def _arm(self, generation, scene):
+        """在预备线程中执行：发送预备请求并编码GO"""
+        with self.lock:
+            if generation != self.generation:
+                return None
+        result = self.manager.send_command(
+            'arm_scene', {'scene_name': scene['name'], 'scene_id': scene.get('id')}, journal=False
+        )
+        token = result.get('token') if isinstance(result, dict) else None
+
+        with self.lock:
+            if generation != self.generation:
+                # 等待应答期间已选择了其他场景
+                stale = token
+            else:
+                stale = None
+                self.token = token
+                self.go_body = encode_payload('go', {'token': token}) if token else None
+                self.state = ARM_ARMED if token else ARM_FAILED
+        if stale is not None:
+            self._disarm(stale)
+        else:
+            self._notify()
+        return token
+
+    def go(self, callback=None):
+        """播放选中的场景，立即返回Future；callback(result)在界面线程中调用
+        已预备时只发送GO，预备进行中时等预备完成后发送GO，否则直接发送play_scene"""
+        with self.lock:
+            if self.scene is None:
+                return None
+            generation = self.generation
+            arm_future = self.arm_future if self.state == ARM_ARMING else None
+
+        future = self.go_executor.submit(self._go, generation, arm_future)
+        if callback is not None:
+            future.add_done_callback(lambda f: self._deliver(callback, None if f.cancelled() else f.result()))
+        return future
+
+    def _go(self, generation, arm_future):
+        if arm_future is not None:
+            try:
+                arm_future.result(timeout=self.arm_timeout)
+            except Exception:
+                pass
+
+        with self.lock:
+            if generation != self.generation:
+                # 播放前已选择了其他场景
+                return None
+            scene, body = self.scene, self.go_body
+            # 预备令牌只能使用一次
+            self.token = self.go_body = self.arm_future = None
+            self.state = ARM_IDLE
+        self._notify()
+
+        if body is not None:
+            result = self.manager.send_encoded('go', body)
+            if result is not None:
+                return result
+            print(f"场景GO失败，改为直接播放: {scene['name']}")
+        return self.manager.send_command('play_scene', {'scene_name': scene['name']})
+
+    def _disarm(self, token):
+        if token is not None:
+            # 取消失败不写入离线日志：重发过期令牌可能取消之后的预备
+            self.manager.send_command_async('disarm_scene', {'token': token}, journal=False)
+
+    def _notify(self):
+        if self.on_change is None:
+            return
+        with self.lock:
+            state, scene = self.state, self.scene
+        try:
+            self.on_change(state, scene['name'] if scene else None)
+        except Exception as e:
+            print(f"预备状态回调错误: {e}")
+
+    def _deliver(self, callback, result):
+        if self.ui_scheduler:
+            self.ui_scheduler(callback, result)
+        else:
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"命令回调错误: {e}")
+
+    def close(self):
+        self.arm_executor.shutdown(wait=False, cancel_futures=True)
+        self.go_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景素材预取 - 按场景目录下载每个场景的缩略图和预览信息
+    下载池      固定数量的后台线程，使用素材专用HTTP会话（连接池与线程数相同，不占用命令连接），按优先级取任务：
+                可见行 > 可见行附近的行 > 其余场景（按目录顺序，只下载到磁盘缓存）
+    磁盘缓存    AssetCache（大小上限 + LRU淘汰），场景内容变化（version）后重新下载
+    解码        只解码可见和附近行的缩略图，在下载线程中完成（不占用界面线程）
+    纹理上传    TextureUploader在界面线程中每帧最多上传几张，保留最近使用的有限数量纹理
+预览信息（JSON，时长等）下载后保存在内存中
+"""
+
+import heapq
+import io
+import itertools
+import json
+import threading
+from collections import OrderedDict, deque
+from urllib.parse import quote
+
+from scene_catalog import scene_key
+
+THUMBNAIL = 'thumbnail'
+PREVIEW = 'preview'
+
+# 优先级：可见行、附近行、后台预取
+PRIORITY_VISIBLE = 0
+PRIORITY_NEARBY = 1
+PRIORITY_BACKGROUND = 2
+
+
+def asset_path(scene, kind):
+    """素材地址：场景条目中有 thumbnail/preview 字段时使用该地址"""
+    path = scene.get(kind)
+    if path:
+        return path
+    return f"/api/scenes/{quote(str(scene_key(scene)), safe='')}/{kind}"
+
+
+def asset_name(scene, kind):
+    """缓存名称，场景版本变化后缓存自然失效"""
+    return f"{kind}|{scene_key(scene)}|{scene.get('version', '')}"
+
+
+def image_ext(data):
+    """按文件头判断图片格式"""
+    if data.startswith(b'\xff\xd8'):
+        return 'jpg'
+    if data.startswith(b'GIF8'):
+        return 'gif'
+    return 'png'
+
+
+def decode_thumbnail(data):
+    """在后台线程中把图片解码为像素数据（kivy CoreImage，纹理在第一次读取texture时才创建）"""
+    from kivy.core.image import Image as CoreImage
+
+    try:
+        return CoreImage(io.BytesIO(data), ext=image_ext(data), nocache=True)
+    except Exception as e:
+        raise ValueError(f'缩略图解码失败: {e}') from None
+
+
+def create_texture(image):
+    """用解码后的图片创建纹理（界面线程），像素数据上传后即释放"""
+    texture = image.texture
+    if texture is None:
+        raise ValueError('缩略图没有像素数据')
+    return texture
+
+
+class TextureUploader:
+    """界面线程中分帧上传纹理，保留最近使用的max_textures张"""
+
+    def __init__(self, ui_scheduler, per_frame=4, max_textures=120, create=create_texture):
+        # ui_scheduler(func, *args) 在下一帧由界面线程执行
+        self.ui_scheduler = ui_scheduler
+        self.per_frame = per_frame
+        self.max_textures = max_textures
+        self.create = create
+        # on_upload(场景标识, 纹理)、on_evict(场景标识)，在界面线程中调用
+        self.on_upload = None
+        self.on_evict = None
+
+        self.lock = threading.Lock()
+        self.queue = deque()
+        self.scheduled = False
+        # 当前可见的场景，优先上传
+        self.visible = set()
+        # 场景标识 -> 纹理，最近使用的在后
+        self.textures = OrderedDict()
+        self.uploaded = 0
+
+    def has(self, key):
+        with self.lock:
+            return key in self.textures or any(k == key for k, _ in self.queue)
+
+    def touch(self, keys):
+        """可见行优先上传，其纹理标记为最近使用，不会被淘汰"""
+        with self.lock:
+            self.visible = set(keys)
+            for key in keys:
+                if key in self.textures:
+                    self.textures.move_to_end(key)
+
+    def submit(self, key, image):
+        """后台线程提交解码好的图片"""
+        with self.lock:
+            self.queue.append((key, image))
+            if self.scheduled:
+                return
+            self.scheduled = True
+        self.ui_scheduler(self.upload_batch)
+
+    def discard(self, key):
+        """场景已删除或内容变化，丢弃其纹理（可在后台线程调用）"""
+        with self.lock:
+            removed = self.textures.pop(key, None) is not None
+        if removed and self.on_evict is not None:
+            self.ui_scheduler(self.on_evict, key)
+
+    def upload_batch(self):
+        """上传本帧的一批纹理，还有剩余时在下一帧继续"""
+        with self.lock:
+            batch = [item for item in self.queue if item[0] in self.visible][:self.per_frame]
+            for item in batch:
+                self.queue.remove(item)
+            while len(batch) < self.per_frame and self.queue:
+                batch.append(self.queue.popleft())
+        evicted = []
+        for key, image in batch:
+            try:
+                texture = self.create(image)
+            except Exception as e:
+                print(f"创建缩略图纹理失败: {e}")
+                continue
+            with self.lock:
+                self.textures[key] = texture
+                self.textures.move_to_end(key)
+                self.uploaded += 1
+                while len(self.textures) > self.max_textures:
+                    evicted.append(self.textures.popitem(last=False)[0])
+            if self.on_upload is not None:
+                self.on_upload(key, texture)
+        if self.on_evict is not None:
+            for key in evicted:
+                self.on_evict(key)
+        with self.lock:
+            if not self.queue:
+                self.scheduled = False
+                return
+        self.ui_scheduler(self.upload_batch)
+
+
+class AssetPrefetcher:
+    """场景素材预取（后台下载池）"""
+
+    def __init__(self, manager, cache, uploader, workers=4, decode=decode_thumbnail, ui_scheduler=None,
+                 on_preview=None):
+        self.manager = manager
+        manager.asset_pool_size = workers
+        self.cache = cache
+        self.uploader = uploader
+        self.workers = workers
+        self.decode = decode
+        self.ui_scheduler = ui_scheduler
+        # on_preview(场景标识, 预览信息)
+        self.on_preview = on_preview
+
+        self.cond = threading.Condition()
+        # 场景标识 -> 场景，按目录顺序
+        self.scenes = OrderedDict()
+        # 任务堆 (优先级, 顺序, 场景标识, 素材类型)，同一素材重新排队时旧任务按queued判断跳过
+        self.heap = []
+        self.order = itertools.count()
+        # (场景标识, 素材类型) -> 当前排队的优先级
+        self.queued = {}
+        # 需要显示缩略图的场景（可见行和附近行）
+        self.display = set()
+        # 已下载到缓存的素材名称
+        self.fetched = set()
+        self.previews = {}
+
+        self.downloads = 0
+        self.downloaded_bytes = 0
+        self.decoded = 0
+        self.failures = 0
+
+        self.running = False
+        self.threads = []
+
+    def start(self):
+        with self.cond:
+            if self.running:
+                return
+            self.running = True
+        self.threads = [threading.Thread(target=self._work, name=f'asset-{i}', daemon=True)
+                        for i in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self, timeout=1.0):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def preview(self, key):
+        with self.cond:
+            return self.previews.get(key)
+
+    def set_scenes(self, scenes):
+        """场景目录更新：所有场景的素材按目录顺序加入后台预取"""
+        stale = []
+        with self.cond:
+            old = self.scenes
+            self.scenes = OrderedDict((scene_key(scene), scene) for scene in scenes)
+            for key, scene in old.items():
+                if self.scenes.get(key) != scene:
+                    # 删除或内容变化的场景
+                    stale.append(key)
+                    self.previews.pop(key, None)
+            for key in self.scenes:
+                for kind in (THUMBNAIL, PREVIEW):
+                    self._enqueue(key, kind, PRIORITY_BACKGROUND)
+            self.cond.notify_all()
+        for key in stale:
+            self.uploader.discard(key)
+        with self.cond:
+            # 内容变化的可见场景重新显示
+            for key in stale:
+                if key in self.display and key in self.scenes:
+                    self._enqueue(key, THUMBNAIL, PRIORITY_VISIBLE)
+                    self._enqueue(key, PREVIEW, PRIORITY_NEARBY)
+            self.cond.notify_all()
+
+    def set_visible(self, visible, nearby=()):
+        """场景列表可见行变化：可见行的缩略图优先，其次是附近行的缩略图和这些行的预览信息"""
+        self.uploader.touch(visible)
+        with self.cond:
+            self.display = set(visible) | set(nearby)
+            for priority, keys in ((PRIORITY_VISIBLE, visible), (PRIORITY_NEARBY, nearby)):
+                for key in keys:
+                    if key not in self.scenes:
+                        continue
+                    if not self.uploader.has(key):
+                        self._enqueue(key, THUMBNAIL, priority)
+                    if key not in self.previews:
+                        self._enqueue(key, PREVIEW, PRIORITY_NEARBY)
+            self.cond.notify_all()
+
+    def _enqueue(self, key, kind, priority):
+        """调用时已持有锁；已下载且不需要显示的素材不再排队"""
+        job = (key, kind)
+        current = self.queued.get(job)
+        if current is not None and current <= priority:
+            return
+        if priority == PRIORITY_BACKGROUND and asset_name(self.scenes[key], kind) in self.fetched:
+            return
+        self.queued[job] = priority
+        heapq.heappush(self.heap, (priority, next(self.order), key, kind))
+
+    def _next_job(self):
+        with self.cond:
+            while self.running:
+                while self.heap:
+                    priority, _, key, kind = heapq.heappop(self.heap)
+                    if self.queued.get((key, kind)) != priority:
+                        # 已按更高优先级重新排队
+                        continue
+                    del self.queued[(key, kind)]
+                    scene = self.scenes.get(key)
+                    if scene is None:
+                        continue
+                    if priority != PRIORITY_BACKGROUND and key not in self.display:
+                        # 排队期间滚出了显示范围，降为后台预取，让新的可见行先处理
+                        self._enqueue(key, kind, PRIORITY_BACKGROUND)
+                        continue
+                    show = kind == THUMBNAIL and key in self.display
+                    return key, kind, scene, show
+                self.cond.wait()
+            return None
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._process(*job)
+            except Exception as e:
+                with self.cond:
+                    self.failures += 1
+                print(f"场景素材处理失败: {e}")
+
+    def _process(self, key, kind, scene, show):
+        name = asset_name(scene, kind)
+        if kind == THUMBNAIL and not show:
+            # 后台预取只需保证缩略图在磁盘缓存中
+            data = None
+            if self.cache.contains(name):
+                with self.cond:
+                    self.fetched.add(name)
+                return
+        else:
+            data = self.cache.get(name)
+        if data is None:
+            data = self.manager.fetch_asset(asset_path(scene, kind))
+            if data is None:
+                with self.cond:
+                    self.failures += 1
+                return
+            with self.cond:
+                self.downloads += 1
+                self.downloaded_bytes += len(data)
+            self.cache.put(name, data)
+        with self.cond:
+            self.fetched.add(name)
+
+        if kind == PREVIEW:
+            preview = json.loads(data.decode('utf-8'))
+            with self.cond:
+                self.previews[key] = preview
+            if self.on_preview is not None:
+                if self.ui_scheduler:
+                    self.ui_scheduler(self.on_preview, key, preview)
+                else:
+                    self.on_preview(key, preview)
+            return
+
+        with self.cond:
+            # 排队期间滚出了显示范围
+            show = show and key in self.display
+        if show and not self.uploader.has(key):
+            image = self.decode(data)
+            with self.cond:
+                self.decoded += 1
+            self.uploader.submit(key, image)
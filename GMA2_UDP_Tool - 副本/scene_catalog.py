@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景目录 - 从 /api/scenes 加载场景列表并缓存到本地
+启动时先读本地缓存，随后按 ETag / 版本号增量刷新，只通知发生变化的场景
+"""
+
+import json
+import os
+import threading
+
+
+def scene_key(scene):
+    """场景唯一标识：优先使用id，否则使用名称"""
+    return scene.get('id', scene.get('name'))
+
+
+class SceneCatalog:
+    """场景目录（内存 + 本地磁盘缓存）"""
+
+    CACHE_FILE = 'scene_catalog.json'
+
+    def __init__(self, manager, cache_dir=None):
+        self.manager = manager
+        self.cache_path = os.path.join(cache_dir, self.CACHE_FILE) if cache_dir else None
+
+        self.lock = threading.Lock()
+        self.scenes = []
+        self.index = {}
+        self.etag = None
+        self.version = None
+
+        # listener(diff)，diff = {'added': [...], 'changed': [...], 'removed': [...]}
+        self.listeners = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def notify(self, diff):
+        for listener in self.listeners:
+            try:
+                listener(diff)
+            except Exception as e:
+                print(f"场景目录回调错误: {e}")
+
+    def load_cached(self):
+        """读取本地缓存，成功返回True"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取场景缓存失败: {e}")
+            return False
+
+        with self.lock:
+            self.etag = cached.get('etag')
+            self.version = cached.get('version')
+        self.replace(cached.get('scenes', []))
+        return True
+
+    def save(self):
+        """写入本地缓存（先写临时文件再替换，避免写坏缓存）"""
+        if not self.cache_path:
+            return
+        with self.lock:
+            cached = {'etag': self.etag, 'version': self.version, 'scenes': self.scenes}
+            data = json.dumps(cached, ensure_ascii=False, separators=(',', ':'))
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = self.cache_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"保存场景缓存失败: {e}")
+
+    def refresh(self):
+        """从控制系统刷新场景目录，返回变化内容，无变化或失败返回None"""
+        response = self.manager.fetch_scenes(etag=self.etag, since=self.version)
+        if response is None:
+            return None
+        status, body, etag = response
+        if status == 304:
+            return None
+
+        with self.lock:
+            self.etag = etag
+
+        if isinstance(body, dict):
+            self.version = body.get('version', self.version)
+            if 'scenes' in body:
+                diff = self.replace(body['scenes'])
+            else:
+                # 增量响应：只包含变化和删除的场景
+                diff = self.apply_delta(body.get('changed', []), body.get('removed', []))
+        else:
+            diff = self.replace(body or [])
+
+        self.save()
+        return diff
+
+    def replace(self, scenes):
+        """用完整列表替换目录，返回与旧目录的差异"""
+        new_index = {scene_key(scene): scene for scene in scenes}
+        with self.lock:
+            old_index = self.index
+            self.scenes = list(scenes)
+            self.index = new_index
+
+        diff = {
+            'added': [s for k, s in new_index.items() if k not in old_index],
+            'changed': [s for k, s in new_index.items() if k in old_index and old_index[k] != s],
+            'removed': [s for k, s in old_index.items() if k not in new_index],
+        }
+        if any(diff.values()):
+            self.notify(diff)
+        return diff
+
+    def apply_delta(self, changed, removed):
+        """应用增量更新（新增/修改的场景与被删除场景的标识）"""
+        diff = {'added': [], 'changed': [], 'removed': []}
+        with self.lock:
+            for scene in changed:
+                key = scene_key(scene)
+                if key in self.index:
+                    if self.index[key] != scene:
+                        diff['changed'].append(scene)
+                else:
+                    diff['added'].append(scene)
+                self.index[key] = scene
+
+            for key in removed:
+                scene = self.index.pop(key, None)
+                if scene is not None:
+                    diff['removed'].append(scene)
+
+            if any(diff.values()):
+                # 保持原有顺序，新增场景追加在末尾
+                order = [scene_key(s) for s in self.scenes if scene_key(s) in self.index]
+                known = set(order)
+                order.extend(scene_key(s) for s in diff['added'] if scene_key(s) not in known)
+                self.scenes = [self.index[k] for k in order]
+
+        if any(diff.values()):
+            self.notify(diff)
+        return diff
+
+    def apply_event(self, data):
+        """应用推送通道收到的场景变化"""
+        if isinstance(data, list):
+            diff = self.replace(data)
+        else:
+            data = data or {}
+            if data.get('version') is not None:
+                self.version = data['version']
+            diff = self.apply_delta(data.get('changed', []), data.get('removed', []))
+        if any(diff.values()):
+            self.save()
+        return diff
+
+    def position(self, scene):
+        """场景在目录中的位置"""
+        key = scene_key(scene)
+        with self.lock:
+            for i, s in enumerate(self.scenes):
+                if scene_key(s) == key:
+                    return i
+        return len(self.scenes)
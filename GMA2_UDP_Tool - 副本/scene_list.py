@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景列表 - 基于RecycleView的虚拟化列表
+只为可见行创建按钮控件，场景本身只保存为轻量的行数据字典
+滚动时报告可见行和附近的行（用于优先加载缩略图），缩略图纹理保存在行数据中
+"""
+
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle
+from kivy.metrics import dp
+from kivy.properties import BooleanProperty, ObjectProperty
+from kivy.uix.button import Button
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+from scene_catalog import scene_key
+
+NORMAL_COLOR = (1, 1, 1, 1)
+SELECTED_COLOR = (0.2, 0.6, 1, 1)
+
+ROW_HEIGHT = dp(80)
+ROW_SPACING = dp(5)
+THUMBNAIL_MARGIN = dp(6)
+
+
+def scene_row(scene, selected=False):
+    """场景行数据"""
+    return {
+        'key': scene_key(scene),
+        'text': f"{scene['name']}\n{scene.get('description', '')}",
+        'selected': selected,
+        'thumbnail': None,
+    }
+
+
+class SceneRow(RecycleDataViewBehavior, Button):
+    """场景行（被RecycleView循环复用）"""
+
+    key = ObjectProperty(None, allownone=True)
+    selected = BooleanProperty(False)
+    thumbnail = ObjectProperty(None, allownone=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.list_view = None
+        self.halign = 'center'
+        self.valign = 'middle'
+        self.bind(size=self.setter('text_size'))
+        # 缩略图画在行的左侧
+        with self.canvas.after:
+            self.thumbnail_color = Color(1, 1, 1, 0)
+            self.thumbnail_rect = Rectangle()
+        self.bind(pos=self.layout_thumbnail, size=self.layout_thumbnail)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.list_view = rv
+        return super().refresh_view_attrs(rv, index, data)
+
+    def on_selected(self, instance, value):
+        self.background_color = SELECTED_COLOR if value else NORMAL_COLOR
+
+    def on_thumbnail(self, instance, texture):
+        self.thumbnail_rect.texture = texture
+        self.thumbnail_color.a = 1 if texture is not None else 0
+        self.layout_thumbnail()
+
+    def layout_thumbnail(self, *args):
+        texture = self.thumbnail
+        if texture is None:
+            self.padding = [0, 0, 0, 0]
+            return
+        height = self.height - THUMBNAIL_MARGIN * 2
+        width = height * texture.width / max(1, texture.height)
+        self.thumbnail_rect.pos = (self.x + THUMBNAIL_MARGIN, self.y + THUMBNAIL_MARGIN)
+        self.thumbnail_rect.size = (width, height)
+        self.padding = [width + THUMBNAIL_MARGIN * 2, 0, 0, 0]
+
+    def on_press(self):
+        if self.list_view is not None:
+            self.list_view.select_key(self.key)
+
+
+class SceneListView(RecycleView):
+    """虚拟化场景列表"""
+
+    def __init__(self, select_callback=None, visible_callback=None, lookahead=20, **kwargs):
+        super().__init__(**kwargs)
+        self.select_callback = select_callback
+        # visible_callback(可见行, 附近的行) 滚动停顿或列表变化后调用，附近为可见范围前后各lookahead行
+        self.visible_callback = visible_callback
+        self.lookahead = lookahead
+
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, ROW_HEIGHT),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=ROW_SPACING
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        # viewclass保存在布局管理器上，必须在添加布局之后设置
+        self.viewclass = SceneRow
+
+        # 场景标识 -> 场景 / 行数据
+        self.scenes = {}
+        self.rows = {}
+        # 当前显示的场景标识（按目录顺序）
+        self.order = []
+        self.selected_key = None
+
+        # 同一帧内多次滚动只报告一次可见行
+        self.visible_trigger = Clock.create_trigger(self.report_visible)
+        self.bind(scroll_y=self.visible_trigger, height=self.visible_trigger)
+
+    def set_scenes(self, scenes):
+        """用完整场景列表重建行数据（保留已加载的缩略图）"""
+        old_rows = self.rows
+        self.scenes = {}
+        self.rows = {}
+        for scene in scenes:
+            key = scene_key(scene)
+            self.scenes[key] = scene
+            self.rows[key] = scene_row(scene, key == self.selected_key)
+            if key in old_rows:
+                self.rows[key]['thumbnail'] = old_rows[key]['thumbnail']
+        self.show_keys([scene_key(scene) for scene in scenes])
+
+    def apply_changes(self, scenes, diff):
+        """按目录差异更新行数据，scenes为更新后的完整有序目录"""
+        for scene in diff['removed']:
+            key = scene_key(scene)
+            self.scenes.pop(key, None)
+            self.rows.pop(key, None)
+            if key == self.selected_key:
+                self.selected_key = None
+
+        for scene in diff['changed'] + diff['added']:
+            key = scene_key(scene)
+            self.scenes[key] = scene
+            previous = self.rows.get(key)
+            self.rows[key] = scene_row(scene, key == self.selected_key)
+            if previous is not None:
+                # 新缩略图加载后替换
+                self.rows[key]['thumbnail'] = previous['thumbnail']
+
+        self.show_keys([scene_key(scene) for scene in scenes])
+
+    def show_keys(self, keys):
+        """只显示指定的场景（按给定顺序）"""
+        self.order = [key for key in keys if key in self.rows]
+        self.data = [self.rows[key] for key in self.order]
+        self.visible_trigger()
+
+    def visible_range(self):
+        """可见行在order中的范围 [first, last)"""
+        pitch = ROW_HEIGHT + ROW_SPACING
+        content = len(self.order) * pitch
+        offset = (1 - self.scroll_y) * max(0, content - self.height)
+        first = max(0, int(offset // pitch))
+        last = min(len(self.order), int((offset + self.height) // pitch) + 1)
+        return first, last
+
+    def report_visible(self, *args):
+        if self.visible_callback is None:
+            return
+        first, last = self.visible_range()
+        nearby = self.order[last:last + self.lookahead] + self.order[max(0, first - self.lookahead):first]
+        self.visible_callback(self.order[first:last], nearby)
+
+    def set_thumbnail(self, key, texture):
+        """设置场景缩略图（texture为None时清除），只刷新显示该场景的行"""
+        row = self.rows.get(key)
+        if row is None:
+            return
+        row['thumbnail'] = texture
+        for view in self.layout_manager.view_indices:
+            if view.key == key:
+                view.thumbnail = texture
+
+    def select_key(self, key):
+        """选中场景并通知回调"""
+        previous = self.rows.get(self.selected_key)
+        if previous is not None:
+            previous['selected'] = False
+        self.selected_key = key
+
+        row = self.rows.get(key)
+        if row is not None:
+            row['selected'] = True
+        self.refresh_from_data()
+
+        scene = self.scenes.get(key)
+        if scene is not None and self.select_callback:
+            self.select_callback(scene)
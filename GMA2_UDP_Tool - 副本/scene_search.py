@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景搜索索引 - 名称/描述的前缀、子串匹配以及中文名称的拼音首字母匹配
+索引常驻内存，随场景目录变化增量更新
+"""
+
+from bisect import bisect_right
+
+from scene_catalog import scene_key
+
+# GB2312一级汉字按拼音排序，各声母的起始编码
+_INITIAL_BOUNDARIES = [
+    (0xB0A1, 'a'), (0xB0C5, 'b'), (0xB2C1, 'c'), (0xB4EE, 'd'), (0xB6EA, 'e'),
+    (0xB7A2, 'f'), (0xB8C1, 'g'), (0xB9FE, 'h'), (0xBBF7, 'j'), (0xBFA6, 'k'),
+    (0xC0AC, 'l'), (0xC2E8, 'm'), (0xC4C3, 'n'), (0xC5B6, 'o'), (0xC5BE, 'p'),
+    (0xC6DA, 'q'), (0xC8BB, 'r'), (0xC8F6, 's'), (0xCBFA, 't'), (0xCDDA, 'w'),
+    (0xCEF4, 'x'), (0xD1B9, 'y'), (0xD4D1, 'z'),
+]
+_INITIAL_CODES = [code for code, _ in _INITIAL_BOUNDARIES]
+_LEVEL1_END = 0xD7FA
+
+
+def pinyin_initial(char):
+    """汉字的拼音首字母（仅支持GB2312一级汉字），其他字符原样返回小写"""
+    if char < '一':
+        return char.lower()
+    try:
+        encoded = char.encode('gb2312')
+    except UnicodeEncodeError:
+        return ''
+    code = (encoded[0] << 8) | encoded[1]
+    if code < _INITIAL_CODES[0] or code >= _LEVEL1_END:
+        return ''
+    return _INITIAL_BOUNDARIES[bisect_right(_INITIAL_CODES, code) - 1][1]
+
+
+def pinyin_initials(text):
+    """文本的拼音首字母串，例如 '互动环节' -> 'hdhj'"""
+    return ''.join(pinyin_initial(char) for char in text)
+
+
+def _grams(text):
+    """文本中所有单字和双字片段"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class SceneSearchIndex:
+    """场景内存搜索索引"""
+
+    def __init__(self):
+        # 场景标识 -> (名称, 首字母, 全文)
+        self.entries = {}
+        # 场景标识 -> 目录顺序（新增场景排在末尾）
+        self.ordinals = {}
+        self.next_ordinal = 0
+        # 单字/双字片段 -> 场景标识集合
+        self.postings = {}
+
+    def build(self, scenes):
+        """用完整场景列表重建索引"""
+        self.entries = {}
+        self.ordinals = {}
+        self.next_ordinal = 0
+        self.postings = {}
+        for scene in scenes:
+            self.add(scene)
+
+    def add(self, scene):
+        key = scene_key(scene)
+        if key in self.entries:
+            self.remove(key)
+
+        name = str(scene.get('name', '')).lower()
+        initials = pinyin_initials(name)
+        text = '\x00'.join((name, str(scene.get('description', '')).lower(), initials))
+        self.entries[key] = (name, initials, text)
+        if key not in self.ordinals:
+            self.ordinals[key] = self.next_ordinal
+            self.next_ordinal += 1
+
+        for gram in _grams(text):
+            if '\x00' not in gram:
+                self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for gram in _grams(entry[2]):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+
+    def apply_changes(self, diff, scenes=None):
+        """按场景目录差异增量更新，scenes为更新后的完整有序目录（用于校正排序）"""
+        for scene in diff['removed']:
+            key = scene_key(scene)
+            self.remove(key)
+            self.ordinals.pop(key, None)
+        for scene in diff['changed'] + diff['added']:
+            self.add(scene)
+
+        if scenes is not None and diff['added']:
+            self.ordinals = {scene_key(scene): i for i, scene in enumerate(scenes)}
+            self.next_ordinal = len(scenes)
+
+    def search(self, query):
+        """搜索场景，返回场景标识列表：名称/首字母前缀匹配在前，其余子串匹配在后"""
+        query = query.strip().lower()
+        if not query:
+            return sorted(self.entries, key=self.ordinals.__getitem__)
+
+        # 用最短的片段倒排表缩小候选范围
+        if len(query) == 1:
+            candidates = self.postings.get(query, ())
+        else:
+            grams = [query[i:i + 2] for i in range(len(query) - 1)]
+            postings = [self.postings.get(gram) for gram in grams]
+            if not all(postings):
+                return []
+            candidates = min(postings, key=len)
+
+        prefix = []
+        substring = []
+        for key in candidates:
+            name, initials, text = self.entries[key]
+            if name.startswith(query) or initials.startswith(query):
+                prefix.append(key)
+            elif query in text:
+                substring.append(key)
+
+        ordinal = self.ordinals.__getitem__
+        prefix.sort(key=ordinal)
+        substring.sort(key=ordinal)
+        return prefix + substring
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多设备会话同步 - 同一场地的多台平板订阅会话中心的同一个会话，共享选中的场景、音量滑块等界面状态
+会话中心同时转发控制系统状态（只有会话中心轮询控制系统），各平板无需各自轮询 /api/status
+
+WebSocket ws://会话中心/session/<会话名>，消息为紧凑JSON：
+    平板 -> 会话中心
+        {"t":"hello","c":设备ID,"s":最后收到的序号或null}    连接后发送，会话中心补发缺失的增量或发送快照
+        {"t":"set","i":操作序号,"c":{字段:值}}               本地修改（同一字段快速变化时按频率限制合并）
+        {"t":"resync"}                                       请求快照
+    会话中心 -> 平板
+        {"t":"snap","s":序号,"st":{全部字段},"i":本设备最后处理的操作序号}   快照
+        {"t":"d","s":序号,"c":{变化的字段},"o":来源设备,"i":操作序号}   增量，序号连续递增
+        {"t":"ack","i":操作序号}                             修改未引起变化（值相同）时只回复来源设备
+收到的增量序号不连续时丢弃后续增量并请求快照
+
+本地修改尚未被会话中心回显之前，其他设备对同一字段的修改不会覆盖本地显示（会话中心按顺序处理，
+本地修改在其后生效）；字段 status 为会话中心转发的控制系统状态，收到时作为状态更新通知连接管理器。
+连接会话中心期间，收到的快照、增量和确认作为链路正常的证据报告给连接管理器，暂停其 /api/status 心跳探测
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+SESSION_PORT = 8083
+
+# 会话字段
+SESSION_SELECTED_SCENE = 'selected_scene'
+SESSION_VOLUME = 'volume'
+SESSION_STATUS = 'status'
+
+
+def encode_message(message):
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':'))
+
+
+class SessionSync:
+    """会话同步客户端（后台线程）"""
+
+    CONFIG_FILE = 'session.json'
+
+    def __init__(self, host, port=SESSION_PORT, session='default', client_id=None, manager=None,
+                 ui_scheduler=None, on_change=None, max_rate=20.0, min_backoff=0.5, max_backoff=10.0):
+        self.host = host
+        self.port = port
+        self.session = session
+        self.client_id = client_id or uuid.uuid4().hex[:8]
+        # 收到控制系统状态时通过manager.notify_status_change通知，会话中心的流量通过manager.report_alive报告
+        self.manager = manager
+        # ui_scheduler(func, *args) 负责把回调投递回界面线程
+        self.ui_scheduler = ui_scheduler
+        # on_change(字段, 值) 其他设备修改或会话快照使本地显示变化时调用
+        self.on_change = on_change
+        # 每个字段的最高发送频率
+        self.min_interval = 1.0 / max_rate
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self.cond = threading.Condition()
+        # 会话中心确认的状态和最后收到的序号
+        self.state = {}
+        self.seq = None
+        # 等待快照期间丢弃增量
+        self.resyncing = False
+        # 本地显示的值
+        self.shown = {}
+        # 尚未发送的本地修改
+        self.pending = {}
+        # 字段 -> 最近一次包含该字段的发送操作序号（未被回显前本地值优先）
+        self.in_flight = {}
+        self.op_seq = 0
+        self.last_flush = 0.0
+
+        # 统计
+        self.messages_in = 0
+        self.bytes_in = 0
+        self.messages_out = 0
+        self.gaps = 0
+        self.snapshots = 0
+
+        self.app = None
+        self.connected = False
+        self.running = False
+        self.thread = None
+        self.sender = None
+        self.wakeup = threading.Event()
+
+    @classmethod
+    def load(cls, data_dir, **kwargs):
+        """从本地 session.json 读取会话中心配置（host、port、session），没有配置时返回None"""
+        path = os.path.join(data_dir, cls.CONFIG_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取会话配置失败: {e}")
+            return None
+        return cls(config['host'], config.get('port', SESSION_PORT), config.get('session', 'default'), **kwargs)
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/session/{self.session}"
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.wakeup.clear()
+        self.thread = threading.Thread(target=self._run, name='session-sync', daemon=True)
+        self.thread.start()
+        self.sender = threading.Thread(target=self._send_loop, name='session-send', daemon=True)
+        self.sender.start()
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        self.wakeup.set()
+        with self.cond:
+            self.cond.notify_all()
+        self._close_socket()
+        for thread in (self.thread, self.sender):
+            if thread is not None:
+                thread.join(timeout)
+        self.thread = self.sender = None
+        self._set_relay(False)
+
+    def get(self, field, default=None):
+        """本地显示的值"""
+        with self.cond:
+            return self.shown.get(field, default)
+
+    def publish(self, field, value):
+        """本地修改字段，按频率限制发送到会话中心"""
+        with self.cond:
+            self.shown[field] = value
+            self.pending[field] = value
+            self.cond.notify()
+
+    def _send_loop(self):
+        """合并发送本地修改，两次发送至少间隔min_interval"""
+        while True:
+            with self.cond:
+                while self.running and not (self.pending and self.connected):
+                    self.cond.wait()
+                if not self.running:
+                    return
+                wait = self.last_flush + self.min_interval - time.monotonic()
+                if wait > 0:
+                    self.cond.wait(wait)
+                    continue
+                changes, self.pending = self.pending, {}
+                self.op_seq += 1
+                op = self.op_seq
+                for field in changes:
+                    self.in_flight[field] = op
+                self.last_flush = time.monotonic()
+            if not self._send({'t': 'set', 'i': op, 'c': changes}):
+                # 发送失败，重连后重新发送
+                with self.cond:
+                    for field, value in changes.items():
+                        self.pending.setdefault(field, value)
+
+    def _send(self, message):
+        app = self.app
+        if app is None:
+            return False
+        try:
+            app.send(encode_message(message))
+        except Exception as e:
+            print(f"会话消息发送失败: {e}")
+            return False
+        self.messages_out += 1
+        return True
+
+    def _close_socket(self):
+        app = self.app
+        if app is not None:
+            try:
+                app.close()
+            except Exception as e:
+                print(f"关闭会话连接错误: {e}")
+
+    def _run(self):
+        # websocket客户端只在启用会话同步时才导入
+        import websocket
+
+        backoff = self.min_backoff
+        while self.running:
+            opened_at = time.monotonic()
+            self.app = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_close=self._on_close,
+                on_error=self._on_error
+            )
+            try:
+                self.app.run_forever(ping_interval=10, ping_timeout=5)
+            except Exception as e:
+                print(f"会话连接错误: {e}")
+            self.app = None
+            self._set_relay(False)
+            with self.cond:
+                self.connected = False
+                # 未回显的修改重连后重新发送
+                for field, op in self.in_flight.items():
+                    self.pending.setdefault(field, self.shown.get(field))
+                self.in_flight.clear()
+
+            if not self.running:
+                break
+            if time.monotonic() - opened_at > self.max_backoff:
+                backoff = self.min_backoff
+            delay = random.uniform(self.min_backoff, backoff)
+            backoff = min(self.max_backoff, backoff * 2)
+            self.wakeup.wait(delay)
+
+    def _on_open(self, app):
+        with self.cond:
+            seq = None if self.resyncing else self.seq
+        # 带上最后收到的序号，会话中心只补发缺失的增量
+        self._send({'t': 'hello', 'c': self.client_id, 's': seq})
+        self._set_relay(True)
+        if self.manager is not None:
+            self.manager.report_alive()
+        with self.cond:
+            self.connected = True
+            self.cond.notify_all()
+
+    def _on_close(self, app, status_code, message):
+        with self.cond:
+            self.connected = False
+
+    def _on_error(self, app, error):
+        print(f"会话连接错误: {error}")
+
+    def _on_message(self, app, message):
+        self.messages_in += 1
+        self.bytes_in += len(message)
+        try:
+            event = json.loads(message)
+        except ValueError:
+            print(f"会话消息格式错误: {message[:80]}")
+            return
+        if not isinstance(event, dict):
+            print(f"会话消息格式错误: {message[:80]}")
+            return
+
+        kind = event.get('t')
+        if kind in ('snap', 'd', 'ack') and self.manager is not None:
+            self.manager.report_alive()
+        if kind == 'snap':
+            self._apply_snapshot(event.get('s'), event.get('st') or {}, event.get('i'))
+        elif kind == 'd':
+            self._apply_delta(event)
+        elif kind == 'ack':
+            with self.cond:
+                changed = self._refresh(self._clear_in_flight(event.get('i')))
+            self._notify(changed)
+
+    def _apply_snapshot(self, seq, state, op=None):
+        """快照带回会话中心处理过的本设备最后操作序号"""
+        with self.cond:
+            self.snapshots += 1
+            self.seq = seq
+            self.resyncing = False
+            self.state = dict(state)
+            fields = set(state)
+            fields.update(self._clear_in_flight(op))
+            changed = self._refresh(fields)
+        self._notify(changed)
+
+    def _apply_delta(self, event):
+        seq = event.get('s')
+        with self.cond:
+            if self.resyncing or self.seq is None:
+                return
+            valid = isinstance(seq, int) and not isinstance(seq, bool)
+            if valid and seq <= self.seq:
+                # 重复的增量
+                return
+            if not valid or seq != self.seq + 1:
+                # 中间有增量丢失或序号无效，请求快照
+                self.gaps += 1
+                self.resyncing = True
+                resync = True
+            else:
+                resync = False
+                self.seq = seq
+                changes = event.get('c') or {}
+                self.state.update(changes)
+                fields = set(changes)
+                if event.get('o') == self.client_id:
+                    fields.update(self._clear_in_flight(event.get('i')))
+                changed = self._refresh(fields)
+        if resync:
+            self._send({'t': 'resync'})
+            return
+        self._notify(changed)
+
+    def _set_relay(self, active):
+        if self.manager is not None:
+            self.manager.set_health_relay(active)
+
+    def _clear_in_flight(self, op):
+        """会话中心按顺序处理，序号不大于op的本地修改都已生效，返回这些字段（调用时已持有锁）"""
+        if op is None:
+            return []
+        done = [field for field, sent in self.in_flight.items() if sent <= op]
+        for field in done:
+            del self.in_flight[field]
+        return done
+
+    def _refresh(self, fields):
+        """按会话状态更新本地显示，返回显示变化的字段（调用时已持有锁）"""
+        changed = []
+        for field in fields:
+            if field in self.pending or field in self.in_flight:
+                # 本地修改尚未生效，保持本地值
+                continue
+            value = self.state.get(field)
+            if field not in self.shown or self.shown[field] != value:
+                self.shown[field] = value
+                changed.append((field, value))
+        return changed
+
+    def _notify(self, changed):
+        for field, value in changed:
+            if field == SESSION_STATUS and self.manager is not None:
+                self.manager.notify_status_change({'type': 'status', 'data': value, 'source': 'session'})
+                continue
+            if self.on_change is None:
+                continue
+            if self.ui_scheduler:
+                self.ui_scheduler(self.on_change, field, value)
+            else:
+                try:
+                    self.on_change(field, value)
+                except Exception as e:
+                    print(f"会话回调错误: {e}")
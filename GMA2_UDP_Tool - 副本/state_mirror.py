@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+控制系统状态本地镜像 - 当前场景、音量、灯光预设
+发送命令时立即把预期结果叠加到本地状态（乐观更新），界面直接读本地状态，无需等待往返
+
+    已确认状态  最近一次推送/轮询的状态及其版本号（控制系统每次状态变化版本加一）
+    待定操作    已发出、尚未被已确认状态包含的命令，按本地序号依次叠加在已确认状态上
+
+版本向量（控制系统版本, 本地操作序号）：
+    版本号小于已确认版本的状态（晚到的轮询结果）直接丢弃
+    命令应答带回执行后的版本号，已确认版本达到该版本时该操作已包含在状态中，从待定中移除
+    命令被拒绝或发送失败时移除该操作，本地状态回滚到已确认状态 + 其余待定操作
+    控制系统不返回版本号时，应答成功即把操作合并到已确认状态（后到的状态覆盖）
+结果写入StateStore（CURRENT_SCENE、VOLUME、LIGHTS），值变化时通知界面
+界面命令、命令宏（apply_batch）和时间线提示（begin/resolve）都经过镜像
+"""
+
+import threading
+import time
+
+from state_store import CURRENT_SCENE, LIGHTS, VOLUME
+
+# 镜像字段 -> StateStore状态键
+MIRROR_FIELDS = {
+    'current_scene': CURRENT_SCENE,
+    'volume': VOLUME,
+    'lights': LIGHTS,
+}
+
+# 命令 -> 对控制系统状态的预期影响
+COMMAND_EFFECTS = {
+    'play_scene': lambda data: {'current_scene': data.get('scene_name')},
+    'stop_scene': lambda data: {'current_scene': None},
+    'set_volume': lambda data: {'volume': data.get('volume')},
+    'lights_control': lambda data: {'lights': data.get('action')},
+}
+
+
+class PendingOp:
+    """一个已乐观应用、尚未确认的命令"""
+
+    def __init__(self, seq, command, data, changes, key=None):
+        self.seq = seq
+        self.command = command
+        self.data = data
+        self.changes = changes
+        # 连续参数的键和通道序号
+        self.key = key
+        self.channel_seq = None
+        # 应答带回的控制系统版本，None表示尚未应答
+        self.acked_version = None
+        self.created = time.monotonic()
+
+
+class StateMirror:
+    """控制系统状态本地镜像"""
+
+    def __init__(self, manager, store, on_rollback=None, pending_timeout=10.0):
+        self.manager = manager
+        self.store = store
+        # on_rollback(命令, 数据) 乐观更新被撤销时调用（在应答所在线程中）
+        self.on_rollback = on_rollback
+        # 超过该时间（秒）仍未应答的操作在下次收到状态时丢弃
+        self.pending_timeout = pending_timeout
+
+        self.lock = threading.Lock()
+        # 保证按计算顺序写入StateStore，较旧的结果不会覆盖较新的
+        self.publish_lock = threading.Lock()
+        self.confirmed = {field: None for field in MIRROR_FIELDS}
+        self.server_version = None
+        self.local_seq = 0
+        # 本地序号 -> PendingOp，按序号递增
+        self.pending = {}
+        # 连续参数键 -> 最新的待定操作
+        self.continuous_ops = {}
+        # 丢弃的过期状态数、回滚次数
+        self.stale = 0
+        self.rollbacks = 0
+
+        manager.add_status_callback(self.on_status_change)
+        manager.continuous.add_listener(self.on_continuous_result)
+
+    def get(self, field):
+        """本地状态（已确认 + 待定操作）"""
+        with self.lock:
+            return self._view().get(field)
+
+    def snapshot(self):
+        with self.lock:
+            return self._view()
+
+    def version(self):
+        """版本向量 (控制系统版本, 本地操作序号)"""
+        with self.lock:
+            return self.server_version, self.local_seq
+
+    def pending_count(self):
+        with self.lock:
+            return len(self.pending)
+
+    def reset(self):
+        """清空镜像（退出登录或切换控制系统）"""
+        with self.lock:
+            self.confirmed = {field: None for field in MIRROR_FIELDS}
+            self.server_version = None
+            self.pending.clear()
+            self.continuous_ops.clear()
+        self._publish()
+
+    def begin(self, command, data=None, key=None):
+        """乐观应用命令，返回待定操作；命令不影响镜像状态时返回None"""
+        effect = COMMAND_EFFECTS.get(command)
+        if effect is None:
+            return None
+        data = data or {}
+        with self.lock:
+            self.local_seq += 1
+            op = PendingOp(self.local_seq, command, data, effect(data), key)
+            self.pending[op.seq] = op
+            if key is not None:
+                # 连续参数只保留最新值，被覆盖的值不会再单独确认
+                previous = self.continuous_ops.pop(key, None)
+                if previous is not None and previous.acked_version is None:
+                    self.pending.pop(previous.seq, None)
+                self.continuous_ops[key] = op
+        self._publish()
+        return op
+
+    def resolve(self, op, result):
+        """命令应答：成功时记录版本（或直接确认），失败时回滚"""
+        if op is None:
+            return
+        rolled_back = False
+        with self.lock:
+            if op.seq not in self.pending:
+                return
+            if not result:
+                del self.pending[op.seq]
+                rolled_back = True
+                self.rollbacks += 1
+            else:
+                version = result.get('version') if isinstance(result, dict) else None
+                if version is None:
+                    # 控制系统不提供版本：以应答为准，合并到已确认状态
+                    self.confirmed.update(op.changes)
+                    del self.pending[op.seq]
+                elif self.server_version is not None and version <= self.server_version:
+                    # 已确认状态已包含该操作（推送先于应答到达）
+                    del self.pending[op.seq]
+                else:
+                    op.acked_version = version
+            if op.key is not None and self.continuous_ops.get(op.key) is op and op.seq not in self.pending:
+                del self.continuous_ops[op.key]
+        self._publish()
+        if rolled_back and self.on_rollback is not None:
+            try:
+                self.on_rollback(op.command, op.data)
+            except Exception as e:
+                print(f"回滚回调错误: {e}")
+
+    def apply(self, command, data=None, callback=None, lane=None):
+        """乐观应用并异步发送命令，callback(result)在界面线程中调用"""
+        op = self.begin(command, data)
+
+        def on_result(result):
+            self.resolve(op, result)
+            if callback is not None:
+                callback(result)
+
+        return self.manager.send_command_async(command, data, callback=on_result, lane=lane)
+
+    def apply_batch(self, commands, callback=None, atomic=False):
+        """乐观应用一批命令并异步批量发送，按每条命令的结果确认或回滚，callback(results)在界面线程中调用"""
+        commands = list(commands)
+        ops = [self.begin(command, data) for command, data in commands]
+
+        def on_results(results):
+            results = list(results or [])
+            results += [None] * (len(ops) - len(results))
+            for op, result in zip(ops, results):
+                self.resolve(op, result)
+            if callback is not None:
+                callback(results)
+
+        return self.manager.send_batch_async(commands, on_results, atomic=atomic)
+
+    def apply_continuous(self, key, command, data):
+        """乐观应用连续参数（如音量），经合并通道发送"""
+        op = self.begin(command, data, key=key)
+        # 持有锁直到记下通道序号，发送结果回调不会早于此处理
+        with self.lock:
+            seq = self.manager.send_continuous(key, command, data)
+            if op is not None:
+                op.channel_seq = seq
+        return seq
+
+    def on_continuous_result(self, key, seq, data, result):
+        """合并通道的发送结果，只处理该键最新值的结果"""
+        with self.lock:
+            op = self.continuous_ops.get(key)
+            if op is None or op.channel_seq != seq:
+                return
+        self.resolve(op, result)
+
+    def on_status_change(self, status):
+        if not isinstance(status, dict) or status.get('type') != 'status':
+            return
+        self.reconcile(status.get('data') or {})
+
+    def reconcile(self, data):
+        """用控制系统报告的状态更新已确认状态，移除已包含的待定操作"""
+        version = data.get('version')
+        now = time.monotonic()
+        expired = []
+        with self.lock:
+            if version is not None and self.server_version is not None and version < self.server_version:
+                # 晚到的旧状态
+                self.stale += 1
+                return
+            for field in MIRROR_FIELDS:
+                if field in data:
+                    self.confirmed[field] = data[field]
+            if version is not None:
+                self.server_version = version
+            for seq, op in list(self.pending.items()):
+                if op.acked_version is not None:
+                    if version is None or op.acked_version <= version:
+                        del self.pending[seq]
+                elif now - op.created > self.pending_timeout:
+                    # 长时间没有应答（如关键命令清空了通道），放弃乐观值
+                    del self.pending[seq]
+                    expired.append(op)
+            for key, op in list(self.continuous_ops.items()):
+                if op.seq not in self.pending:
+                    del self.continuous_ops[key]
+            self.rollbacks += len(expired)
+        self._publish()
+        if self.on_rollback is not None:
+            for op in expired:
+                try:
+                    self.on_rollback(op.command, op.data)
+                except Exception as e:
+                    print(f"回滚回调错误: {e}")
+
+    def _view(self):
+        """已确认状态叠加待定操作（调用时已持有锁）"""
+        view = dict(self.confirmed)
+        for seq in sorted(self.pending):
+            view.update(self.pending[seq].changes)
+        return view
+
+    def _publish(self):
+        with self.publish_lock:
+            with self.lock:
+                view = self._view()
+            for field, key in MIRROR_FIELDS.items():
+                self.store.set(key, view[field])
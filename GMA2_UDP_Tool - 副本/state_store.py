@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+界面状态存储 - 连接状态、当前用户、当前场景、音量等共享状态
+值真正变化时才通知订阅者，界面只在状态变化时重绘，不再定时轮询
+连接状态来自ConnectionManager.notify_status_change，控制系统状态（场景、音量、灯光）由StateMirror写入
+"""
+
+import threading
+
+# 状态键
+CONNECTION = 'connection'
+USER = 'user'
+CURRENT_SCENE = 'current_scene'
+VOLUME = 'volume'
+# 当前灯光预设
+LIGHTS = 'lights'
+# 选中场景的预备状态 (状态, 场景名)，见 scene_arm
+SCENE_ARM = 'scene_arm'
+
+# 连接状态取值，disconnected以外的状态由健康监测给出，见 health
+CONNECTION_STATES = frozenset(['disconnected', 'connected', 'degraded', 'reconnecting', 'offline'])
+
+
+class StateStore:
+    """可订阅的状态存储"""
+
+    def __init__(self, ui_scheduler=None, **initial):
+        # ui_scheduler(func, *args) 负责把通知投递回界面线程，None表示直接调用
+        self.ui_scheduler = ui_scheduler
+        self.lock = threading.Lock()
+        self.values = {
+            CONNECTION: 'disconnected', USER: None, CURRENT_SCENE: None, VOLUME: None, LIGHTS: None, SCENE_ARM: None
+        }
+        self.values.update(initial)
+        # 状态键 -> [callback(value)]
+        self.subscribers = {}
+
+    def get(self, key, default=None):
+        with self.lock:
+            return self.values.get(key, default)
+
+    def set(self, key, value):
+        """更新状态，值变化时通知订阅者，返回是否变化"""
+        with self.lock:
+            if key in self.values and self.values[key] == value:
+                return False
+            self.values[key] = value
+            callbacks = list(self.subscribers.get(key, ()))
+
+        for callback in callbacks:
+            self._deliver(callback, value)
+        return True
+
+    def update(self, **values):
+        for key, value in values.items():
+            self.set(key, value)
+
+    def subscribe(self, key, callback, immediate=True):
+        """订阅状态变化，immediate=True时立即用当前值调用一次"""
+        with self.lock:
+            self.subscribers.setdefault(key, []).append(callback)
+            value = self.values.get(key)
+        if immediate:
+            callback(value)
+
+    def unsubscribe(self, key, callback):
+        with self.lock:
+            callbacks = self.subscribers.get(key, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def _deliver(self, callback, value):
+        if self.ui_scheduler:
+            self.ui_scheduler(callback, value)
+        else:
+            try:
+                callback(value)
+            except Exception as e:
+                print(f"状态回调错误: {e}")
+
+    def attach(self, manager):
+        """从连接管理器的状态通知中更新连接状态"""
+        manager.add_status_callback(self.on_status_change)
+
+    def on_status_change(self, status):
+        if isinstance(status, str) and status in CONNECTION_STATES:
+            self.set(CONNECTION, status)
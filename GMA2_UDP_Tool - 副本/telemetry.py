@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行监控数据 - 固定容量的环形缓冲区（基于array，不为每个样本创建对象）
+命令结果和状态更新先累计到当前采样窗口，监控界面每帧调用tick()写入一个样本
+不依赖Kivy，可在无界面环境中使用
+"""
+
+import threading
+from array import array
+
+from health import ONLINE_STATES
+
+
+class RingBuffer:
+    """定长浮点环形缓冲区，写满后覆盖最旧的样本"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = array('d', bytes(8 * capacity))
+        # 下一个写入位置
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def latest(self, default=0.0):
+        if not self.count:
+            return default
+        return self.data[self.head - 1]
+
+    def bounds(self):
+        """当前样本的(最小值, 最大值)"""
+        if not self.count:
+            return 0.0, 0.0
+        if self.count < self.capacity:
+            values = self.data[:self.count]
+        else:
+            values = self.data
+        return min(values), max(values)
+
+
+def sparkline_points(buffer, points, x, y, width, height, lo=None, hi=None):
+    """把缓冲区样本按时间顺序换算成折线坐标，原地写入预分配的points（长度为2*容量）
+    未写满时最左侧用最旧的样本补齐，保证折线点数固定"""
+    capacity = buffer.capacity
+    if lo is None or hi is None:
+        low, high = buffer.bounds()
+        lo = low if lo is None else lo
+        hi = high if hi is None else hi
+    scale = height / ((hi - lo) or 1.0)
+    x_step = width / (capacity - 1) if capacity > 1 else 0.0
+
+    data = buffer.data
+    count = buffer.count
+    if count == capacity:
+        # 从最旧的样本开始
+        ordered = data[buffer.head:] + data[:buffer.head]
+    elif count:
+        ordered = array('d', [data[0]]) * (capacity - count) + data[:count]
+    else:
+        ordered = array('d', [lo]) * capacity
+
+    base = y - lo * scale
+    points[0::2] = [x + i * x_step for i in range(capacity)]
+    points[1::2] = [base + (lo if v < lo else hi if v > hi else v) * scale for v in ordered]
+    return points
+
+
+class Telemetry:
+    """控制系统运行指标：命令延迟、错误率、连接状态、设备在线数"""
+
+    SERIES = ('latency_ms', 'error_rate', 'connected', 'devices_online')
+
+    def __init__(self, capacity=200, error_smoothing=0.2):
+        self.capacity = capacity
+        self.series = {name: RingBuffer(capacity) for name in self.SERIES}
+        # 错误率的指数平滑系数
+        self.error_smoothing = error_smoothing
+
+        # 当前采样窗口（命令结果来自工作线程，需要加锁）
+        self.lock = threading.Lock()
+        self.window_count = 0
+        self.window_errors = 0
+        self.window_latency = 0.0
+
+        self.latency_ms = 0.0
+        self.error_rate = 0.0
+        self.connected = False
+        # 设备名称 -> 状态文本
+        self.devices = {}
+        self.devices_online = 0
+
+    def record_command(self, command, elapsed, result):
+        """记录一次命令结果（可在任意线程调用）"""
+        with self.lock:
+            self.window_count += 1
+            self.window_latency += elapsed
+            if result is None:
+                self.window_errors += 1
+
+    def record_status(self, status):
+        """记录连接状态或状态更新（notify_status_change的参数）"""
+        if isinstance(status, str):
+            self.connected = status in ONLINE_STATES
+        elif isinstance(status, dict) and status.get('type') == 'status':
+            devices = (status.get('data') or {}).get('devices')
+            if isinstance(devices, dict):
+                self.devices = devices
+                self.devices_online = sum(1 for state in devices.values() if state in ('online', 'ok', True))
+
+    def tick(self):
+        """结束当前采样窗口，每个指标写入一个样本"""
+        with self.lock:
+            count, errors, latency = self.window_count, self.window_errors, self.window_latency
+            self.window_count = self.window_errors = 0
+            self.window_latency = 0.0
+
+        if count:
+            # 窗口内没有命令时保持上一个值
+            self.latency_ms = latency / count * 1000
+            rate = errors / count
+            self.error_rate += self.error_smoothing * (rate - self.error_rate)
+
+        series = self.series
+        series['latency_ms'].append(self.latency_ms)
+        series['error_rate'].append(self.error_rate)
+        series['connected'].append(1.0 if self.connected else 0.0)
+        series['devices_online'].append(self.devices_online)
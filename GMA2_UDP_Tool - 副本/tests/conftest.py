@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""测试公共设置：应用模块和 benchmarks 中的模拟控制系统可直接导入"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KCFG_KIVY_LOG_LEVEL', 'warning')
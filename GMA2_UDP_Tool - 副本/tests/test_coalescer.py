@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""连续参数合并发送"""
+
+import threading
+import time
+
+from coalescer import CoalescingChannel
+from connection_manager import ConnectionManager
+from stub_server import StubController
+
+
+class RecordingSender:
+    """记录发送内容，可用gate阻塞发送以便在发送期间提交新值"""
+
+    def __init__(self, result=None):
+        self.calls = []
+        self.result = {'success': True} if result is None else result
+        self.gate = None
+        self.entered = threading.Event()
+
+    def __call__(self, command, data):
+        self.calls.append((command, data))
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait(2)
+        return self.result
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_latest_value_wins():
+    sender = RecordingSender()
+    sender.gate = threading.Event()
+    channel = CoalescingChannel(sender, max_rate=1000)
+    channel.update('volume', 'set_volume', {'volume': 1})
+    assert sender.entered.wait(1)
+    # 第一个值发送期间连续提交，只有最后一个会被发送
+    for volume in range(2, 10):
+        channel.update('volume', 'set_volume', {'volume': volume})
+    sender.gate.set()
+    assert wait_until(lambda: channel.value('volume') == {'volume': 9})
+    channel.stop()
+    assert [data['volume'] for _, data in sender.calls] == [1, 9]
+    assert [data['seq'] for _, data in sender.calls] == [1, 9]
+
+
+def test_clear_drops_pending_values():
+    sender = RecordingSender()
+    sender.gate = threading.Event()
+    channel = CoalescingChannel(sender, max_rate=1000)
+    channel.update('volume', 'set_volume', {'volume': 1})
+    assert sender.entered.wait(1)
+    channel.update('volume', 'set_volume', {'volume': 50})
+    channel.update('fader', 'set_fader', {'level': 3})
+    # 关键命令到达时清空尚未发送的值
+    channel.clear()
+    sender.gate.set()
+    assert wait_until(lambda: channel.value('volume') == {'volume': 1})
+    time.sleep(0.05)
+    channel.stop()
+    assert sender.calls == [('set_volume', {'volume': 1, 'seq': 1})]
+
+
+def test_listener_acks():
+    sender = RecordingSender()
+    channel = CoalescingChannel(sender, max_rate=1000)
+    events = []
+    channel.add_listener(lambda key, seq, data, result: events.append((key, seq, data, result)))
+
+    channel.update('volume', 'set_volume', {'volume': 5})
+    assert wait_until(lambda: len(events) == 1)
+    # 与已确认值相同的更新不再发送，直接以True确认
+    channel.update('volume', 'set_volume', {'volume': 5})
+    assert wait_until(lambda: len(events) == 2)
+    channel.stop()
+    assert events == [
+        ('volume', 1, {'volume': 5}, {'success': True}),
+        ('volume', 2, {'volume': 5}, True),
+    ]
+    assert len(sender.calls) == 1
+
+
+def test_failed_send_is_not_acked():
+    channel = CoalescingChannel(lambda command, data: None, max_rate=1000)
+    events = []
+    channel.add_listener(lambda key, seq, data, result: events.append(result))
+    channel.update('volume', 'set_volume', {'volume': 5})
+    assert wait_until(lambda: events)
+    channel.stop()
+    assert events == [None]
+    assert channel.value('volume') is None
+
+
+def test_slider_drag_against_stub():
+    rate = 10.0
+    duration = 1.0
+    events = 100
+    with StubController(latency=0.01) as stub:
+        manager = ConnectionManager(continuous_rate=rate)
+        manager.set_server_address(stub.host, stub.port)
+        start = time.monotonic()
+        for i in range(events):
+            manager.send_continuous('volume', 'set_volume', {'volume': round(100 * i / (events - 1))})
+            time.sleep(duration / events)
+        assert wait_until(lambda: manager.continuous.value('volume') == {'volume': 100})
+        elapsed = time.monotonic() - start
+        manager.close()
+
+    bodies = [body['data'] for _, path, body in stub.requests if path == '/api/command']
+    sequences = [data['seq'] for data in bodies]
+    assert len(bodies) <= rate * elapsed + 1
+    assert bodies[-1]['volume'] == 100
+    assert all(a < b for a, b in zip(sequences, sequences[1:]))
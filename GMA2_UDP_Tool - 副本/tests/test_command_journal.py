@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""离线命令日志和重发"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from command_journal import CommandJournal, JournalReplayer
+from connection_manager import ConnectionManager
+from stub_server import StubController
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'command_journal.log')
+
+
+def read_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_append_and_complete(journal_path):
+    journal = CommandJournal(journal_path)
+    first = journal.append('lights_control', {'action': 'full'})
+    second = journal.append('emergency_stop')
+    assert [record['id'] for record in journal.entries()] == [first, second]
+    assert journal.entries()[1]['critical'] is True
+
+    journal.complete(first)
+    journal.sync()
+    assert [record['id'] for record in journal.entries()] == [second]
+    assert read_lines(journal_path)[-1] == {'done': first, 'result': 'sent'}
+    # 重复完成不再写入
+    journal.complete(first)
+    journal.sync()
+    assert len(read_lines(journal_path)) == 3
+    journal.close()
+
+
+def test_compact_when_all_done(journal_path):
+    journal = CommandJournal(journal_path)
+    request_id = journal.append('set_volume', {'volume': 10})
+    journal.complete(request_id, 'rejected')
+    journal.close()
+    assert os.path.getsize(journal_path) == 0
+    assert CommandJournal(journal_path).entries() == []
+
+
+def test_supersede_same_group(journal_path):
+    journal = CommandJournal(journal_path)
+    lights = journal.append('lights_control', {'action': 'red'})
+    scene = journal.append('play_scene', {'scene_name': 'A'})
+    volume = journal.append('set_volume', {'volume': 5})
+
+    assert journal.supersede('stop_scene') == 1
+    assert [record['id'] for record in journal.entries()] == [lights, volume]
+    assert journal.supersede('lights_control') == 1
+    assert journal.supersede('lights_control') == 0
+    journal.sync()
+    done = [line for line in read_lines(journal_path) if 'done' in line]
+    assert done == [{'done': scene, 'result': 'superseded'}, {'done': lights, 'result': 'superseded'}]
+
+    # 关键命令覆盖全部，日志清空
+    assert journal.supersede('emergency_stop') == 1
+    assert journal.entries() == []
+    journal.close()
+    assert os.path.getsize(journal_path) == 0
+
+
+def test_reload_with_truncated_last_line(journal_path):
+    journal = CommandJournal(journal_path)
+    kept = journal.append('lights_control', {'action': 'dim'})
+    done = journal.append('play_scene', {'scene_name': 'A'})
+    journal.complete(done)
+    journal.close()
+    # 模拟写入最后一行时崩溃
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"id":"partial","ts":1,"comm')
+
+    reloaded = CommandJournal(journal_path)
+    assert [record['id'] for record in reloaded.entries()] == [kept]
+    # 之后追加的记录仍可正常读取
+    reloaded.append('set_volume', {'volume': 1})
+    reloaded.close()
+    assert len(CommandJournal(journal_path).entries()) == 2
+
+
+class FakeTransport:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, command, data, request_id):
+        self.sent.append(command)
+        return {'success': True}
+
+
+class FakeManager:
+    def __init__(self):
+        self.transport = FakeTransport()
+
+    def route_command(self, command):
+        return self.transport
+
+
+def test_replay_age_limits(journal_path):
+    journal = CommandJournal(journal_path)
+    stale_stop = journal.append('emergency_stop')
+    stale_reset = journal.append('system_reset')
+    stale_lights = journal.append('lights_control', {'action': 'full'})
+    journal.append('play_scene', {'scene_name': 'A'})
+    journal.append('system_reset')
+    for record in journal.entries():
+        if record['id'] in (stale_stop, stale_reset):
+            record['ts'] -= 3
+        elif record['id'] == stale_lights:
+            record['ts'] -= 120
+
+    manager = FakeManager()
+    replayer = JournalReplayer(manager, journal, max_age=60.0, critical_max_age=2.0)
+    assert replayer.replay() == 2
+    # 过期的关键命令和普通命令都不重发，未过期的按顺序重发
+    assert manager.transport.sent == ['play_scene', 'system_reset']
+    assert journal.entries() == []
+    journal.close()
+
+
+def test_replay_against_flapping_stub(journal_path):
+    with StubController() as stub:
+        manager = ConnectionManager(max_retries=0)
+        manager.set_server_address(stub.host, stub.port)
+        manager.enable_journal(journal_path)
+
+        running = True
+
+        def flap():
+            while running:
+                stub.offline = not stub.offline
+                if not stub.offline:
+                    manager.test_connection()
+                time.sleep(0.07)
+            stub.offline = False
+
+        flapper = threading.Thread(target=flap, daemon=True)
+        flapper.start()
+        # 每条命令名称不同，互不覆盖，全部都必须送达且只送达一次
+        count = 40
+        for step in range(count):
+            manager.send_command(f'cue_{step}', {'step': step})
+            time.sleep(0.01)
+        running = False
+        flapper.join()
+
+        manager.test_connection()
+        deadline = time.monotonic() + 5
+        while manager.journal.entries() and time.monotonic() < deadline:
+            manager.replayer.trigger()
+            time.sleep(0.05)
+        remaining = manager.journal.entries()
+        manager.close()
+
+    steps = [body['data']['step'] for _, path, body in stub.requests if path == '/api/command']
+    assert remaining == []
+    assert len(steps) == len(set(steps))
+    assert sorted(steps) == list(range(count))
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""命令注册表编码"""
+
+import json
+
+import pytest
+
+from command_registry import COMMAND_SPECS, INT, REGISTRY, STR, encode_json
+
+
+def sample_values(kind):
+    if kind == INT:
+        return [0, 75, -3, 2 ** 31 - 1]
+    if kind == STR:
+        return ['', '开场音乐', 'a"b\\c']
+    return list(kind)
+
+
+def sample_data(spec):
+    """每个字段依次取各个样例值（其余字段取第一个），得到若干组参数"""
+    if not spec.fields:
+        return [{}]
+    samples = []
+    for field, kind in spec.fields:
+        for value in sample_values(kind):
+            data = {other: sample_values(other_kind)[0] for other, other_kind in spec.fields}
+            data[field] = value
+            samples.append(data)
+    return samples
+
+
+def all_samples():
+    for name, *_ in COMMAND_SPECS:
+        spec = REGISTRY.get(name)
+        for data in sample_data(spec):
+            yield name, data
+
+
+@pytest.mark.parametrize('command, data', list(all_samples()))
+def test_json_matches_generic_encoding(command, data):
+    assert json.loads(REGISTRY.encode(command, data)) == {'command': command, 'data': data}
+
+
+@pytest.mark.parametrize('command, data', list(all_samples()))
+def test_binary_round_trip(command, data):
+    body = REGISTRY.encode_binary(command, data)
+    assert body is not None
+    assert REGISTRY.decode_binary(body) == (command, data, None)
+
+
+@pytest.mark.parametrize('command, data', list(all_samples()))
+def test_binary_round_trip_with_request_id(command, data):
+    body = REGISTRY.encode_binary(command, data, request_id='0123456789abcdef0123456789abcdef')
+    assert REGISTRY.decode_binary(body) == (command, data, '0123456789abcdef0123456789abcdef')
+
+
+def test_constant_commands_use_pre_encoded_payload():
+    spec = REGISTRY.get('emergency_stop')
+    assert REGISTRY.encode('emergency_stop') is spec.tail
+    assert REGISTRY.encode('emergency_stop', {}) is spec.tail
+    assert REGISTRY.encode_binary('emergency_stop') is spec.binary_code
+    lights = REGISTRY.get('lights_control')
+    assert REGISTRY.encode('lights_control', {'action': 'red'}) is lights.constants['red']
+
+
+@pytest.mark.parametrize('data', [
+    {'volume': 40},
+    {'volume': 40, 'seq': 0},
+    {'volume': 40, 'seq': 123456},
+])
+def test_optional_seq(data):
+    body = REGISTRY.encode_binary('set_volume', data)
+    # 命令编号 + int32 + 存在位图（+ int32 序号）
+    assert body[5] == (1 if 'seq' in data else 0)
+    assert len(body) == 6 + (4 if 'seq' in data else 0)
+    assert REGISTRY.decode_binary(body) == ('set_volume', data, None)
+    assert json.loads(REGISTRY.encode('set_volume', data))['data'] == data
+
+
+def test_optional_seq_wrong_type_falls_back():
+    data = {'volume': 40, 'seq': '7'}
+    assert REGISTRY.encode_binary('set_volume', data) is None
+    assert REGISTRY.encode('set_volume', data) == encode_json('set_volume', data)
+
+
+def test_unregistered_command_falls_back():
+    data = {'step': 3}
+    assert REGISTRY.encode('cue_fire', data) == encode_json('cue_fire', data)
+    assert REGISTRY.encode_binary('cue_fire', data) is None
+
+
+@pytest.mark.parametrize('command, data', [
+    ('set_volume', {'volume': '40'}),
+    ('set_volume', {'volume': 40.0}),
+    ('set_volume', {'volume': True}),
+    ('set_volume', {'level': 40}),
+    ('set_volume', {'volume': 40, 'fade': 2}),
+    ('set_volume', {}),
+    ('lights_control', {'action': 'purple'}),
+    ('lights_control', {'action': ['full']}),
+    ('lights_control', {'action': 'full', 'fade': 1}),
+    ('play_scene', {'scene_name': 1}),
+    ('arm_scene', {'scene_name': 'A'}),
+    ('pause_scene', {'fade': 1}),
+])
+def test_mismatched_arguments_fall_back(command, data):
+    assert REGISTRY.encode(command, data) == encode_json(command, data)
+    assert REGISTRY.encode_binary(command, data) is None
+
+
+def test_out_of_range_int_falls_back_to_json():
+    data = {'volume': 2 ** 31}
+    assert REGISTRY.encode_binary('set_volume', data) is None
+    assert json.loads(REGISTRY.encode('set_volume', data))['data'] == data
+
+
+@pytest.mark.parametrize('body', [b'', b'\xff', b'\x02\x00', b'\x03\x00\x05ab'])
+def test_decode_malformed(body):
+    assert REGISTRY.decode_binary(body) is None
+
+
+def test_decode_truncated_request_id():
+    body = REGISTRY.encode_binary('go', {'token': 't'}, request_id='abcdef')
+    assert REGISTRY.decode_binary(body[:-2]) is None
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""状态推送消息处理"""
+
+import pytest
+
+from push_channel import PushChannel
+
+
+class FakeManager:
+    def __init__(self):
+        self.last_heartbeat = None
+        self.events = []
+
+    def report_alive(self, rtt=None):
+        pass
+
+    def notify_status_change(self, status):
+        self.events.append(status)
+
+
+@pytest.mark.parametrize('message', ['[1, 2]', '"status"', '42', 'null', '{bad json'])
+def test_malformed_messages_are_logged_and_dropped(message, capsys):
+    manager = FakeManager()
+    PushChannel(manager)._on_message(None, message)
+    assert manager.events == []
+    assert '推送消息格式错误' in capsys.readouterr().out
+
+
+def test_status_events_can_be_filtered():
+    manager = FakeManager()
+    channel = PushChannel(manager)
+    channel._on_message(None, '{"type": "status", "data": {"volume": 5}}')
+    channel.status_events = False
+    channel._on_message(None, '{"type": "status", "data": {"volume": 6}}')
+    channel._on_message(None, '{"type": "scenes", "data": {"removed": []}}')
+    assert [(event['type'], event['data']) for event in manager.events] == [
+        ('status', {'volume': 5}), ('scenes', {'removed': []}),
+    ]
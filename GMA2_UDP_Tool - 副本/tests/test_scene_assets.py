@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""场景缩略图解码和纹理上传"""
+
+import os
+
+import pytest
+
+os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+
+from scene_assets import TextureUploader, decode_thumbnail, image_ext
+from stub_server import make_thumbnail
+
+
+def test_image_ext():
+    assert image_ext(make_thumbnail(1)) == 'png'
+    assert image_ext(b'\xff\xd8\xff\xe0') == 'jpg'
+    assert image_ext(b'GIF89a') == 'gif'
+
+
+def test_decode_in_background_keeps_size():
+    image = decode_thumbnail(make_thumbnail(7, width=64, height=36))
+    assert image.size == (64, 36)
+
+
+def test_decode_invalid_data():
+    with pytest.raises(ValueError):
+        decode_thumbnail(b'\x89PNG not really')
+
+
+def test_uploader_limits_per_frame_and_evicts():
+    frames = []
+    uploader = TextureUploader(lambda func, *args: frames.append((func, args)), per_frame=2, max_textures=3,
+                               create=lambda image: ('texture', image))
+    uploaded, evicted = [], []
+    uploader.on_upload = lambda key, texture: uploaded.append(key)
+    uploader.on_evict = evicted.append
+    for key in range(5):
+        uploader.submit(key, f'image{key}')
+    uploader.touch([4])
+    assert len(frames) == 1
+    # 每帧最多上传两张，可见的优先
+    while frames:
+        func, args = frames.pop(0)
+        func(*args)
+    assert uploaded == [4, 0, 1, 2, 3]
+    assert len(evicted) == 2
+    assert len(uploader.textures) == 3
+    assert uploader.uploaded == 5
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""多设备会话同步协议（hello/snap/d/ack）"""
+
+import json
+import time
+
+import pytest
+
+from connection_manager import ConnectionManager
+from session_hub import StubSessionHub
+from session_sync import SESSION_SELECTED_SCENE, SESSION_VOLUME, SessionSync
+from stub_server import StubController
+
+
+def wait_until(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class FakeManager:
+    """记录会话报告给连接管理器的链路证据"""
+
+    def __init__(self):
+        self.alive = 0
+        self.relay = []
+        self.statuses = []
+
+    def report_alive(self, rtt=None):
+        self.alive += 1
+
+    def set_health_relay(self, active):
+        self.relay.append(active)
+
+    def notify_status_change(self, status):
+        self.statuses.append(status)
+
+
+@pytest.fixture
+def offline_sync():
+    """不连接会话中心，直接喂入会话中心消息"""
+    changes = []
+    sync = SessionSync('127.0.0.1', 9, client_id='me', manager=FakeManager(),
+                       on_change=lambda field, value: changes.append((field, value)))
+    sync.sent = []
+    sync._send = lambda message: sync.sent.append(message) or True
+    sync.changes = changes
+    return sync
+
+
+def feed(sync, message):
+    sync._on_message(None, json.dumps(message))
+
+
+def test_snapshot_then_deltas(offline_sync):
+    sync = offline_sync
+    feed(sync, {'t': 'snap', 's': 3, 'st': {SESSION_VOLUME: 40}})
+    feed(sync, {'t': 'd', 's': 4, 'c': {SESSION_VOLUME: 50}, 'o': 'other', 'i': 1})
+    # 重复的增量被忽略
+    feed(sync, {'t': 'd', 's': 4, 'c': {SESSION_VOLUME: 60}, 'o': 'other', 'i': 1})
+    assert sync.seq == 4
+    assert sync.get(SESSION_VOLUME) == 50
+    assert sync.changes == [(SESSION_VOLUME, 40), (SESSION_VOLUME, 50)]
+    assert sync.manager.alive == 3
+
+
+def test_gap_triggers_resync(offline_sync):
+    sync = offline_sync
+    feed(sync, {'t': 'snap', 's': 1, 'st': {SESSION_VOLUME: 10}})
+    feed(sync, {'t': 'd', 's': 3, 'c': {SESSION_VOLUME: 30}})
+    assert sync.sent == [{'t': 'resync'}]
+    assert sync.gaps == 1
+    # 等待快照期间丢弃增量
+    feed(sync, {'t': 'd', 's': 4, 'c': {SESSION_VOLUME: 40}})
+    assert sync.get(SESSION_VOLUME) == 10
+    feed(sync, {'t': 'snap', 's': 4, 'st': {SESSION_VOLUME: 40}})
+    feed(sync, {'t': 'd', 's': 5, 'c': {SESSION_VOLUME: 50}})
+    assert sync.get(SESSION_VOLUME) == 50
+    assert sync.sent == [{'t': 'resync'}]
+
+
+@pytest.mark.parametrize('seq', [None, '2', 2.0, True])
+def test_invalid_delta_seq_triggers_resync(offline_sync, seq):
+    sync = offline_sync
+    feed(sync, {'t': 'snap', 's': 1, 'st': {SESSION_VOLUME: 10}})
+    feed(sync, {'t': 'd', 's': seq, 'c': {SESSION_VOLUME: 20}})
+    assert sync.sent == [{'t': 'resync'}]
+    assert sync.get(SESSION_VOLUME) == 10
+
+
+def test_local_value_kept_until_echoed(offline_sync):
+    sync = offline_sync
+    feed(sync, {'t': 'snap', 's': 1, 'st': {SESSION_VOLUME: 10}})
+    sync.publish(SESSION_VOLUME, 70)
+    # 模拟发送线程取出修改
+    sync.pending.clear()
+    sync.in_flight[SESSION_VOLUME] = 1
+    # 其他设备的修改不覆盖尚未回显的本地值
+    feed(sync, {'t': 'd', 's': 2, 'c': {SESSION_VOLUME: 20}, 'o': 'other', 'i': 5})
+    assert sync.get(SESSION_VOLUME) == 70
+    # 值未变化时会话中心只回复ack，之后以会话状态为准
+    feed(sync, {'t': 'ack', 'i': 1})
+    assert sync.in_flight == {}
+    assert sync.get(SESSION_VOLUME) == 20
+
+
+def test_malformed_messages_ignored(offline_sync):
+    sync = offline_sync
+    sync._on_message(None, 'not json')
+    sync._on_message(None, '[1, 2]')
+    assert sync.seq is None
+    assert sync.manager.alive == 0
+
+
+def test_two_tablets_through_hub():
+    with StubSessionHub() as hub:
+        first = SessionSync(hub.host, hub.port, 'show', client_id='a', min_backoff=0.05)
+        first.start()
+        assert wait_until(lambda: first.seq is not None)
+        first.publish(SESSION_SELECTED_SCENE, 'scene-2')
+        assert wait_until(lambda: hub.get_session('show').state.get(SESSION_SELECTED_SCENE) == 'scene-2')
+
+        # 后加入的设备通过快照获得状态
+        second = SessionSync(hub.host, hub.port, 'show', client_id='b', min_backoff=0.05)
+        second.start()
+        assert wait_until(lambda: second.get(SESSION_SELECTED_SCENE) == 'scene-2')
+        second.publish(SESSION_VOLUME, 35)
+        assert wait_until(lambda: first.get(SESSION_VOLUME) == 35)
+
+        # 值相同的修改只收到ack
+        first.publish(SESSION_VOLUME, 35)
+        assert wait_until(lambda: not first.in_flight and not first.pending)
+        first.stop()
+        second.stop()
+
+
+def test_hub_drops_resync_to_latest_state():
+    with StubSessionHub(drop_rate=0.3) as hub:
+        sync = SessionSync(hub.host, hub.port, 'show', client_id='a', min_backoff=0.05)
+        sync.start()
+        assert wait_until(lambda: sync.seq is not None and hub.client_count() == 1)
+        session = hub.get_session('show')
+        for volume in range(1, 60):
+            hub.update(session, {SESSION_VOLUME: volume})
+        hub.drop_rate = 0.0
+        hub.update(session, {SESSION_VOLUME: 100})
+        assert wait_until(lambda: sync.get(SESSION_VOLUME) == 100)
+        assert sync.seq == session.seq
+        assert hub.dropped > 0 and sync.gaps > 0
+        sync.stop()
+
+
+def test_session_suspends_health_probes():
+    with StubController() as stub, StubSessionHub() as hub:
+        manager = ConnectionManager()
+        manager.set_server_address(stub.host, stub.port)
+        manager.health.stable_interval = 0.2
+        sync = SessionSync(hub.host, hub.port, 'show', manager=manager, min_backoff=0.05)
+        sync.start()
+        assert wait_until(lambda: manager.health.relayed)
+        manager.start_health()
+        # 会话中心的流量确认链路，不单独探测控制系统
+        assert wait_until(lambda: manager.connected)
+        time.sleep(0.5)
+        assert stub.count('/api/status') == 0
+
+        # 会话断开后恢复探测
+        sync.stop()
+        assert not manager.health.relayed
+        assert wait_until(lambda: stub.count('/api/status') > 0)
+        manager.close()
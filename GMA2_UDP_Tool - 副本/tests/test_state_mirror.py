@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""状态镜像覆盖界面命令、命令宏和时间线"""
+
+import threading
+import time
+
+from connection_manager import ConnectionManager
+from macros import MacroLibrary
+from state_mirror import StateMirror
+from state_store import StateStore
+from stub_server import StubController
+from timeline import TimelinePlayer, parse_cue_list
+
+
+def make_mirror(stub):
+    manager = ConnectionManager()
+    manager.set_server_address(stub.host, stub.port)
+    return manager, StateMirror(manager, StateStore())
+
+
+def test_macro_applies_optimistically_and_rolls_back_rejected():
+    with StubController(latency=0.1) as stub:
+        stub.rejected_commands = {'set_volume'}
+        manager, mirror = make_mirror(stub)
+        library = MacroLibrary()
+        library.define('开场', [('lights_control', {'action': 'red'}), ('set_volume', {'volume': 20})], atomic=False)
+        done = threading.Event()
+        results = []
+
+        def on_results(value):
+            results.extend(value)
+            done.set()
+
+        assert library.run(manager, '开场', on_results, mirror=mirror) is not None
+        # 应答之前本地状态已更新
+        assert mirror.get('lights') == 'red'
+        assert mirror.get('volume') == 20
+        assert done.wait(3)
+        assert results[0] and results[1] is None
+        assert mirror.get('lights') == 'red'
+        assert mirror.get('volume') is None
+        assert mirror.rollbacks == 1
+
+        mirror.reconcile(stub.status())
+        assert mirror.pending_count() == 0
+        assert mirror.get('volume') == 50
+        manager.close()
+
+
+def test_timeline_cues_go_through_mirror():
+    with StubController() as stub:
+        manager, mirror = make_mirror(stub)
+        cues = parse_cue_list('0 lights blue\n+0 volume 30\n0.05 scene 开场音乐')
+        player = TimelinePlayer(manager, cues, lead=0.0, mirror=mirror)
+        player.play()
+        assert player.wait(3)
+        assert mirror.snapshot() == {'lights': 'blue', 'volume': 30, 'current_scene': '开场音乐'}
+        # 应答带回版本号，收到包含该版本的状态后确认
+        mirror.reconcile(stub.status())
+        assert mirror.pending_count() == 0
+        assert mirror.snapshot() == {'lights': 'blue', 'volume': 30, 'current_scene': '开场音乐'}
+        player.close()
+        manager.close()
+
+
+def test_timeline_failed_cue_rolls_back():
+    with StubController() as stub:
+        stub.rejected_commands = {'lights_control'}
+        manager, mirror = make_mirror(stub)
+        player = TimelinePlayer(manager, parse_cue_list('0 lights dim'), lead=0.0, mirror=mirror)
+        player.play()
+        assert player.wait(3)
+        deadline = time.monotonic() + 1
+        while mirror.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert mirror.get('lights') is None
+        assert mirror.rollbacks == 1
+        player.close()
+        manager.close()
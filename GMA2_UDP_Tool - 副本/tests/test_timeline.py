@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""演出时间线：提示表解析和播放控制"""
+
+import threading
+import time
+
+import pytest
+
+from timeline import (
+    TIMELINE_PAUSED, TIMELINE_PLAYING, TIMELINE_STOPPED, TimelinePlayer, format_cue_list, parse_cue_list,
+)
+
+SHOW = """
+# 开场
+0            scene   开场音乐
++5           lights  blue          # 相对上一条
++0.5         volume  60
+01:30        lights  dim
+1:02:00.250  stop
+"""
+
+
+def test_relative_and_absolute_times():
+    cues = parse_cue_list(SHOW)
+    assert [(cue.at, cue.command, cue.data) for cue in cues] == [
+        (0.0, 'play_scene', {'scene_name': '开场音乐'}),
+        (5.0, 'lights_control', {'action': 'blue'}),
+        (5.5, 'set_volume', {'volume': 60}),
+        (90.0, 'lights_control', {'action': 'dim'}),
+        (3720.25, 'stop_scene', {}),
+    ]
+    assert [cue.line for cue in cues] == [3, 4, 5, 6, 7]
+
+
+def test_relative_time_follows_previous_line_and_sorts():
+    cues = parse_cue_list("""
+10    scene  A
++2    lights full
+5     pause
++1    stop
+""")
+    # 相对时间按文件中的上一条计算，之后按时间稳定排序
+    assert [(cue.at, cue.command) for cue in cues] == [
+        (5.0, 'pause_scene'), (6.0, 'stop_scene'), (10.0, 'play_scene'), (12.0, 'lights_control'),
+    ]
+    assert [cue.index for cue in cues] == [0, 1, 2, 3]
+
+
+def test_round_trip_through_format():
+    cues = parse_cue_list(SHOW)
+    again = parse_cue_list(format_cue_list(cues))
+    assert [(cue.at, cue.command, cue.data) for cue in again] == [(cue.at, cue.command, cue.data) for cue in cues]
+
+
+def test_groups_by_timestamp():
+    cues = parse_cue_list("""
+0     scene  A
++0    lights red
++0    volume 30
+1     lights off
+1.0   volume 10
+2     stop
+""")
+    player = TimelinePlayer(FakeManager(), cues)
+    assert [[cue.command for cue in group] for group in player.groups] == [
+        ['play_scene', 'lights_control', 'set_volume'],
+        ['lights_control', 'set_volume'],
+        ['stop_scene'],
+    ]
+
+
+@pytest.mark.parametrize('text, message', [
+    ('0 scene A\nabc scene B', '第2行: 时间格式错误 abc'),
+    ('0 scene A\n\n# 注释\n-1 stop', '第4行: 时间格式错误 -1'),
+    ('1:2:3:4 stop', '第1行: 时间格式错误 1:2:3:4'),
+    ('0 scene A\n5', '第2行: 缺少动作'),
+    ('0 fade 3', '第1行: 未知动作 fade'),
+    ('0 scene A\n1 scene', '第2行: scene 缺少参数'),
+    ('0 volume loud', '第1行: 参数错误 loud'),
+    ('0 lights purple', '第1行: 参数错误 purple'),
+])
+def test_errors_report_line_numbers(text, message):
+    with pytest.raises(ValueError) as error:
+        parse_cue_list(text)
+    assert str(error.value) == message
+
+
+class FakeManager:
+    """记录发送的命令，block时发送阻塞到release"""
+
+    def __init__(self):
+        self.sent = []
+        self.listeners = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def add_critical_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_critical_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def send_command(self, command, data=None, journal=True):
+        self.release.wait(5)
+        self.sent.append(command)
+        return {'success': True}
+
+    def send_batch(self, commands, journal=True):
+        return [self.send_command(command, data) for command, data in commands]
+
+
+def test_pause_keeps_state_when_submit_fails():
+    manager = FakeManager()
+    player = TimelinePlayer(manager, parse_cue_list('100 stop'), lead=0.0)
+    player.play()
+    # 模拟执行器已被并发的停止关闭
+    player.executor.shutdown()
+    assert player.pause() is False
+    assert player.state == TIMELINE_PLAYING
+    player.close()
+
+
+def test_resume_keeps_state_when_submit_fails():
+    manager = FakeManager()
+    player = TimelinePlayer(manager, parse_cue_list('100 stop'), lead=0.0)
+    player.play()
+    assert player.pause() is True
+    player.executor.shutdown()
+    assert player.resume() is False
+    assert player.state == TIMELINE_PAUSED
+    player.close()
+
+
+def test_halt_while_draining_exits_promptly():
+    manager = FakeManager()
+    manager.release.clear()
+    player = TimelinePlayer(manager, parse_cue_list('0 scene A'), lead=0.0)
+    player.play()
+    thread = player.thread
+    # 最后一条提示正在发送（阻塞）时紧急中止，播放线程不等待发送完成
+    deadline = time.monotonic() + 2
+    while player.next_group == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    player.halt()
+    thread.join(player.DRAIN_POLL * 5)
+    assert not thread.is_alive()
+    assert player.state == TIMELINE_STOPPED
+    manager.release.set()
+    player.close()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""传输层批量发送"""
+
+from transports import UdpTransport
+
+
+class FlakySocket:
+    """发出指定数量的数据报后抛出OSError"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.datagrams = []
+
+    def sendto(self, payload, address):
+        if len(self.datagrams) >= self.limit:
+            raise OSError('No buffer space available')
+        self.datagrams.append(payload)
+
+def test_udp_batch_partial_send_without_ack():
+    transport = UdpTransport('127.0.0.1', 9, ack=False)
+    sock = FlakySocket(2)
+    transport.open = lambda: sock
+    results = transport.send_batch([('a', {}), ('b', {}), ('c', {}), ('d', {})])
+    assert [bool(result and result['success']) for result in results] == [True, True, False, False]
+    assert transport.sent == 2
+
+def test_udp_batch_partial_send_waits_for_sent_acks():
+    transport = UdpTransport('127.0.0.1', 9, ack=True, ack_timeout=0.05)
+    sock = FlakySocket(1)
+    transport.open = lambda: sock
+    collected = []
+
+    def collect(waiting, count):
+        collected.append(dict(waiting))
+        return [{'success': True} if index in waiting.values() else None for index in range(count)]
+
+    transport._collect_acks = collect
+    results = transport.send_batch([('a', {}), ('b', {}), ('c', {})])
+    # 只等待已发出那条的应答，未发出的返回None
+    assert list(collected[0].values()) == [0]
+    assert results == [{'success': True}, None, None]
+
+def test_udp_batch_nothing_sent():
+    transport = UdpTransport('127.0.0.1', 9, ack=True)
+    transport.open = lambda: FlakySocket(0)
+    assert transport.send_batch([('a', {}), ('b', {})]) == [None, None]
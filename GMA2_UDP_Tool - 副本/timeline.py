@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+演出时间线 - 按时间表自动发送场景、灯光、音量命令
+
+提示表文件（UTF-8文本，每行一条，# 开头为注释）：
+    时间  动作  参数
+    0            scene   开场音乐
+    +5           lights  blue          # + 表示相对上一条的偏移（秒）
+    +0.5         volume  60
+    01:30        lights  dim           # 绝对时间 [时:]分:秒[.毫秒] 或秒数
+    1:02:00.250  stop
+动作：scene 场景名 / lights 灯光动作 / volume 音量 / pause / stop
+
+播放在独立的定时线程中进行：
+    每条提示的目标时间都从播放起点计算，不累计误差；先粗睡眠（扣除测得的睡眠超时量）
+    再在最后几毫秒内让出式自旋到目标时间
+    按该类命令最近的往返耗时提前发出，抵消网络延迟；同一时刻的提示合并为一次批量请求
+    每条提示记录发出误差和估计生效误差
+任何途径提交紧急停止或系统复位时立即中止播放（不等该命令的应答，已排队但尚未发出的提示全部丢弃）
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from command_registry import REGISTRY
+
+# 播放状态
+TIMELINE_IDLE = 'idle'
+TIMELINE_PLAYING = 'playing'
+TIMELINE_PAUSED = 'paused'
+TIMELINE_STOPPED = 'stopped'
+TIMELINE_FINISHED = 'finished'
+
+# 提示表动作 -> (命令, 参数字段, 参数类型)
+CUE_ACTIONS = {
+    'scene': ('play_scene', 'scene_name', str),
+    'lights': ('lights_control', 'action', str),
+    'volume': ('set_volume', 'volume', int),
+    'pause': ('pause_scene', None, None),
+    'stop': ('stop_scene', None, None),
+}
+ACTION_NAMES = {command: action for action, (command, _, _) in CUE_ACTIONS.items()}
+
+
+class Cue:
+    """一条提示"""
+
+    def __init__(self, index, at, command, data, line=None):
+        self.index = index
+        # 演出时间（秒）
+        self.at = at
+        self.command = command
+        self.data = data
+        # 在提示表文件中的行号
+        self.line = line
+
+    def __repr__(self):
+        return f'Cue({self.index}, {self.at:.3f}, {self.command!r}, {self.data!r})'
+
+
+def parse_time(text):
+    """解析 [时:]分:秒[.毫秒] 或秒数，返回秒"""
+    parts = text.split(':')
+    if len(parts) > 3:
+        raise ValueError(text)
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    if seconds < 0:
+        raise ValueError(text)
+    return seconds
+
+
+def format_time(seconds):
+    """秒 -> 时:分:秒.毫秒"""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    return f'{hours}:{minutes:02d}:{millis / 1000:06.3f}'
+
+
+def parse_cue_list(text):
+    """解析提示表，返回按时间排序的提示列表，格式错误时抛出ValueError（带行号）"""
+    cues = []
+    last = 0.0
+    for number, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split(None, 2)
+        if len(parts) < 2:
+            raise ValueError(f"第{number}行: 缺少动作")
+        when, action = parts[0], parts[1]
+        argument = parts[2] if len(parts) > 2 else None
+        if argument is not None and ' #' in argument:
+            argument = argument.split(' #', 1)[0].strip()
+
+        try:
+            at = last + parse_time(when[1:]) if when.startswith('+') else parse_time(when)
+        except ValueError:
+            raise ValueError(f"第{number}行: 时间格式错误 {when}") from None
+
+        if action not in CUE_ACTIONS:
+            raise ValueError(f"第{number}行: 未知动作 {action}")
+        command, field, kind = CUE_ACTIONS[action]
+        data = {}
+        if field is not None:
+            if argument is None:
+                raise ValueError(f"第{number}行: {action} 缺少参数")
+            try:
+                data[field] = kind(argument)
+            except ValueError:
+                raise ValueError(f"第{number}行: 参数错误 {argument}") from None
+        if not REGISTRY.validate(command, data):
+            raise ValueError(f"第{number}行: 参数错误 {argument}")
+
+        cues.append(Cue(len(cues), at, command, data, number))
+        last = at
+
+    # 绝对时间可以早于上一条，按时间稳定排序
+    cues.sort(key=lambda cue: cue.at)
+    for index, cue in enumerate(cues):
+        cue.index = index
+    return cues
+
+
+def format_cue_list(cues):
+    """提示列表 -> 提示表文本（绝对时间）"""
+    lines = []
+    for cue in cues:
+        action = ACTION_NAMES[cue.command]
+        field = CUE_ACTIONS[action][1]
+        text = f'{format_time(cue.at)}  {action}'
+        if field is not None:
+            text += f'  {cue.data[field]}'
+        lines.append(text)
+    return '\n'.join(lines) + '\n'
+
+
+def load_cue_list(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_cue_list(f.read())
+
+
+class TimelinePlayer:
+    """提示表播放器"""
+
+    CUE_FILE = 'show.cue'
+    # 等待最后几条提示发送完成时，每隔该时长（秒）检查一次是否已停止
+    DRAIN_POLL = 0.1
+
+    @classmethod
+    def load(cls, data_dir, manager, **kwargs):
+        """从本地 show.cue 读取提示表，没有提示表或格式错误时返回None"""
+        path = os.path.join(data_dir, cls.CUE_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            cues = load_cue_list(path)
+        except (OSError, ValueError) as e:
+            print(f"读取提示表失败: {e}")
+            return None
+        return cls(manager, cues, **kwargs)
+
+    def __init__(self, manager, cues, ui_scheduler=None, on_cue=None, on_state=None, lead=None,
+                 lead_ratio=0.5, speed=1.0, spin=0.002, workers=4, mirror=None):
+        self.manager = manager
+        # 本地状态镜像（StateMirror），提示发出时乐观应用，按结果确认或回滚
+        self.mirror = mirror
+        self.cues = sorted(cues, key=lambda cue: cue.at)
+        # 同一时刻的提示合并为一组
+        self.groups = []
+        for cue in self.cues:
+            if self.groups and self.groups[-1][0].at == cue.at:
+                self.groups[-1].append(cue)
+            else:
+                self.groups.append([cue])
+
+        # ui_scheduler(func, *args) 负责把回调投递回界面线程
+        self.ui_scheduler = ui_scheduler
+        # on_cue(记录) 每条提示发送完成后调用；on_state(状态) 播放状态变化时调用
+        self.on_cue = on_cue
+        self.on_state = on_state
+        # 固定提前量（秒），None表示按命令往返耗时 * lead_ratio 自动估计
+        # lead_ratio 为发出到生效的时间占往返时间的比例，对称链路且控制系统执行后应答时约为0.5
+        self.lead = lead
+        self.lead_ratio = lead_ratio
+        # 播放速度（排练时可加速），提前量和计时误差按实际时间计算
+        self.speed = speed
+        # 最后自旋等待的时长（秒）
+        self.spin = spin
+        self.workers = workers
+
+        self.cond = threading.Condition()
+        self.state = TIMELINE_IDLE
+        # 演出时间0对应的时钟读数，暂停恢复后顺延
+        self.origin = 0.0
+        self.paused_at = 0.0
+        self.next_group = 0
+        # 每次开始播放、停止、中止时加一，旧的发送任务不再发出，结果不再记录
+        self.generation = 0
+        # 命令 -> 往返耗时的平滑值（秒）
+        self.latency = {}
+        # 粗睡眠超出预定时间的平滑值（秒）
+        self.oversleep = 0.0
+        # 每条提示的计时记录
+        self.results = []
+
+        self.thread = None
+        self.executor = None
+        self.listening = False
+
+    def play(self, position=0.0):
+        """从演出时间position（秒）开始播放"""
+        self.stop(send=False)
+        with self.cond:
+            self.generation += 1
+            self.origin = time.perf_counter() - position / self.speed
+            self.next_group = next(
+                (i for i, group in enumerate(self.groups) if group[0].at >= position), len(self.groups)
+            )
+            self.results = []
+            self.state = TIMELINE_PLAYING
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='timeline-send')
+            self.thread = threading.Thread(target=self._run, args=(self.generation,), name='timeline', daemon=True)
+            self.thread.start()
+        if not self.listening:
+            self.manager.add_critical_listener(self.halt)
+            self.listening = True
+        self._notify_state(TIMELINE_PLAYING)
+
+    def active(self):
+        """是否正在播放或暂停中"""
+        with self.cond:
+            return self.state in (TIMELINE_PLAYING, TIMELINE_PAUSED)
+
+    def pause(self):
+        """暂停时间线，同时暂停控制系统当前场景"""
+        with self.cond:
+            if self.state != TIMELINE_PLAYING:
+                return False
+            # 先提交命令，执行器已关闭而提交失败时状态不变
+            if not self._submit_control(self.executor, 'pause_scene'):
+                return False
+            self.state = TIMELINE_PAUSED
+            self.paused_at = time.perf_counter()
+            self.cond.notify_all()
+        self._notify_state(TIMELINE_PAUSED)
+        return True
+
+    def resume(self):
+        """继续播放（控制系统的pause_scene为暂停/继续切换），后续提示按暂停时长顺延"""
+        with self.cond:
+            if self.state != TIMELINE_PAUSED:
+                return False
+            if not self._submit_control(self.executor, 'pause_scene'):
+                return False
+            self.origin += time.perf_counter() - self.paused_at
+            self.state = TIMELINE_PLAYING
+            self.cond.notify_all()
+        self._notify_state(TIMELINE_PLAYING)
+        return True
+
+    def _submit_control(self, executor, command):
+        """在发送线程中发送暂停/停止命令，执行器已被并发的停止或中止关闭时不再发送，返回是否已提交"""
+        if executor is None:
+            return False
+        try:
+            executor.submit(self.manager.send_command, command, None, False)
+        except RuntimeError:
+            return False
+        return True
+
+    def stop(self, send=True):
+        """停止播放，send=True时同时停止控制系统当前场景"""
+        with self.cond:
+            active = self.state in (TIMELINE_PLAYING, TIMELINE_PAUSED)
+            if active:
+                self.state = TIMELINE_STOPPED
+                self.generation += 1
+            self.cond.notify_all()
+            thread, self.thread = self.thread, None
+            executor, self.executor = self.executor, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(1.0)
+        if executor is not None:
+            if active and send:
+                self._submit_control(executor, 'stop_scene')
+            executor.shutdown(wait=False, cancel_futures=True)
+        if active:
+            self._notify_state(TIMELINE_STOPPED)
+
+    def halt(self):
+        """紧急中止（关键命令提交时调用）：不再发送任何提示，丢弃尚未发出的提示"""
+        with self.cond:
+            if self.state not in (TIMELINE_PLAYING, TIMELINE_PAUSED):
+                return
+            self.state = TIMELINE_STOPPED
+            self.generation += 1
+            self.cond.notify_all()
+            executor, self.executor = self.executor, None
+            self.thread = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        print("时间线已中止（紧急停止）")
+        self._notify_state(TIMELINE_STOPPED)
+
+    def close(self):
+        self.stop(send=False)
+        if self.listening:
+            self.manager.remove_critical_listener(self.halt)
+            self.listening = False
+
+    def wait(self, timeout=None):
+        """等待播放结束（结束、停止或中止），返回是否已结束"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self.cond:
+            while self.state in (TIMELINE_PLAYING, TIMELINE_PAUSED):
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+        return True
+
+    def position(self):
+        """当前演出时间（秒）"""
+        with self.cond:
+            if self.state == TIMELINE_PAUSED:
+                return (self.paused_at - self.origin) * self.speed
+            if self.state == TIMELINE_PLAYING:
+                return (time.perf_counter() - self.origin) * self.speed
+            return 0.0
+
+    def lead_for(self, group):
+        """一组提示需要提前发出的时间（秒）"""
+        if self.lead is not None:
+            return self.lead
+        lead = 0.0
+        for cue in group:
+            latency = self.latency.get(cue.command)
+            if latency is None:
+                # 还没有该命令的样本，用心跳测得的RTT估计
+                rtt = self.manager.health.rtt_ms()
+                latency = rtt / 1000 if rtt is not None else 0.0
+            lead = max(lead, latency * self.lead_ratio)
+        return lead
+
+    def _run(self, generation):
+        clock = time.perf_counter
+        # 已提交的发送任务，全部完成后才算播放结束
+        sent = []
+        while True:
+            with self.cond:
+                while self.state == TIMELINE_PAUSED and generation == self.generation:
+                    self.cond.wait()
+                if self.state != TIMELINE_PLAYING or generation != self.generation:
+                    return
+                if self.next_group >= len(self.groups):
+                    sent = [future for future in sent if not future.done()]
+                    if not sent:
+                        self.state = TIMELINE_FINISHED
+                        executor, self.executor = self.executor, None
+                        self.cond.notify_all()
+                        break
+                    group = None
+                else:
+                    group = self.groups[self.next_group]
+                    lead = self.lead_for(group)
+                    # 目标时间每次都从播放起点重新计算（暂停恢复后起点已顺延）
+                    target = self.origin + group[0].at / self.speed - lead
+                    remaining = target - clock()
+                    if remaining > self.spin:
+                        # 粗睡眠，提前醒来的部分由自旋补足
+                        deadline = target - self.spin - self.oversleep
+                        if deadline > clock():
+                            self.cond.wait(deadline - clock())
+                            woke = clock()
+                            if woke > deadline and self.state == TIMELINE_PLAYING:
+                                self.oversleep += 0.1 * (min(woke - deadline, self.spin) - self.oversleep)
+                        continue
+
+            if group is None:
+                # 等最后几条提示发送完成，限时等待后回到循环开头检查是否已暂停、停止或中止
+                wait(sent, timeout=self.DRAIN_POLL)
+                continue
+
+            # 最后几毫秒让出式自旋（不长期占用GIL）
+            while clock() < target:
+                time.sleep(0)
+
+            with self.cond:
+                if self.state != TIMELINE_PLAYING or generation != self.generation:
+                    continue
+                self.next_group += 1
+                executor = self.executor
+            try:
+                sent.append(executor.submit(self._send, generation, group, target, lead))
+            except RuntimeError:
+                # 已停止
+                return
+
+        if executor is not None:
+            executor.shutdown(wait=False)
+        self._notify_state(TIMELINE_FINISHED)
+
+    def _send(self, generation, group, target, lead):
+        """在发送线程中执行：发送一组提示并记录计时误差"""
+        with self.cond:
+            if generation != self.generation:
+                # 排队期间已停止或中止（紧急停止之后绝不再发出提示）
+                return
+        ops = [self.mirror.begin(cue.command, cue.data) for cue in group] if self.mirror is not None else []
+        started = time.perf_counter()
+        if len(group) == 1:
+            cue = group[0]
+            results = [self.manager.send_command(cue.command, cue.data, journal=False)]
+        else:
+            results = self.manager.send_batch([(cue.command, cue.data) for cue in group], journal=False)
+        elapsed = time.perf_counter() - started
+        for op, result in zip(ops, results):
+            self.mirror.resolve(op, result)
+
+        records = []
+        with self.cond:
+            if generation != self.generation:
+                return
+            for cue, result in zip(group, results):
+                if result is not None and len(group) == 1:
+                    previous = self.latency.get(cue.command)
+                    self.latency[cue.command] = elapsed if previous is None else previous + 0.2 * (elapsed - previous)
+                # 计划生效时间 = 发出目标 + 提前量；估计生效时间 = 实际发出 + 往返耗时 * lead_ratio
+                record = {
+                    'index': cue.index,
+                    'at': cue.at,
+                    'command': cue.command,
+                    'ok': result is not None,
+                    'lead_ms': lead * 1000,
+                    'dispatch_error_ms': (started - target) * 1000,
+                    'arrival_error_ms': (started + elapsed * self.lead_ratio - target - lead) * 1000,
+                    'elapsed_ms': elapsed * 1000,
+                }
+                self.results.append(record)
+                records.append(record)
+        if self.on_cue is not None:
+            for record in records:
+                self._deliver(self.on_cue, record)
+
+    def _notify_state(self, state):
+        if self.on_state is not None:
+            self._deliver(self.on_state, state)
+
+    def _deliver(self, callback, value):
+        if self.ui_scheduler:
+            self.ui_scheduler(callback, value)
+        else:
+            try:
+                callback(value)
+            except Exception as e:
+                print(f"时间线回调错误: {e}")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令传输层 - HTTP（经中间服务 /api/command，批量命令 /api/batch）与 UDP（直连灯光控制）
+
+UDP数据报格式：
+    头部 8 字节，大端: 魔数 b'G2' | 版本(1) | 标志(1) | 序号(uint32)
+    负载: UTF-8 JSON {"command": ..., "data": ..., "id": 幂等键(可选)}
+    标志位 FLAG_ACK_REQUEST 表示需要应答，应答报文带 FLAG_ACK 且序号相同，负载为结果JSON
+    标志位 FLAG_BINARY 表示负载为紧凑二进制编码（见 command_registry），应答仍为JSON
+负载由命令注册表编码（常量命令预编码、带参数命令按模板拼接）
+"""
+
+import json
+import selectors
+import socket
+import struct
+import threading
+import time
+
+from command_registry import REGISTRY
+from instrumentation import connect_timer, server_timing
+
+MAGIC = b'G2'
+VERSION = 1
+FLAG_ACK_REQUEST = 0x01
+FLAG_ACK = 0x02
+FLAG_BINARY = 0x04
+HEADER = struct.Struct('!2sBBI')
+# 预编码负载的HTTP请求头
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+class TransportError(Exception):
+    """传输失败（连接失败、超时、无应答），命令可能未送达"""
+
+    def __init__(self, *args, timeout=False):
+        super().__init__(*args)
+        # 是否因超时失败
+        self.timeout = timeout
+
+
+class CommandRejected(Exception):
+    """控制系统已收到但拒绝了命令"""
+
+
+def encode_payload(command, data):
+    """把命令编码为JSON字节"""
+    return REGISTRY.encode(command, data)
+
+
+def with_request_id(body, request_id):
+    """在已编码的负载末尾追加幂等键，避免重新编码"""
+    if not request_id:
+        return body
+    return body[:-1] + b',"id":' + json.dumps(request_id).encode('utf-8') + b'}'
+
+
+def pack_datagram(seq, body, flags=0):
+    """组装UDP数据报"""
+    return HEADER.pack(MAGIC, VERSION, flags, seq) + body
+
+
+def unpack_datagram(datagram):
+    """解析UDP数据报，返回(标志, 序号, 负载)，格式错误返回None"""
+    if len(datagram) < HEADER.size:
+        return None
+    magic, version, flags, seq = HEADER.unpack_from(datagram)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return flags, seq, datagram[HEADER.size:]
+
+
+def is_timeout(error):
+    """请求异常是否为超时"""
+    # 能走到这里说明requests已经导入
+    import requests
+    return isinstance(error, requests.exceptions.Timeout)
+
+
+def record_response(stats, command, response, total):
+    """把一次HTTP响应的耗时和结果写入统计"""
+    retries = response.raw.retries if response.raw is not None else None
+    stats.record_response(
+        command, total,
+        connect=getattr(connect_timer, 'seconds', 0.0),
+        server=server_timing(response.headers),
+        retries=len(retries.history) if retries is not None else 0,
+        accepted=response.status_code == 200
+    )
+
+
+class HttpTransport:
+    """通过中间服务 /api/command 发送命令"""
+
+    name = 'http'
+
+    def __init__(self, manager, critical=False):
+        self.manager = manager
+        # 关键命令使用专用会话和更短的超时
+        self.critical = critical
+
+    def send(self, command, data=None, request_id=None):
+        """发送命令，网络失败抛出TransportError，被拒绝抛出CommandRejected"""
+        return self.send_encoded(command, with_request_id(encode_payload(command, data), request_id))
+
+    def send_encoded(self, command, body):
+        """发送预先编码好的命令负载（encode_payload的结果），发送时不再序列化"""
+        return self._post(command, data=body, headers=JSON_HEADERS)
+
+    def _post(self, command, **request):
+        url = f"{self.manager.base_url}/api/command"
+        if self.critical:
+            session, timeout = self.manager.get_critical_session(), self.manager.timeouts['critical']
+        else:
+            session, timeout = self.manager.get_session(), self.manager.timeouts['command']
+
+        stats = self.manager.instrumentation
+        if stats is not None:
+            connect_timer.seconds = 0.0
+            started = time.perf_counter()
+
+        try:
+            response = session.post(url, timeout=timeout, **request)
+        except Exception as e:
+            error = TransportError(e, timeout=is_timeout(e))
+            if stats is not None:
+                stats.record_failure(command, time.perf_counter() - started, timeout=error.timeout)
+            raise error from e
+
+        if stats is not None:
+            record_response(stats, command, response, time.perf_counter() - started)
+        if response.status_code != 200:
+            raise CommandRejected(response.status_code)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise CommandRejected(f"响应格式错误: {e}") from e
+
+    def send_batch(self, commands, atomic=False):
+        """一次请求发送多条命令（/api/batch），返回每条的结果，失败为None
+        commands中每项为(命令, 数据)或(命令, 数据, 幂等键)
+        网络失败抛出TransportError；原子模式下整批被拒绝抛出CommandRejected，所有命令均未执行"""
+        url = f"{self.manager.base_url}/api/batch"
+        items = [with_request_id(encode_payload(command, data), rest[0] if rest else None)
+                 for command, data, *rest in commands]
+        body = b'{"commands":[' + b','.join(items) + (b'],"atomic":true}' if atomic else b'],"atomic":false}')
+
+        stats = self.manager.instrumentation
+        if stats is not None:
+            connect_timer.seconds = 0.0
+            started = time.perf_counter()
+
+        try:
+            response = self.manager.get_session().post(
+                url, data=body, headers=JSON_HEADERS, timeout=self.manager.timeouts['command']
+            )
+        except Exception as e:
+            error = TransportError(e, timeout=is_timeout(e))
+            if stats is not None:
+                stats.record_failure('batch', time.perf_counter() - started, timeout=error.timeout)
+            raise error from e
+
+        if stats is not None:
+            record_response(stats, 'batch', response, time.perf_counter() - started)
+        if response.status_code != 200:
+            raise CommandRejected(response.status_code)
+        try:
+            results = response.json()['results']
+        except (ValueError, KeyError, TypeError) as e:
+            raise CommandRejected(f"响应格式错误: {e}") from e
+        if len(results) != len(items):
+            raise CommandRejected(f"结果数量不符: {len(results)}/{len(items)}")
+        return results
+
+    def close(self):
+        pass
+
+
+class UdpTransport:
+    """UDP直连传输：单个复用的非阻塞套接字，预编码负载，可选应答确认和二进制编码"""
+
+    name = 'udp'
+
+    def __init__(self, host, port, ack=True, ack_timeout=0.5, binary=False):
+        self.address = (host, port)
+        self.ack = ack
+        self.ack_timeout = ack_timeout
+        # 注册表中的命令使用紧凑二进制编码（控制端需支持 FLAG_BINARY）
+        self.binary = binary
+
+        self.sock = None
+        self.selector = None
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.sent = 0
+        self.acked = 0
+        self.lost = 0
+        # 命令耗时统计（由ConnectionManager设置，None表示未启用）
+        self.instrumentation = None
+
+    def set_target(self, host, port):
+        with self.lock:
+            self.address = (host, port)
+
+    def open(self):
+        if self.sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(sock, selectors.EVENT_READ)
+            self.sock = sock
+        return self.sock
+
+    def close(self):
+        with self.lock:
+            if self.sock is not None:
+                self.selector.close()
+                self.sock.close()
+                self.sock = None
+                self.selector = None
+
+    def encode(self, command, data, request_id=None):
+        """编码负载，返回(负载, 附加标志)"""
+        if self.binary:
+            body = REGISTRY.encode_binary(command, data, request_id)
+            if body is not None:
+                return body, FLAG_BINARY
+        return with_request_id(encode_payload(command, data), request_id), 0
+
+    def next_seq(self):
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        return self.sequence
+
+    def send(self, command, data=None, request_id=None):
+        """发送单条命令，需要应答时超时未应答抛出TransportError"""
+        stats = self.instrumentation
+        if stats is not None:
+            started = time.perf_counter()
+        result = self.send_batch([(command, data, request_id)])[0]
+        if stats is not None:
+            if result is None:
+                stats.record_failure(command, time.perf_counter() - started, timeout=True)
+            else:
+                stats.record_response(command, time.perf_counter() - started)
+        if result is None:
+            raise TransportError(f"UDP命令无应答: {command}", timeout=True)
+        return result
+
+    def send_batch(self, commands):
+        """连续发送多条命令（数据报串），返回每条的结果，失败为None
+        commands中每项为(命令, 数据)或(命令, 数据, 幂等键)"""
+        flags = FLAG_ACK_REQUEST if self.ack else 0
+        with self.lock:
+            waiting = {}
+            sent = 0
+            try:
+                sock = self.open()
+                for index, (command, data, *rest) in enumerate(commands):
+                    seq = self.next_seq()
+                    body, extra = self.encode(command, data, rest[0] if rest else None)
+                    sock.sendto(pack_datagram(seq, body, flags | extra), self.address)
+                    waiting[seq] = index
+                    sent += 1
+            except OSError as e:
+                # 已发出的数据报照常等待应答，只有未发出的命令失败（避免重复写入离线日志后重发）
+                print(f"UDP发送错误（已发出 {sent}/{len(commands)} 条）: {e}")
+            self.sent += sent
+
+            if not self.ack:
+                return [{'success': True, 'transport': self.name} if index < sent else None
+                        for index in range(len(commands))]
+            if not waiting:
+                return [None] * len(commands)
+            return self._collect_acks(waiting, len(commands))
+
+    def _collect_acks(self, waiting, count):
+        """等待应答，超时未应答的命令结果为None"""
+        results = [None] * count
+        deadline = time.monotonic() + self.ack_timeout
+        while waiting:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.selector.select(remaining):
+                break
+            while True:
+                try:
+                    datagram, _ = self.sock.recvfrom(65535)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError as e:
+                    print(f"UDP接收错误: {e}")
+                    break
+
+                parsed = unpack_datagram(datagram)
+                if parsed is None or not parsed[0] & FLAG_ACK:
+                    continue
+                index = waiting.pop(parsed[1], None)
+                if index is None:
+                    # 已超时或重复的应答
+                    continue
+                try:
+                    results[index] = json.loads(parsed[2].decode('utf-8')) if parsed[2] else {'success': True}
+                except ValueError:
+                    results[index] = {'success': True}
+                self.acked += 1
+
+        self.lost += len(waiting)
+        return results